@@ -15,6 +15,7 @@
     const elements = {
         template: document.getElementById('product-card-template'),
         search_input: document.getElementById('search-input'),
+        search_suggestions: document.getElementById('search-suggestions'),
         brands_filter: document.getElementById('brands-filter'),
         categories_filter: document.getElementById('categories-filter'),
         demographics_filter: document.getElementById('demographics-filter'),
@@ -73,6 +74,52 @@
     // Load products
     loadProducts();
 
+    // Stock and price changes made on other terminals are pushed here
+    subscribeToEvents();
+
+    function subscribeToEvents() {
+        const events = new EventSource('/api/inventory/events');
+
+        events.addEventListener('variant', (e) => {
+            const change = JSON.parse(e.data);
+
+            const product = allProducts.find(p => p.variants.some(v => v.variant_id === change.variant_id)
+                || p.shoe_id === change.shoe_id);
+            if (!product) return;
+
+            if (change.deleted) {
+                product.variants = product.variants.filter(v => v.variant_id !== change.variant_id);
+            } else {
+                const variant = product.variants.find(v => v.variant_id === change.variant_id);
+                if (!variant) {
+                    // New sizes come with their size details, fetch them along with the page
+                    loadProducts(currentPage);
+                    return;
+                }
+                variant.variant_stock = change.variant_stock;
+            }
+
+            displayProducts(allProducts);
+        });
+
+        events.addEventListener('shoe', (e) => {
+            const change = JSON.parse(e.data);
+            const product = allProducts.find(p => p.shoe_id === change.shoe_id);
+
+            if (product && !change.deleted) {
+                product.shoe_price = change.shoe_price;
+                product.markup = change.markup;
+                displayProducts(allProducts);
+                displayCart();
+            } else {
+                // Added or deleted shoes change what's on the page
+                loadProducts(currentPage);
+            }
+        });
+
+        events.addEventListener('resync', () => loadProducts(currentPage));
+    }
+
     // Cart management functions
     function loadCart() {
         const savedCart = localStorage.getItem('pos_cart');
@@ -330,6 +377,10 @@
 
                     displayProducts(allProducts);
                     displayCart(); // Update cart display with product details
+
+                    if (data.facets) {
+                        updateFacetCounts(data.facets);
+                    }
                 }
             })
             .catch(err => {
@@ -356,6 +407,20 @@
             });
     }
 
+    // Number of products each filter option would show, sent along with
+    // every page of products.
+    function updateFacetCounts(facets) {
+        const types = { brands: 'brand', categories: 'category', demographics: 'demographic' };
+
+        Object.entries(types).forEach(([facet, type]) => {
+            const counts = facets[facet] || {};
+            document.querySelectorAll(`label[for^="${type}-"]`).forEach(label => {
+                const count = counts[label.htmlFor.slice(type.length + 1)] || 0;
+                label.textContent = `${label.dataset.name} (${count})`;
+            });
+        });
+    }
+
     function populateFilter(items, container, type, selectedSet) {
         items.forEach(item => {
             const div = document.createElement('div');
@@ -371,6 +436,7 @@
             label.className = 'form-check-label';
             label.htmlFor = input.id;
             label.textContent = item[`${type}_name`] || item[`${type}_Code`];
+            label.dataset.name = label.textContent;
 
             input.addEventListener('change', () => {
                 if (input.checked) {
@@ -418,7 +484,17 @@
             const cardElement = elements.template.content.cloneNode(true);
 
             const img = cardElement.querySelector('.card-img-top');
-            img.src = `/shoe?shoe_id=${product.shoe_id}`;
+            // Stretched placeholder until the image itself has loaded
+            if (product.image_placeholder) {
+                img.style.backgroundImage = `url("${product.image_placeholder}")`;
+                img.style.backgroundSize = 'cover';
+                img.addEventListener('load', () => {
+                    img.style.backgroundImage = '';
+                }, { once: true });
+            }
+            img.loading = 'lazy';
+            img.decoding = 'async';
+            img.src = shoeImageUrl(product, 320);
             img.alt = product.shoe_name;
             img.onerror = function () {
                 this.src = '/assets/public/products/default/default.jpeg';
@@ -534,6 +610,18 @@
         renderPagination(totalPages);
     }
 
+    // Images addressed by hash are cached by the browser for good, width
+    // picks the smallest rendition that is still sharp on the screen
+    function shoeImageUrl(product, width) {
+        const params = new URLSearchParams(product.image_hash
+            ? { h: product.image_hash }
+            : { shoe_id: product.shoe_id });
+        if (width) {
+            params.set('w', Math.round(width * (window.devicePixelRatio || 1)));
+        }
+        return `/shoe?${params.toString()}`;
+    }
+
     function openModal(product) {
 
         const markup_price = parseFloat(product.shoe_price) * (1 + (parseFloat(product.markup) / 100));
@@ -541,7 +629,7 @@
 
         const modal_elem = document.querySelector("#product-modal");
 
-        modal_elem.querySelector("#shoe-image").src = `/shoe?shoe_id=${product.shoe_id}`;
+        modal_elem.querySelector("#shoe-image").src = shoeImageUrl(product, 640);
         modal_elem.querySelector("#shoe-name").textContent = product.shoe_name;
         modal_elem.querySelector("#shoe-brand").textContent = product.brand_name;
         modal_elem.querySelector("#shoe-price").textContent = `P ${parseFloat(markup_price).toFixed(2)}`;
@@ -862,12 +950,46 @@
         }
     });
 
-    // Search input handler
+    // Search input handler, suggestions come from memory on the server and
+    // are fetched on every keystroke, products once typing pauses.
+    let searchTimeout = null;
+    let suggestController = null;
     elements.search_input.addEventListener('input', (e) => {
         currentSearch = e.target.value.trim();
-        filterProducts();
+        loadSuggestions(currentSearch);
+
+        clearTimeout(searchTimeout);
+        searchTimeout = setTimeout(filterProducts, 250);
     });
 
+    function loadSuggestions(query) {
+        if (suggestController) {
+            suggestController.abort();
+        }
+
+        if (!query) {
+            elements.search_suggestions.replaceChildren();
+            return;
+        }
+
+        suggestController = new AbortController();
+        fetch(`/api/inventory/search/suggest?${new URLSearchParams({ q: query })}`,
+            { signal: suggestController.signal })
+            .then(res => res.json())
+            .then(data => {
+                elements.search_suggestions.replaceChildren(...data.suggestions.map(suggestion => {
+                    const option = document.createElement('option');
+                    option.value = suggestion.text;
+                    return option;
+                }));
+            })
+            .catch(err => {
+                if (err.name !== 'AbortError') {
+                    console.error('Error loading suggestions:', err);
+                }
+            });
+    }
+
     // Pagination functions
     function renderPagination(totalPages) {
         const paginationNav = elements.pagination_container.closest('nav');
@@ -442,7 +442,9 @@
                 renderSelectedDemographics();
 
                 // Show current image
-                elements.current_shoe_image.src = `/shoe?shoe_id=${shoeId}`;
+                elements.current_shoe_image.src = data.image_hash
+                    ? `/shoe?h=${data.image_hash}`
+                    : `/shoe?shoe_id=${shoeId}`;
                 elements.current_image_container.style.display = 'block';
 
                 elements.shoe_modal_title.textContent = "Edit Shoe";
@@ -558,7 +560,9 @@
         const demographicsListEl = elem.querySelector(".demographics-list");
 
         card.dataset.shoeId = item.shoe_id;
-        imageEl.src = `/shoe?shoe_id=${item.shoe_id}`;
+        imageEl.src = item.image_hash
+            ? `/shoe?h=${item.image_hash}`
+            : `/shoe?shoe_id=${item.shoe_id}`;
         idEl.textContent = `ID: ${item.shoe_id}`;
         nameEl.textContent = item.shoe_name;
         priceEl.textContent = `₱${parseFloat(item.shoe_price).toFixed(2)}`;
@@ -286,7 +286,9 @@
 
 
         // Set shoe image
-        shoeImage.src = `/shoe?shoe_id=${shoe.shoe_id}`;
+        shoeImage.src = shoe.image_hash
+            ? `/shoe?h=${shoe.image_hash}`
+            : `/shoe?shoe_id=${shoe.shoe_id}`;
         shoeImage.alt = shoe.shoe_name;
 
         // Set shoe info
@@ -0,0 +1,85 @@
+"""Compare the shoe image pipeline against the old two-pass one.
+
+    python benchmarkImages.py [image] [runs]
+
+Without an image a 6000x4000 JPEG (a typical phone photo) is generated.
+"""
+import sys
+import time
+from io import BytesIO
+
+from PIL import Image
+
+from src.Settings import Settings
+from src.utils.image import square_image
+
+
+def legacy_square_image(file, target_size):
+    # The pipeline before draft decoding: full decode, thumbnail() and a
+    # second resize() to nearly the same size.
+    image = Image.open(file)
+    if image.mode in ('RGBA', 'P'):
+        image = image.convert("RGB")
+
+    image.thumbnail((target_size, target_size), Image.Resampling.LANCZOS)
+
+    square = Image.new('RGB', (target_size, target_size), (255, 255, 255))
+
+    aspect_ratio = image.width / image.height
+    if aspect_ratio > 1:
+        new_width = target_size
+        new_height = int(target_size / aspect_ratio)
+    else:
+        new_height = target_size
+        new_width = int(target_size * aspect_ratio)
+
+    image = image.resize((new_width, new_height), Image.Resampling.LANCZOS)
+
+    square.paste(image, ((target_size - image.width) // 2,
+                         (target_size - image.height) // 2))
+
+    return square
+
+
+def sample_image():
+    image = Image.linear_gradient("L").resize((6000, 4000)).convert("RGB")
+    buffer = BytesIO()
+    image.save(buffer, format="JPEG", quality=90)
+    return buffer.getvalue()
+
+
+def benchmark(name, pipeline, data, runs):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        pipeline(BytesIO(data), Settings.shoes.size)
+        timings.append(time.perf_counter() - start)
+
+    timings.sort()
+    print(f"{name:<10} best {timings[0] * 1000:8.1f} ms   "
+          f"median {timings[len(timings) // 2] * 1000:8.1f} ms")
+
+    return timings[len(timings) // 2]
+
+
+def main():
+    if len(sys.argv) > 1:
+        with open(sys.argv[1], "rb") as f:
+            data = f.read()
+    else:
+        data = sample_image()
+
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+
+    with Image.open(BytesIO(data)) as image:
+        print(f"{image.format} {image.width}x{image.height}, "
+              f"{len(data) / 1024:.0f} KiB -> {Settings.shoes.size}px, {runs} runs")
+
+    legacy = benchmark("legacy", legacy_square_image, data, runs)
+    current = benchmark("current", square_image, data, runs)
+
+    print(f"speedup    {legacy / current:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""Delete stored images no shoe or user refers to anymore.
+
+    python collectImages.py [--dry-run] [--only shoes|profiles] [--min-age SECONDS] [--rate N]
+
+Images are released as soon as their last shoe or user goes away, unless
+they were stored within the last --min-age seconds. This catches what that
+leaves behind: those recent images, images of uploads that failed halfway,
+interrupted writes and directories of the old per shoe/user layout whose
+record is gone.
+"""
+import argparse
+import os
+
+from src.helpers import image_store
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dry-run", action="store_true",
+                        help="only list what would be deleted")
+    parser.add_argument("--only", choices=["shoes", "profiles"])
+    parser.add_argument("--min-age", type=float, default=image_store.ORPHAN_MIN_AGE,
+                        help="leave anything younger than this many seconds alone")
+    parser.add_argument("--rate", type=float, default=0,
+                        help="deletions per second, defaults to no limit")
+    args = parser.parse_args()
+
+    options = {"dry_run": args.dry_run, "min_age": args.min_age, "rate": args.rate}
+
+    orphans = []
+    if args.only != "profiles":
+        orphans += image_store.collect_shoe_images(**options)
+    if args.only != "shoes":
+        orphans += image_store.collect_profile_images(**options)
+
+    size = 0
+    for kind, path in orphans:
+        if args.dry_run:
+            for directory, _, files in os.walk(path):
+                size += sum(os.path.getsize(os.path.join(directory, name)) for name in files)
+        print(f"{kind:<8} {path}")
+
+    if args.dry_run:
+        print(f"Would delete {len(orphans)} images ({size / 1024 / 1024:.1f} MiB)")
+    else:
+        print(f"Deleted {len(orphans)} images")
+
+
+if __name__ == "__main__":
+    main()
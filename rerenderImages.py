@@ -0,0 +1,77 @@
+"""Re-render stored shoe images and profile pictures after the image settings changed.
+
+    python rerenderImages.py [--workers N] [--only shoes|profiles] [--force]
+
+Images already rendered with the current settings are skipped, so an
+interrupted run picks up where it stopped.
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from src.helpers import image_store
+from src.Settings import Settings
+from src.utils import image
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=0,
+                        help="worker processes, defaults to one per CPU core")
+    parser.add_argument("--only", choices=["shoes", "profiles"])
+    parser.add_argument("--force", action="store_true",
+                        help="re-render images that are already up to date")
+    args = parser.parse_args()
+
+    jobs = []
+    if args.only != "profiles":
+        jobs += [(image.rerender_shoe_image, image_store.replace_shoe_image,
+                  image_store.refresh_shoe_placeholder, image_hash)
+                 for image_hash in image.stored_blobs(Settings.shoes.path)]
+    if args.only != "shoes":
+        jobs += [(image.rerender_profile_image, image_store.replace_profile_image,
+                  None, image_hash)
+                 for image_hash in image.stored_blobs(Settings.profiles.path)]
+
+    print(f"Checking {len(jobs)} images on {args.workers or os.cpu_count()} workers")
+
+    rendered = skipped = failed = 0
+    start = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=args.workers or None) as executor:
+        futures = {executor.submit(rerender, image_hash, args.force): (replace, refresh, image_hash)
+                   for rerender, replace, refresh, image_hash in jobs}
+
+        try:
+            for done, future in enumerate(as_completed(futures), 1):
+                replace, refresh, image_hash = futures[future]
+                try:
+                    new_hash = future.result()
+                    if new_hash is None:
+                        skipped += 1
+                    else:
+                        # Re-encoded images are new blobs, move the records over.
+                        if new_hash != image_hash:
+                            replace(image_hash, new_hash)
+                        elif refresh is not None:
+                            refresh(image_hash)
+                        rendered += 1
+                except Exception as e:
+                    failed += 1
+                    print(f"{image_hash}: {e}")
+
+                if done % 100 == 0:
+                    elapsed = time.perf_counter() - start
+                    print(f"{done}/{len(jobs)} checked, {rendered / elapsed:.1f} images/s")
+        except KeyboardInterrupt:
+            executor.shutdown(wait=True, cancel_futures=True)
+            print("Interrupted, run again to resume.")
+
+    elapsed = time.perf_counter() - start
+    print(f"Rendered {rendered}, {skipped} up to date, {failed} failed "
+          f"in {elapsed:.1f}s ({rendered / elapsed if elapsed else 0:.1f} images/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""Run the server for production.
+
+    python serve.py [--host HOST] [--port PORT] [--workers N]
+
+Everything is read from the server section of properties.json, the options
+override it. The socket is bound once and shared by all the workers, which
+are restarted when one dies. `python main.py` is the development server
+with auto-reload.
+"""
+import argparse
+import os
+
+import uvicorn
+
+from src.Settings import Settings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default=Settings.server.host)
+    parser.add_argument("--port", type=int, default=Settings.server.port)
+    parser.add_argument("--workers", type=int, default=Settings.server.workers,
+                        help="worker processes, 0 for one per CPU core")
+    args = parser.parse_args()
+
+    uvicorn.run(
+        "src:app",
+        host=args.host,
+        port=args.port,
+        workers=args.workers or os.cpu_count() or 1,
+        backlog=Settings.server.backlog,
+        timeout_keep_alive=Settings.server.keepalive,
+        loop=Settings.server.loop,
+        http=Settings.server.http,
+        timeout_graceful_shutdown=Settings.server.graceful_timeout,
+        timeout_worker_healthcheck=Settings.server.worker_timeout,
+        reload=False,
+    )
+
+
+if __name__ == "__main__":
+    main()
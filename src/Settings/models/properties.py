@@ -1,5 +1,5 @@
 
-from typing import List, Optional
+from typing import List, Literal, Optional
 from pydantic import BaseModel
 
 
@@ -23,6 +23,7 @@ class ProfileSettings(BaseModel):
     default: str
     quality: int = 85
     supported_formats: List[str] = ["JPEG", "PNG"]
+    max_file_size: int = 5242880
 
 
 class Productsettings(BaseModel):
@@ -40,6 +41,52 @@ class ShoeSettings(BaseModel):
     default: str
     quality: int = 85
     supported_formats: List[str] = ["JPEG", "PNG"]
+    renditions: List[int] = [128, 320, 640, 1280]
+    formats: List[str] = ["WEBP", "AVIF"]
+
+
+class ImageSettings(BaseModel):
+    workers: int = 2
+    queue_size: int = 16
+    background: bool = False
+    max_pixels: int = 40000000
+    cache_size: int = 67108864
+
+
+class CatalogSettings(BaseModel):
+    max_age: int = 30
+    change_retention: int = 604800
+    commit_window: int = 60
+
+
+class EventSettings(BaseModel):
+    buffer_size: int = 256
+    coalesce_delay: float = 0.1
+    keepalive: int = 15
+
+
+class CacheSettings(BaseModel):
+    enabled: bool = True
+    ttl: int = 60
+    max_size: int = 16777216
+    warm_up: bool = True
+
+
+class BusSettings(BaseModel):
+    enabled: bool = True
+    path: str = "run/bus"
+
+
+class ServerSettings(BaseModel):
+    host: str = "127.0.0.1"
+    port: int = 8080
+    workers: int = 1
+    backlog: int = 2048
+    keepalive: int = 5
+    loop: Literal["auto", "asyncio", "uvloop"] = "auto"
+    http: Literal["auto", "h11", "httptools"] = "auto"
+    graceful_timeout: int = 30
+    worker_timeout: int = 5
 
 
 class SessionSettings(BaseModel):
@@ -48,10 +95,25 @@ class SessionSettings(BaseModel):
     httponly: bool = True
 
 
+class CompressionSettings(BaseModel):
+    enabled: bool = True
+    minimum_size: int = 1024
+    level: int = 6
+    brotli_quality: int = 5
+    excluded_paths: List[str] = ["/shoe", "/profile", "/favicon.ico"]
+
+
 class Properties(BaseModel):
     env: EnvironmentSettings
     logging: LoggingSettings = LoggingSettings()
     profiles: ProfileSettings
     products: Productsettings
     shoes: ShoeSettings
+    images: ImageSettings = ImageSettings()
+    catalog: CatalogSettings = CatalogSettings()
+    events: EventSettings = EventSettings()
+    cache: CacheSettings = CacheSettings()
+    bus: BusSettings = BusSettings()
+    server: ServerSettings = ServerSettings()
     session: SessionSettings
+    compression: CompressionSettings = CompressionSettings()
@@ -83,7 +83,14 @@ class SettingsClass:
         self.profiles = properties.profiles
         self.products = properties.products
         self.shoes = properties.shoes
+        self.images = properties.images
+        self.catalog = properties.catalog
+        self.events = properties.events
+        self.cache = properties.cache
+        self.bus = properties.bus
+        self.server = properties.server
         self.session = properties.session
+        self.compression = properties.compression
         logger.info("Properties loaded successfully")
 
     def load_secrets(self) -> None:
@@ -1 +1,8 @@
-from .server import app
\ No newline at end of file
+def __getattr__(name):
+    # The app is built on first access (uvicorn's "src:app"), not when a
+    # submodule like src.Settings is imported, e.g. by serve.py.
+    if name == "app":
+        from .server import app
+        return app
+
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
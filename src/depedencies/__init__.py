@@ -2,12 +2,13 @@ from datetime import datetime
 
 from fastapi import Request, HTTPException
 
-from ..helpers import Database
+from ..helpers.permission_map import PermissionMap
+from ..helpers.responses import negotiated_media_type, select_media_type
 from ..Settings import Settings
 from ..models.session import Session
 from ..utils import Permissions
 
-db = Database()
+permission_map = PermissionMap()
 
 
 async def is_authenticated(request: Request):
@@ -33,16 +34,15 @@ async def user_permissions(request: Request) -> list[str]:
     if request.session.get("superadmin"):
         return [Permissions.management.admin_all]
 
-    user_id = request.session.get("user_id")
+    return permission_map.permissions(request.session.get("user_id"))
 
-    permissions = db.fetchAll(r"""
-                              SELECT permission_code
-                              FROM user_roles ur
-                              JOIN role_permissions rp ON rp.role_id = ur.role_id
-                              JOIN permissions p ON rp.permission_id = p.permission_id
-                              WHERE ur.user_id = %s
-                              """, (user_id,))
 
-    permissions = [permission["permission_code"] for permission in permissions]
+async def negotiate_content(request: Request):
+    """Pick the response format (JSON or MessagePack) from the Accept header.
 
-    return permissions
+    Must stay async, the choice is kept in a ContextVar that
+    FastJSONResponse reads when it renders.
+    """
+
+    negotiated_media_type.set(
+        select_media_type(request.headers.get("accept", "")))
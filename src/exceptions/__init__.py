@@ -1,3 +1,7 @@
 
 class DatabaseException(Exception):
     ...
+
+
+class ImageQueueFullException(Exception):
+    ...
@@ -1 +1,6 @@
-from .database import Database
\ No newline at end of file
+from .database import Database
+from .responses import FastJSONResponse
+from .listing import ListFormat
+from .image_pool import ImagePool
+from .catalog_index import CatalogIndex
+from .reference_data import ReferenceData
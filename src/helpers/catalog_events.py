@@ -0,0 +1,166 @@
+import asyncio
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Hashable
+
+from ..Settings import Settings
+from .database import Database
+from .invalidation_bus import bus
+from .responses import dumps
+
+logger = logging.getLogger(__name__)
+
+db = Database()
+
+
+@dataclass
+class Event:
+    name: str
+    data: Any
+
+    def encode(self) -> bytes:
+        return b"event: " + self.name.encode() + b"\ndata: " + dumps(self.data) + b"\n\n"
+
+
+class Subscription:
+    """Events waiting to be sent to one client.
+
+    At most ``Settings.events.buffer_size`` events are held. An event
+    replaces the pending one with the same key, so a client that falls
+    behind gets the latest stock of a variant rather than every step in
+    between. When the buffer is full anyway the oldest event is dropped
+    and the client is sent ``resync`` to refetch what it shows.
+    """
+
+    def __init__(self, buffer_size: int) -> None:
+        self._buffer_size = buffer_size
+        self._pending: OrderedDict[Hashable, Event] = OrderedDict()
+        self._ready = asyncio.Event()
+        self._overflowed = False
+
+    def put(self, key: Hashable, event: Event) -> None:
+        if key not in self._pending and len(self._pending) >= self._buffer_size:
+            self._pending.popitem(last=False)
+            self._overflowed = True
+
+        self._pending[key] = event
+        self._ready.set()
+
+    async def get(self, timeout: float) -> list[Event]:
+        """Events published since the last call, empty after ``timeout`` seconds without any."""
+
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            return []
+
+        # Give rapid updates (e.g. every item of a sale) a moment to
+        # coalesce before sending them.
+        await asyncio.sleep(Settings.events.coalesce_delay)
+
+        events = list(self._pending.values())
+        if self._overflowed:
+            events.insert(0, Event("resync", {}))
+
+        self._pending.clear()
+        self._ready.clear()
+        self._overflowed = False
+
+        return events
+
+
+class EventBroker:
+    """Fans catalog changes out to the clients of the event stream."""
+
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        if not hasattr(self, '_initialized'):
+            self._initialized = True
+            self._subscriptions: set[Subscription] = set()
+
+    @property
+    def has_subscribers(self) -> bool:
+        return bool(self._subscriptions)
+
+    def subscribe(self) -> Subscription:
+        subscription = Subscription(Settings.events.buffer_size)
+        self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        self._subscriptions.discard(subscription)
+
+    def publish(self, key: Hashable, event: Event) -> None:
+        for subscription in self._subscriptions:
+            subscription.put(key, event)
+
+
+broker = EventBroker()
+
+
+def publish_variants(variant_ids: list[int]) -> None:
+    """Send the current stock of ``variant_ids``, ``deleted`` for the ones that are gone.
+
+    Other workers are sent the rows as read here, right after the write,
+    and pass them on to their own clients.
+    """
+
+    if not variant_ids or not (broker.has_subscribers or bus.running):
+        return
+
+    variants = _current_rows(
+        'SELECT variant_id, shoe_id, size_id, variant_stock FROM variants WHERE variant_id IN ({})',
+        "variant_id", variant_ids)
+
+    bus.publish("variants", variants)
+    _send_variants(variants)
+
+
+def publish_shoes(shoe_ids: list[int]) -> None:
+    """Send the current price and markup of ``shoe_ids``, ``deleted`` for the ones that are gone.
+
+    Other workers are sent the rows as read here, right after the write,
+    and pass them on to their own clients.
+    """
+
+    if not shoe_ids or not (broker.has_subscribers or bus.running):
+        return
+
+    shoes = _current_rows(
+        'SELECT shoe_id, shoe_name, brand_id, shoe_price, markup FROM shoes WHERE shoe_id IN ({})',
+        "shoe_id", shoe_ids)
+
+    bus.publish("shoes", shoes)
+    _send_shoes(shoes)
+
+
+def _current_rows(statement: str, key: str, record_ids: list[int]) -> list[dict[str, Any]]:
+    """Rows of ``record_ids`` flagged ``deleted: False``, ``{key: id, deleted: True}`` for the missing ones."""
+
+    placeholders = ','.join(['%s'] * len(record_ids))
+    rows = db.fetchAll(statement.format(placeholders), tuple(record_ids))
+
+    found = {row[key] for row in rows}
+    return ([{**row, "deleted": False} for row in rows]
+            + [{key: record_id, "deleted": True} for record_id in set(record_ids) - found])
+
+
+def _send_variants(variants: list[dict[str, Any]]) -> None:
+    for variant in variants:
+        broker.publish(("variant", variant["variant_id"]), Event("variant", variant))
+
+
+def _send_shoes(shoes: list[dict[str, Any]]) -> None:
+    for shoe in shoes:
+        broker.publish(("shoe", shoe["shoe_id"]), Event("shoe", shoe))
+
+
+bus.on("variants", _send_variants)
+bus.on("shoes", _send_shoes)
@@ -0,0 +1,173 @@
+import logging
+from dataclasses import dataclass
+
+from ..Settings import Settings
+from .database import Database
+from .responses import dumps
+
+logger = logging.getLogger(__name__)
+
+db = Database()
+
+# Tables POS terminals keep a copy of and their id columns. Triggers record
+# every write to them in catalog_changes (see migrations), its
+# AUTO_INCREMENT version is the catalog version. Versions follow the order
+# changes were written in, not committed in, see catalog_changes.
+VERSIONED_TABLES = {
+    "shoes": "shoe_id",
+    "variants": "variant_id",
+    "brands": "brand_id",
+    "categories": "category_id",
+    "sizes": "size_id",
+}
+
+_ALIASES = {"shoes": "s", "variants": "v", "brands": "b", "categories": "c", "sizes": "sz"}
+
+# Shoes carry the ids of their categories and demographics.
+_SHOE_LINKS = {
+    "category_ids": ("shoe_categories", "category_id"),
+    "demographic_ids": ("shoe_demographics", "demographic_id"),
+}
+
+
+def current_version() -> int:
+    row = db.fetchOne(r'SELECT COALESCE(MAX(version), 0) AS version FROM catalog_changes')
+    return int(row["version"]) if row else 0
+
+
+def _fetch(table: str, record_ids: list[int] | None = None) -> list[dict]:
+    """Rows of ``table``, all of them or those with ``record_ids``."""
+
+    alias, key = _ALIASES[table], VERSIONED_TABLES[table]
+
+    if record_ids is None:
+        rows = db.fetchAll(f'SELECT {alias}.* FROM {table} {alias}')
+    else:
+        placeholders = ','.join(['%s'] * len(record_ids))
+        rows = db.fetchAll(
+            f'SELECT {alias}.* FROM {table} {alias} WHERE {alias}.{key} IN ({placeholders})',
+            tuple(record_ids))
+
+    if table != "shoes":
+        return rows
+
+    shoes = {row["shoe_id"]: row for row in rows}
+    for column, (link_table, link_key) in _SHOE_LINKS.items():
+        for shoe in rows:
+            shoe[column] = []
+
+        if record_ids is None:
+            links = db.fetchAll(f'SELECT shoe_id, {link_key} FROM {link_table}')
+        else:
+            links = db.fetchAll(
+                f'SELECT shoe_id, {link_key} FROM {link_table} WHERE shoe_id IN ({placeholders})',
+                tuple(record_ids))
+
+        for link in links:
+            if link["shoe_id"] in shoes:
+                shoes[link["shoe_id"]][column].append(link[link_key])
+
+    return rows
+
+
+@dataclass
+class CatalogBlob:
+    version: int
+    data: bytes
+
+
+_full: CatalogBlob | None = None
+
+
+def full_catalog() -> CatalogBlob:
+    """The whole catalog as encoded JSON, rebuilt only when the version moved on."""
+
+    global _full
+
+    version = current_version()
+    if _full is not None and _full.version == version:
+        return _full
+
+    # The version is read first, writes racing with the reads below are
+    # sent again with the next delta.
+    content = {"version": version, "full": True}
+    for table in VERSIONED_TABLES:
+        content[table] = _fetch(table)
+    content["deleted"] = {table: [] for table in VERSIONED_TABLES}
+
+    _full = CatalogBlob(version, dumps(content))
+    prune_changes()
+    logger.info(f"Built catalog snapshot at version {version} ({len(_full.data)} bytes)")
+
+    return _full
+
+
+def catalog_changes(since: int) -> dict | None:
+    """Records changed and deleted after version ``since``.
+
+    Versions are handed out when a change is written, not when it's
+    committed, so a transaction can commit a version below one a client
+    already got. Changes written up to ``Settings.catalog.commit_window``
+    seconds before version ``since`` are therefore sent again, records are
+    always sent as they are now and a client simply replaces its copy.
+    A ``since`` past the current version has no changes yet.
+
+    Returns None when changes that old were already pruned, the caller
+    has to start over from the full catalog.
+    """
+
+    oldest = db.fetchOne(r'SELECT MIN(version) AS version FROM catalog_changes')
+    if oldest and oldest["version"] is not None and since < oldest["version"] - 1:
+        return None
+
+    # A client that synced with another worker may be ahead of what this
+    # one has read, it's never sent a version older than it has.
+    version = max(current_version(), since)
+
+    synced = db.fetchOne(
+        r'SELECT MAX(changed_at) AS changed_at FROM catalog_changes WHERE version <= %s', (since,))
+
+    if synced and synced["changed_at"] is not None:
+        changes = db.fetchAll(r"""
+            SELECT DISTINCT table_name, record_id
+            FROM catalog_changes
+            WHERE (version > %s OR changed_at >= %s - INTERVAL %s SECOND) AND version <= %s""",
+                              (since, synced["changed_at"], Settings.catalog.commit_window, version))
+    else:
+        changes = db.fetchAll(r"""
+            SELECT DISTINCT table_name, record_id
+            FROM catalog_changes
+            WHERE version > %s AND version <= %s""", (since, version))
+
+    changed: dict[str, list[int]] = {table: [] for table in VERSIONED_TABLES}
+    for change in changes:
+        if change["table_name"] in changed:
+            changed[change["table_name"]].append(change["record_id"])
+
+    content: dict = {"version": version, "full": False}
+    deleted = {}
+    for table, record_ids in changed.items():
+        rows = _fetch(table, record_ids) if record_ids else []
+
+        # Records that are gone by now were deleted.
+        found = {row[VERSIONED_TABLES[table]] for row in rows}
+        content[table] = rows
+        deleted[table] = sorted(set(record_ids) - found)
+    content["deleted"] = deleted
+
+    return content
+
+
+def prune_changes() -> int:
+    """Drop changes older than ``Settings.catalog.change_retention`` seconds.
+
+    The newest change is always kept, it carries the current version.
+    """
+
+    version = current_version()
+    cursor = db.commitOne(r"""
+        DELETE FROM catalog_changes
+        WHERE changed_at < NOW() - INTERVAL %s SECOND AND version < %s""",
+                          (Settings.catalog.change_retention, version))
+
+    return cursor.rowcount
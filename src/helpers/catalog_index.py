@@ -0,0 +1,464 @@
+import bisect
+import heapq
+import logging
+import re
+import time
+import unicodedata
+from dataclasses import dataclass
+
+from ..Settings import Settings
+from .database import Database
+
+logger = logging.getLogger(__name__)
+
+# Tables the indexes are built from, a write to any of them rebuilds them.
+CATALOG_TABLES = frozenset({
+    "shoes", "brands", "categories", "demographics",
+    "shoe_categories", "shoe_demographics",
+})
+
+# How much a word found in each field counts towards a shoe's rank.
+FIELD_WEIGHTS = {
+    "shoe_name": 4.0,
+    "brand_name": 2.0,
+    "categories": 1.0,
+    "demographics": 1.0,
+}
+
+# Only matching the start of a word counts this much of a whole word match.
+PREFIX_WEIGHT = 0.5
+
+_WORD_PATTERN = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercased words of ``text`` with accents removed."""
+
+    text = text.casefold()
+    if not text.isascii():
+        text = unicodedata.normalize("NFKD", text)
+        text = "".join(char for char in text if not unicodedata.combining(char))
+    return _WORD_PATTERN.findall(text)
+
+
+class SearchIndex:
+    """Inverted index from words to the shoes they occur in.
+
+    Every word of a query has to match the start of a word of the shoe in
+    any field. Shoes are ranked by the weight of the fields matched
+    (``FIELD_WEIGHTS``), whole words ranking above prefixes.
+    """
+
+    def __init__(self) -> None:
+        self._postings: dict[str, dict[int, float]] = {}
+        self._terms: list[str] = []
+
+    def add(self, shoe_id: int, field: str, text: str | None) -> None:
+        if not text:
+            return
+
+        weight = FIELD_WEIGHTS[field]
+        for term in tokenize(text):
+            postings = self._postings.setdefault(term, {})
+            postings[shoe_id] = max(postings.get(shoe_id, 0.0), weight)
+
+    def freeze(self) -> None:
+        """Sort the vocabulary once everything was added, prefixes are looked up in it."""
+        self._terms = sorted(self._postings)
+
+    def _match(self, word: str) -> dict[int, float]:
+        scores: dict[int, float] = {}
+
+        index = bisect.bisect_left(self._terms, word)
+        while index < len(self._terms) and self._terms[index].startswith(word):
+            term = self._terms[index]
+            factor = 1.0 if term == word else PREFIX_WEIGHT
+
+            for shoe_id, weight in self._postings[term].items():
+                scores[shoe_id] = max(scores.get(shoe_id, 0.0), weight * factor)
+
+            index += 1
+
+        return scores
+
+    def search(self, query: str) -> list[int]:
+        """Ids of the shoes matching ``query``, best match first."""
+
+        scores: dict[int, float] | None = None
+        for word in dict.fromkeys(tokenize(query)):
+            matches = self._match(word)
+            if scores is None:
+                scores = matches
+            else:
+                scores = {shoe_id: score + matches[shoe_id]
+                          for shoe_id, score in scores.items() if shoe_id in matches}
+
+            if not scores:
+                return []
+
+        if scores is None:
+            return []
+
+        return sorted(scores, key=lambda shoe_id: (-scores[shoe_id], shoe_id))
+
+
+# Suggestions kept for every prefix, the most a suggest request returns.
+SUGGEST_LIMIT = 10
+
+# Brands are suggested before shoes.
+SUGGESTION_TYPES = ("brand", "shoe")
+
+
+@dataclass(frozen=True)
+class Suggestion:
+    type: str
+    id: int
+    text: str
+
+
+class _TrieNode:
+    __slots__ = ("children", "entries", "top")
+
+    def __init__(self) -> None:
+        self.children: dict[str, _TrieNode] = {}
+        self.entries: list[int] = []
+        self.top: list[int] = []
+
+
+class SuggestTrie:
+    """Prefix trie over the words of brand and shoe names, for typeahead.
+
+    Suggestions are added best first (see ``rank``) and every node keeps
+    the ``SUGGEST_LIMIT`` best ones below it, so a one word prefix is
+    answered by walking down to its node. Longer queries filter the
+    suggestions of their longest word.
+    """
+
+    def __init__(self) -> None:
+        self._root = _TrieNode()
+        self._suggestions: list[Suggestion] = []
+        self._words: list[list[str]] = []
+
+    @staticmethod
+    def rank(suggestion: Suggestion) -> tuple:
+        return (SUGGESTION_TYPES.index(suggestion.type), len(suggestion.text),
+                suggestion.text.casefold(), suggestion.id)
+
+    def add(self, suggestion: Suggestion) -> None:
+        index = len(self._suggestions)
+        self._suggestions.append(suggestion)
+
+        words = tokenize(suggestion.text)
+        self._words.append(words)
+
+        for word in dict.fromkeys(words):
+            node = self._root
+            for char in word:
+                child = node.children.get(char)
+                if child is None:
+                    child = node.children[char] = _TrieNode()
+                node = child
+            node.entries.append(index)
+
+    def freeze(self) -> None:
+        """Work out the best suggestions of every node once everything was added."""
+
+        def collect(node: _TrieNode) -> list[int]:
+            candidates = list(node.entries)
+            for child in node.children.values():
+                candidates.extend(collect(child))
+            node.top = heapq.nsmallest(SUGGEST_LIMIT, set(candidates))
+            return node.top
+
+        collect(self._root)
+
+    def _find(self, word: str) -> _TrieNode | None:
+        node = self._root
+        for char in word:
+            node = node.children.get(char)  # type: ignore
+            if node is None:
+                return None
+        return node
+
+    def _subtree(self, node: _TrieNode) -> set[int]:
+        entries = set(node.entries)
+        for child in node.children.values():
+            entries |= self._subtree(child)
+        return entries
+
+    def suggest(self, query: str, limit: int = SUGGEST_LIMIT) -> list[Suggestion]:
+        words = list(dict.fromkeys(tokenize(query)))
+        if not words:
+            return []
+
+        longest = max(words, key=len)
+        node = self._find(longest)
+        if node is None:
+            return []
+
+        if len(words) == 1:
+            return [self._suggestions[index] for index in node.top[:limit]]
+
+        others = [word for word in words if word != longest]
+        matches = [index for index in sorted(self._subtree(node))
+                   if all(any(word.startswith(other) for word in self._words[index])
+                          for other in others)]
+
+        return [self._suggestions[index] for index in matches[:limit]]
+
+
+# Facets filtered on with bitmaps. Shoes match any of the brands and
+# categories selected but all of the demographics.
+FACETS = ("brands", "categories", "demographics")
+ALL_OF_FACETS = frozenset({"demographics"})
+
+
+class FacetIndex:
+    """Bitmaps of the shoes having each brand, category and demographic.
+
+    A bitmap is an int with bit ``n`` set for the ``n``-th shoe by id, so
+    combining filters is a handful of ``&`` and ``|`` and counting the
+    shoes of an option is ``int.bit_count``.
+    """
+
+    def __init__(self, shoe_ids: list[int]) -> None:
+        self._ids = sorted(shoe_ids)
+        self._positions = {shoe_id: position for position, shoe_id in enumerate(self._ids)}
+        self._pending: dict[str, dict[int, list[int]]] = {facet: {} for facet in FACETS}
+        self._bitmaps: dict[str, dict[int, int]] = {facet: {} for facet in FACETS}
+        self.all = (1 << len(self._ids)) - 1
+
+    def add(self, facet: str, option_id: int, shoe_id: int) -> None:
+        position = self._positions.get(shoe_id)
+        if position is not None:
+            self._pending[facet].setdefault(option_id, []).append(position)
+
+    def freeze(self) -> None:
+        """Turn what was added into bitmaps."""
+
+        for facet, options in self._pending.items():
+            self._bitmaps[facet] = {option_id: self.bitmap_of_positions(positions)
+                                    for option_id, positions in options.items()}
+        self._pending = {}
+
+    def bitmap_of_positions(self, positions: list[int]) -> int:
+        bits = bytearray((len(self._ids) + 7) // 8)
+        for position in positions:
+            bits[position >> 3] |= 1 << (position & 7)
+        return int.from_bytes(bits, "little")
+
+    def bitmap(self, shoe_ids: list[int]) -> int:
+        return self.bitmap_of_positions(
+            [self._positions[shoe_id] for shoe_id in shoe_ids if shoe_id in self._positions])
+
+    def ids(self, bitmap: int) -> list[int]:
+        """Shoe ids of the bits set in ``bitmap``, ascending."""
+        return [self._ids[position]
+                for position, bit in enumerate(bin(bitmap)[:1:-1]) if bit == "1"]
+
+    def _combine(self, facet: str, option_ids: list[int]) -> int:
+        bitmaps = self._bitmaps[facet]
+
+        if facet in ALL_OF_FACETS:
+            combined = self.all
+            for option_id in option_ids:
+                combined &= bitmaps.get(option_id, 0)
+        else:
+            combined = 0
+            for option_id in option_ids:
+                combined |= bitmaps.get(option_id, 0)
+
+        return combined
+
+    def match(self, selected: dict[str, list[int]], within: int | None = None) -> int:
+        """Bitmap of the shoes (out of ``within``) matching the selected options."""
+
+        bitmap = self.all if within is None else within
+        for facet, option_ids in selected.items():
+            if option_ids:
+                bitmap &= self._combine(facet, option_ids)
+        return bitmap
+
+    def counts(self, selected: dict[str, list[int]],
+               within: int | None = None) -> dict[str, dict[int, int]]:
+        """Number of shoes every option would match.
+
+        Options of an any-of facet are counted as if none of the facet's
+        options were selected, the count is what ticking just that one
+        gives. All-of options count what ticking them in addition gives.
+        """
+
+        counts = {}
+        for facet in FACETS:
+            base = self.match({other: option_ids for other, option_ids in selected.items()
+                               if other != facet or facet in ALL_OF_FACETS}, within)
+            counts[facet] = {option_id: (base & bitmap).bit_count()
+                             for option_id, bitmap in self._bitmaps[facet].items()}
+        return counts
+
+
+@dataclass
+class CatalogSnapshot:
+    generation: int
+    built_at: float
+    shoe_ids: frozenset[int]
+    search: SearchIndex
+    suggest: SuggestTrie
+    shoe_suggestions: dict[int, Suggestion]
+    facets: FacetIndex
+
+
+def build_snapshot(db: Database, generation: int) -> CatalogSnapshot:
+    start = time.perf_counter()
+
+    shoes = db.fetchAll(r"""
+        SELECT s.shoe_id, s.shoe_name, s.brand_id, b.brand_name
+        FROM shoes s
+        JOIN brands b ON b.brand_id = s.brand_id""")
+    categories = db.fetchAll(r"""
+        SELECT sc.shoe_id, sc.category_id, c.category_name
+        FROM shoe_categories sc
+        JOIN categories c ON c.category_id = sc.category_id""")
+    demographics = db.fetchAll(r"""
+        SELECT sd.shoe_id, sd.demographic_id, d.demographic_Code
+        FROM shoe_demographics sd
+        JOIN demographics d ON d.demographic_id = sd.demographic_id""")
+    brands = db.fetchAll(r'SELECT brand_id, brand_name FROM brands')
+
+    search = SearchIndex()
+    for shoe in shoes:
+        search.add(shoe["shoe_id"], "shoe_name", shoe["shoe_name"])
+        search.add(shoe["shoe_id"], "brand_name", shoe["brand_name"])
+    for row in categories:
+        search.add(row["shoe_id"], "categories", row["category_name"])
+    for row in demographics:
+        search.add(row["shoe_id"], "demographics", row["demographic_Code"])
+    search.freeze()
+
+    shoe_suggestions = {shoe["shoe_id"]: Suggestion("shoe", shoe["shoe_id"], shoe["shoe_name"])
+                        for shoe in shoes}
+    suggestions = [Suggestion("brand", brand["brand_id"], brand["brand_name"])
+                   for brand in brands] + list(shoe_suggestions.values())
+
+    suggest = SuggestTrie()
+    for suggestion in sorted(suggestions, key=SuggestTrie.rank):
+        suggest.add(suggestion)
+    suggest.freeze()
+
+    facets = FacetIndex([shoe["shoe_id"] for shoe in shoes])
+    for shoe in shoes:
+        facets.add("brands", shoe["brand_id"], shoe["shoe_id"])
+    for row in categories:
+        facets.add("categories", row["category_id"], row["shoe_id"])
+    for row in demographics:
+        facets.add("demographics", row["demographic_id"], row["shoe_id"])
+    facets.freeze()
+
+    logger.debug(f"Indexed {len(shoes)} shoes in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    return CatalogSnapshot(
+        generation=generation,
+        built_at=time.monotonic(),
+        shoe_ids=frozenset(shoe["shoe_id"] for shoe in shoes),
+        search=search,
+        suggest=suggest,
+        shoe_suggestions=shoe_suggestions,
+        facets=facets,
+    )
+
+
+class CatalogIndex:
+    """In-memory indexes over the shoe catalog.
+
+    Built from a handful of bulk queries the first time they're needed and
+    rebuilt on the next use after anything in ``CATALOG_TABLES`` was written.
+    Writes made by other worker processes aren't seen, so the indexes are
+    also rebuilt once they're ``Settings.catalog.max_age`` seconds old.
+    """
+
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        if not hasattr(self, '_initialized'):
+            self._initialized = True
+            self._db = Database()
+            self._generation = 0
+            self._snapshot: CatalogSnapshot | None = None
+            self._db.on_write(self._on_write)
+
+    def _on_write(self, table: str) -> None:
+        if table in CATALOG_TABLES:
+            self.invalidate()
+
+    def invalidate(self) -> None:
+        self._generation += 1
+
+    @property
+    def snapshot(self) -> CatalogSnapshot:
+        snapshot = self._snapshot
+        if (snapshot is None
+                or snapshot.generation != self._generation
+                or time.monotonic() - snapshot.built_at > Settings.catalog.max_age):
+            snapshot = self._snapshot = build_snapshot(self._db, self._generation)
+
+        return snapshot
+
+    def search(self, query: str) -> list[int]:
+        """Ids of the shoes matching ``query``, best match first.
+
+        A query that is the id of a shoe puts that shoe first.
+        """
+
+        snapshot = self.snapshot
+        shoe_ids = snapshot.search.search(query)
+
+        query = query.strip()
+        if query.isdigit() and int(query) in snapshot.shoe_ids:
+            shoe_id = int(query)
+            shoe_ids = [shoe_id] + [other for other in shoe_ids if other != shoe_id]
+
+        return shoe_ids
+
+    def suggest(self, query: str, limit: int = SUGGEST_LIMIT) -> list[Suggestion]:
+        """Brands and shoes whose names have words starting with those of ``query``.
+
+        A query that is the id of a shoe suggests that shoe first.
+        """
+
+        snapshot = self.snapshot
+        suggestions = snapshot.suggest.suggest(query, limit)
+
+        query = query.strip()
+        if query.isdigit() and int(query) in snapshot.shoe_suggestions:
+            shoe = snapshot.shoe_suggestions[int(query)]
+            suggestions = [shoe] + [other for other in suggestions if other != shoe]
+
+        return suggestions[:limit]
+
+    def filter(self, query: str | None = None,
+               **selected: list[int]) -> tuple[list[int], dict[str, dict[int, int]]]:
+        """Ids of the shoes matching ``query`` and the selected facet options.
+
+        ``selected`` maps facets (``FACETS``) to the option ids picked.
+        Returns the ids, best match first with a query and ascending
+        without, and the counts of every facet option (``FacetIndex.counts``).
+        """
+
+        facets = self.snapshot.facets
+
+        ranked = self.search(query) if query else None
+        within = facets.bitmap(ranked) if ranked is not None else None
+
+        bitmap = facets.match(selected, within)
+        counts = facets.counts(selected, within)
+
+        if ranked is None:
+            return facets.ids(bitmap), counts
+
+        matching = set(facets.ids(bitmap))
+        return [shoe_id for shoe_id in ranked if shoe_id in matching], counts
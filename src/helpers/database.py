@@ -1,13 +1,34 @@
+import re
+import threading
 from collections.abc import Sequence
-from typing import Dict, Any
+from typing import Any, Callable, Dict
 
 import mysql.connector
 from mysql.connector.abstracts import MySQLConvertibleType  # type: ignore
 
 from ..Settings import Settings
 
+# Table a data changing statement writes to, the first one for multi-table
+# statements.
+_WRITE_PATTERN = re.compile(
+    r"^\s*(?:INSERT\s+(?:IGNORE\s+)?INTO|REPLACE\s+INTO|UPDATE|DELETE\s+FROM|"
+    r"ALTER\s+TABLE|TRUNCATE(?:\s+TABLE)?)\s+`?(\w+)`?",
+    re.IGNORECASE)
+
+
+def written_table(statement: str) -> str | None:
+    match = _WRITE_PATTERN.match(statement)
+    return match.group(1).lower() if match else None
+
 
 class Database:
+    """The process' connection to MySQL.
+
+    Every thread gets a connection of its own, opened on its first query,
+    so endpoints run off the event loop (see ``single_flight``) don't
+    share one.
+    """
+
     _instance = None
 
     def __new__(cls):
@@ -18,19 +39,29 @@ class Database:
     def __init__(self):
         if not hasattr(self, '_initialized'):
             self._initialized = True
+            self._write_listeners: list[Callable[[str], None]] = []
+            self._local_write_listeners: list[Callable[[str], None]] = []
+            self._local = threading.local()
             self.connect()
 
     def connect(self):
         Settings.reload()
+        self._open()
 
+    def _open(self):
         max_retries = 3
         for attempt in range(max_retries):
             try:
-                self._db = mysql.connector.connect(
+                self._local.connection = mysql.connector.connect(
                     host=Settings.secrets.db_hostname,
                     user=Settings.secrets.db_username,
                     password=Settings.secrets.db_password,
-                    database=Settings.secrets.db_database
+                    database=Settings.secrets.db_database,
+                    # Every statement is its own transaction. Otherwise a
+                    # worker that only reads keeps the snapshot of its first
+                    # read and reloads its caches from it after other
+                    # workers' writes.
+                    autocommit=True
                 )
                 break  # Connection successful
             except mysql.connector.Error as e:
@@ -47,13 +78,45 @@ class Database:
     def commitOne(self, statement: str, params: Sequence[MySQLConvertibleType] | Dict[str, MySQLConvertibleType] = ()):
         cursor = self.execute(statement, params=params)
         self.db.commit()
+        self._notify_write(statement)
         return cursor
 
     def commitMany(self, statement: str, params: Sequence[Sequence[MySQLConvertibleType] | Dict[str, MySQLConvertibleType]]):
         cursor = self.executeMany(statement, params)
         self.db.commit()
+        self._notify_write(statement)
         return cursor
 
+    def on_write(self, listener: Callable[[str], None]) -> None:
+        """Call ``listener(table)`` after every committed write to ``table``.
+
+        Lets in-memory copies of tables know when to drop what they hold.
+        Writes made by other workers are reported too once the
+        invalidation bus relays them.
+        """
+        self._write_listeners.append(listener)
+
+    def on_local_write(self, listener: Callable[[str], None]) -> None:
+        """Like ``on_write`` but only for writes committed by this process."""
+        self._local_write_listeners.append(listener)
+
+    def _notify_write(self, statement: str) -> None:
+        table = written_table(statement)
+        if table is None:
+            return
+
+        self.notify_write(table)
+
+    def notify_write(self, table: str, local: bool = True) -> None:
+        """Report a write to ``table``, ``local=False`` for one made by another worker."""
+
+        for listener in self._write_listeners:
+            listener(table)
+
+        if local:
+            for listener in self._local_write_listeners:
+                listener(table)
+
     def execute(self, statement: str, params: Sequence[MySQLConvertibleType] | Dict[str, MySQLConvertibleType] = ()):
         cursor = self.cursor(
             dictionary=True
@@ -72,4 +135,6 @@ class Database:
 
     @property
     def db(self):
-        return self._db
+        if getattr(self._local, "connection", None) is None:
+            self._open()
+        return self._local.connection
@@ -0,0 +1,127 @@
+import asyncio
+import logging
+import signal
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, TypeVar
+
+from ..exceptions import ImageQueueFullException
+from ..Settings import Settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+def _init_worker() -> None:
+    # Ctrl+C is handled by the server, which shuts the pool down itself.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+class ImagePool:
+    """Process pool the Pillow work of image uploads runs in.
+
+    Decoding, resampling and encoding an upload takes long enough to
+    stall every other request on the worker, so it is handed to a few
+    worker processes instead. At most ``Settings.images.queue_size`` jobs
+    are queued or running at once, uploads beyond that are refused with
+    ``ImageQueueFullException`` rather than piling up in memory.
+
+    Jobs are plain module level functions (see ``utils.image``) that get
+    the raw upload bytes and write the results to disk themselves.
+    """
+
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        if not hasattr(self, '_initialized'):
+            self._initialized = True
+            self._executor: ProcessPoolExecutor | None = None
+            self._pending = 0
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=Settings.images.workers or None,
+                initializer=_init_worker
+            )
+        return self._executor
+
+    @property
+    def pending(self) -> int:
+        """Jobs currently queued or running."""
+        return self._pending
+
+    def _submit(self, fn: Callable[..., T], *args: Any) -> "asyncio.Future[T]":
+        if self._pending >= Settings.images.queue_size:
+            raise ImageQueueFullException(
+                "Too many images are being processed, try again in a moment.")
+
+        self._pending += 1
+        future = asyncio.wrap_future(self.executor.submit(fn, *args))
+        future.add_done_callback(self._release)
+        return future
+
+    def _release(self, future: "asyncio.Future[Any]") -> None:
+        self._pending -= 1
+
+        if not future.cancelled() and future.exception() is not None:
+            logger.error("Image processing failed: %s", future.exception())
+
+    async def run(self, fn: Callable[..., T], *args: Any) -> T:
+        """Run ``fn(*args)`` in the pool and wait for its result."""
+        return await self._submit(fn, *args)
+
+    def submit(self, fn: Callable[..., T], *args: Any) -> "asyncio.Future[T]":
+        """Queue an image job for a record that is yet to be written.
+
+        Raises ``ImageQueueFullException`` right away, so submitting before
+        writing anything means a full queue doesn't leave a record without
+        its image behind. Images of records that then fail to be written
+        are left for ``collectImages.py``.
+        """
+        return self._submit(fn, *args)
+
+    async def wait(self, future: "asyncio.Future[T]") -> None:
+        """Wait for a submitted job, unless ``Settings.images.background`` is set.
+
+        Done before the writes, an image that can't be processed fails the
+        request before anything is written.
+        """
+        if not Settings.images.background:
+            await future
+
+    def finish(self, future: "asyncio.Future[T]", on_done: Callable[[T], None]) -> T | None:
+        """Call ``on_done`` with the result of a submitted job once it's there.
+
+        Returns the result when the job is done already, ``None`` while it
+        is still running in the background. Failures of background jobs
+        are only logged.
+        """
+
+        if future.done():
+            result = future.result()
+            on_done(result)
+            return result
+
+        future.add_done_callback(lambda future: self._finalize(future, on_done))
+        return None
+
+    def _finalize(self, future: "asyncio.Future[T]", on_done: Callable[[T], None]) -> None:
+        if future.cancelled() or future.exception() is not None:
+            return
+
+        try:
+            on_done(future.result())
+        except Exception as e:
+            logger.error("Finalizing image failed: %s", e)
+
+    def shutdown(self, wait: bool = True) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=not wait)
+            self._executor = None
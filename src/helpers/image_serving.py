@@ -0,0 +1,143 @@
+import mimetypes
+import os
+from dataclasses import dataclass
+from typing import Callable, Hashable, Optional
+
+from cachetools import LRUCache
+from fastapi import Request, Response
+
+from ..Settings import Settings
+from ..utils.image import content_version
+
+# URLs addressing an image by hash never change content, everything else
+# has to be revalidated, which is a cheap 304 when the ETag still matches.
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+# Requests remembered with the path they resolved to, see ImageCache.
+MAX_CACHED_KEYS = 65536
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against ``etag``."""
+
+    if if_none_match.strip() == "*":
+        return True
+
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+
+    return False
+
+
+@dataclass
+class CachedImage:
+    path: str
+    data: bytes
+    etag: str
+    media_type: str
+
+
+class ImageCache:
+    """Encoded image bytes and their ETags, kept in memory.
+
+    Entries are kept by path, an LRU bounded by ``max_bytes`` of image
+    data. What was asked for (e.g. an image hash, width and accepted
+    formats) is mapped to the path it resolved to, so a hit is answered
+    without touching the file system at all. Keys that resolved to one of
+    the ``fallbacks`` (the default images) aren't mapped, they're resolved
+    again every time as the image may have been stored since.
+
+    Stored images never change under their hash, entries only have to be
+    dropped when an image is deleted (see ``image_store``).
+    """
+
+    def __init__(self, max_bytes: int, fallbacks: tuple[str, ...] = ()) -> None:
+        self.max_bytes = max_bytes
+        self.fallbacks = fallbacks
+        self._entries: LRUCache = LRUCache(
+            maxsize=max(max_bytes, 1), getsizeof=lambda entry: len(entry.data) or 1)
+        self._paths: LRUCache = LRUCache(maxsize=MAX_CACHED_KEYS)
+
+    def get(self, key: Hashable, resolve: Callable[[], str]) -> CachedImage:
+        """Cached image for ``key``, read from ``resolve()``'s path on a miss."""
+
+        path = self._paths.get(key)
+        entry = self._entries.get(path) if path is not None else None
+        if entry is not None:
+            return entry
+
+        path = resolve()
+        entry = self._entries.get(path)
+        if entry is None:
+            with open(path, "rb") as f:
+                data = f.read()
+
+            entry = CachedImage(
+                path=path,
+                data=data,
+                etag=f'"{content_version(data)}"',
+                media_type=mimetypes.guess_type(path)[0] or "application/octet-stream"
+            )
+
+            if 0 < len(data) <= self.max_bytes:
+                self._entries[path] = entry
+
+        if path not in self.fallbacks:
+            self._paths[key] = path
+
+        return entry
+
+    def invalidate(self, directory: str) -> None:
+        """Drop every entry read from within ``directory``."""
+
+        prefix = os.path.join(directory, "")
+        for key in [key for key, path in self._paths.items() if path.startswith(prefix)]:
+            self._paths.pop(key, None)
+        for path in [path for path in self._entries if path.startswith(prefix)]:
+            self._entries.pop(path, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._paths.clear()
+
+
+image_cache = ImageCache(Settings.images.cache_size,
+                         (Settings.shoes.default, Settings.profiles.default))
+
+
+def serve_image(request: Request,
+                key: tuple,
+                resolve: Callable[[], str],
+                immutable: bool = False,
+                vary: Optional[str] = None) -> Response:
+    """Image response from the image cache with a strong ETag and Cache-Control.
+
+    Answers with 304 Not Modified when the client's If-None-Match still
+    matches. ``immutable`` should only be set for URLs that can't ever
+    return different content, i.e. ones addressing an image by hash.
+    """
+
+    image = image_cache.get(key, resolve)
+
+    # A hash whose image is gone falls back to the default image, which
+    # must not be pinned to that URL.
+    if image.path in image_cache.fallbacks:
+        immutable = False
+
+    headers = {
+        "ETag": image.etag,
+        "Cache-Control": IMMUTABLE_CACHE_CONTROL if immutable else REVALIDATE_CACHE_CONTROL
+    }
+    if vary:
+        headers["Vary"] = vary
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag_matches(if_none_match, image.etag):
+        return Response(status_code=304, headers=headers)
+
+    return Response(image.data, headers=headers, media_type=image.media_type)
@@ -0,0 +1,317 @@
+import logging
+import os
+import re
+import shutil
+import time
+
+from cachetools import TTLCache
+
+from ..Settings import Settings
+from ..utils import image
+from .database import Database
+from .image_serving import image_cache
+
+logger = logging.getLogger(__name__)
+
+db = Database()
+
+
+# Which image a shoe/user has, for /shoe?shoe_id= and /profile?user_id=.
+# Dropped here whenever it changes, the TTL bounds how long other workers
+# keep serving the previous image.
+HASH_LOOKUP_TTL = 30
+
+_MISSING = object()
+
+_shoe_hashes: TTLCache = TTLCache(maxsize=8192, ttl=HASH_LOOKUP_TTL)
+_profile_hashes: TTLCache = TTLCache(maxsize=2048, ttl=HASH_LOOKUP_TTL)
+
+
+def _fetch_image_hash(table: str, key: str, record_id: int) -> str | None:
+    row = db.fetchOne(
+        f'SELECT image_hash FROM {table} WHERE {key} = %s', (record_id,))
+    return row["image_hash"] if row else None
+
+
+def shoe_image_hash(shoe_id: int) -> str | None:
+    image_hash = _shoe_hashes.get(shoe_id, _MISSING)
+    if image_hash is _MISSING:
+        image_hash = _shoe_hashes[shoe_id] = _fetch_image_hash(
+            "shoes", "shoe_id", shoe_id)
+    return image_hash  # type: ignore
+
+
+def profile_image_hash(user_id: int) -> str | None:
+    image_hash = _profile_hashes.get(user_id, _MISSING)
+    if image_hash is _MISSING:
+        image_hash = _profile_hashes[user_id] = _fetch_image_hash(
+            "users", "user_id", user_id)
+    return image_hash  # type: ignore
+
+
+# Leftovers younger than this are never collected, an upload may have
+# stored its image without the record pointing at it yet.
+ORPHAN_MIN_AGE = 3600
+
+_STAGING_PATTERN = re.compile(r"^[0-9a-f]{16}\.tmp-\d+$")
+
+
+def _older_than(path: str, min_age: float) -> bool:
+    try:
+        return time.time() - os.stat(path).st_mtime >= min_age
+    except FileNotFoundError:
+        return False
+
+
+def _release(root: str, table: str, image_hash: str | None,
+             min_age: float = ORPHAN_MIN_AGE) -> None:
+    if image_hash is None:
+        return
+
+    # An upload of the same image may have just been handed this blob
+    # (store_blob touches it then) without pointing its record at it yet,
+    # recent blobs are left for collect_orphans.
+    if not _older_than(image.blob_dir(root, image_hash), min_age):
+        return
+
+    row = db.fetchOne(
+        f'SELECT COUNT(*) AS refs FROM {table} WHERE image_hash = %s', (image_hash,))
+    if row and row["refs"] == 0:
+        image.delete_blob(root, image_hash)
+        image_cache.invalidate(image.blob_dir(root, image_hash))
+
+
+def release_shoe_image(image_hash: str | None) -> None:
+    """Delete a stored shoe image once no shoe references it anymore."""
+    _release(Settings.shoes.path, "shoes", image_hash)
+
+
+def release_profile_image(image_hash: str | None) -> None:
+    """Delete a stored profile picture once no user references it anymore."""
+    _release(Settings.profiles.path, "users", image_hash)
+
+
+def assign_shoe_image(shoe_id: int, image_hash: str | None) -> None:
+    """Point a shoe at a stored image (None for the default one).
+
+    The image it pointed at before is released.
+    """
+
+    previous = _fetch_image_hash("shoes", "shoe_id", shoe_id)
+    placeholder = image.read_placeholder(Settings.shoes.path, image_hash)
+
+    db.commitOne(
+        r'UPDATE shoes SET image_hash = %s, image_placeholder = %s WHERE shoe_id = %s',
+        (image_hash, placeholder, shoe_id))
+    _shoe_hashes.pop(shoe_id, None)
+
+    if previous != image_hash:
+        release_shoe_image(previous)
+
+
+def assign_profile_image(user_id: int, image_hash: str | None) -> None:
+    """Point a user at a stored profile picture, releasing the previous one."""
+
+    previous = _fetch_image_hash("users", "user_id", user_id)
+
+    db.commitOne(
+        r'UPDATE users SET image_hash = %s WHERE user_id = %s', (image_hash, user_id))
+    _profile_hashes.pop(user_id, None)
+
+    if previous != image_hash:
+        release_profile_image(previous)
+
+
+def replace_shoe_image(old_hash: str, new_hash: str) -> None:
+    """Move every reference of a shoe image over to another one."""
+
+    placeholder = image.read_placeholder(Settings.shoes.path, new_hash)
+
+    db.commitOne(
+        r'UPDATE shoes SET image_hash = %s, image_placeholder = %s WHERE image_hash = %s',
+        (new_hash, placeholder, old_hash))
+    _shoe_hashes.clear()
+    release_shoe_image(old_hash)
+
+
+def refresh_shoe_placeholder(image_hash: str) -> None:
+    """Copy a re-rendered placeholder over to the shoes using the image."""
+
+    db.commitOne(
+        r'UPDATE shoes SET image_placeholder = %s WHERE image_hash = %s',
+        (image.read_placeholder(Settings.shoes.path, image_hash), image_hash))
+
+
+def replace_profile_image(old_hash: str, new_hash: str) -> None:
+    db.commitOne(
+        r'UPDATE users SET image_hash = %s WHERE image_hash = %s', (new_hash, old_hash))
+    _profile_hashes.clear()
+    release_profile_image(old_hash)
+
+
+def _import_directories(root: str, prefix: str, table: str, key: str, default: str) -> int:
+    # shoe-XXXXX / user-XXXXX directories of the old per record layout.
+    pattern = re.compile(rf"^{prefix}-(\d+)$")
+
+    if not os.path.isdir(root):
+        return 0
+
+    with open(default, "rb") as f:
+        default_data = f.read()
+
+    imported = 0
+    for entry in os.scandir(root):
+        match = pattern.match(entry.name)
+        if not match or not entry.is_dir():
+            continue
+
+        record_id = int(match.group(1))
+        image_path = os.path.join(entry.path, f"{entry.name}.jpeg")
+        if not os.path.isfile(image_path):
+            continue
+
+        with open(image_path, "rb") as f:
+            data = f.read()
+
+        image_hash = None
+        if data != default_data:
+            def render(directory: str) -> None:
+                # Keep the renditions that were already generated.
+                for rendition in os.scandir(entry.path):
+                    name = rendition.name.removeprefix(f"{entry.name}-")
+                    if name != rendition.name or name == image.RENDER_MARKER:
+                        shutil.copy(rendition.path, os.path.join(directory, name))
+
+            image_hash = image.store_blob(root, data, render)
+
+        cursor = db.commitOne(
+            f'UPDATE {table} SET image_hash = %s WHERE {key} = %s', (image_hash, record_id))
+
+        if cursor.rowcount > 0 or image_hash is None:
+            shutil.rmtree(entry.path, ignore_errors=True)
+            imported += 1
+        else:
+            # No such record, leave the directory alone.
+            _release(root, table, image_hash)
+
+    return imported
+
+
+def import_image_directories() -> None:
+    """Move images of the old per shoe/user directory layout into the blob store.
+
+    Copies of the default image are dropped, the records just point at
+    no image. Renditions are re-rendered by ``rerenderImages.py`` if
+    anything about them changed.
+    """
+
+    shoes = _import_directories(Settings.shoes.path, "shoe", "shoes", "shoe_id",
+                                Settings.shoes.default)
+    users = _import_directories(Settings.profiles.path, "user", "users", "user_id",
+                                Settings.profiles.default)
+
+    logger.info(f"Imported {shoes} shoe images and {users} profile pictures")
+
+
+def render_shoe_placeholders() -> None:
+    """Generate the placeholders of shoe images stored before they existed."""
+
+    rendered = 0
+    for image_hash in image.stored_blobs(Settings.shoes.path):
+        directory = image.blob_dir(Settings.shoes.path, image_hash)
+        if os.path.isfile(os.path.join(directory, image.BLOB_PLACEHOLDER)):
+            continue
+
+        with open(os.path.join(directory, image.BLOB_IMAGE), "rb") as f:
+            image.save_placeholder(directory, image.open_image(f))
+
+        refresh_shoe_placeholder(image_hash)
+        rendered += 1
+
+    logger.info(f"Rendered {rendered} shoe image placeholders")
+
+
+def find_orphans(root: str, table: str, key: str, prefix: str,
+                 min_age: float = ORPHAN_MIN_AGE) -> list[tuple[str, str]]:
+    """Everything under ``root`` no record of ``table`` needs anymore.
+
+    Returns ``(kind, path)`` pairs, ``kind`` being ``"blob"`` for stored
+    images nothing refers to, ``"legacy"`` for ``<prefix>-<id>``
+    directories of records that no longer exist and ``"staging"`` for
+    blobs that were never completed.
+    """
+
+    if not os.path.isdir(root):
+        return []
+
+    referenced = {row["image_hash"] for row in db.fetchAll(
+        f'SELECT DISTINCT image_hash FROM {table} WHERE image_hash IS NOT NULL')}
+    record_ids = {row[key] for row in db.fetchAll(f'SELECT {key} FROM {table}')}
+
+    legacy_pattern = re.compile(rf"^{prefix}-(\d+)$")
+
+    orphans = []
+    for entry in os.scandir(root):
+        if not entry.is_dir():
+            continue
+
+        match = legacy_pattern.match(entry.name)
+        if match:
+            if int(match.group(1)) not in record_ids and _older_than(entry.path, min_age):
+                orphans.append(("legacy", entry.path))
+            continue
+
+        if len(entry.name) != 2:
+            continue
+
+        for blob in os.scandir(entry.path):
+            if not _older_than(blob.path, min_age):
+                continue
+
+            if _STAGING_PATTERN.match(blob.name):
+                orphans.append(("staging", blob.path))
+            elif image.is_image_hash(blob.name) and blob.name not in referenced:
+                orphans.append(("blob", blob.path))
+
+    return sorted(orphans)
+
+
+def collect_orphans(root: str, table: str, key: str, prefix: str, dry_run: bool = False,
+                    min_age: float = ORPHAN_MIN_AGE, rate: float = 0) -> list[tuple[str, str]]:
+    """Delete what ``find_orphans`` finds, at most ``rate`` per second (0 for no limit).
+
+    Images are deleted through the same reference check as a regular
+    release, so an image picked up by an upload in the meantime is kept.
+    Returns what was deleted, or would have been with ``dry_run``.
+    """
+
+    orphans = find_orphans(root, table, key, prefix, min_age)
+    if dry_run:
+        return orphans
+
+    for kind, path in orphans:
+        if kind == "blob":
+            _release(root, table, os.path.basename(path), min_age)
+        else:
+            shutil.rmtree(path, ignore_errors=True)
+
+            if kind == "staging":
+                try:
+                    os.rmdir(os.path.dirname(path))
+                except OSError:
+                    pass  # Other images share the prefix directory
+
+        if rate > 0:
+            time.sleep(1 / rate)
+
+    logger.info(f"Collected {len(orphans)} orphaned images under {root}")
+
+    return orphans
+
+
+def collect_shoe_images(**options) -> list[tuple[str, str]]:
+    return collect_orphans(Settings.shoes.path, "shoes", "shoe_id", "shoe", **options)
+
+
+def collect_profile_images(**options) -> list[tuple[str, str]]:
+    return collect_orphans(Settings.profiles.path, "users", "user_id", "user", **options)
@@ -0,0 +1,141 @@
+import asyncio
+import logging
+import os
+import socket
+from pathlib import Path
+from typing import Any, Callable
+
+import orjson
+
+from ..Settings import Settings
+from .database import Database
+from .metrics import metrics
+from .responses import dumps
+
+logger = logging.getLogger(__name__)
+
+
+class InvalidationBus:
+    """Relays cache invalidations and catalog events between the workers of a host.
+
+    Every worker binds a Unix datagram socket named after its pid in
+    ``Settings.bus.path`` and sends its messages to all the other sockets
+    in there, no broker involved. A message is a kind and a payload;
+    ``on(kind, handler)`` decides what a worker does with the ones it
+    receives. Writes committed by this worker are relayed as ``write``
+    messages and reported to ``Database.on_write`` listeners of the others,
+    which is what drops their catalog index, reference data and cached
+    responses.
+
+    Messages are best effort: one that can't be delivered is dropped and
+    logged, the caches still expire after ``catalog.max_age`` and
+    ``cache.ttl`` seconds.
+    """
+
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        if not hasattr(self, '_initialized'):
+            self._initialized = True
+            self._db = Database()
+            self._handlers: dict[str, Callable[[Any], None]] = {}
+            self._socket: socket.socket | None = None
+            self._path: Path | None = None
+            self._loop: asyncio.AbstractEventLoop | None = None
+            self.on("write", lambda table: self._db.notify_write(table, local=False))
+
+    @property
+    def running(self) -> bool:
+        return self._socket is not None
+
+    def on(self, kind: str, handler: Callable[[Any], None]) -> None:
+        """Call ``handler(payload)`` for ``kind`` messages from other workers."""
+        self._handlers[kind] = handler
+
+    def start(self) -> None:
+        """Bind this worker's socket and start receiving, on the running loop."""
+
+        if not Settings.bus.enabled or self.running:
+            return
+
+        if not hasattr(socket, "AF_UNIX"):
+            logger.warning("Unix sockets aren't available, caches of other workers aren't invalidated")
+            return
+
+        directory = Path(Settings.bus.path)
+        directory.mkdir(parents=True, exist_ok=True)
+
+        self._path = directory / f"{os.getpid()}.sock"
+        self._path.unlink(missing_ok=True)
+
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._socket.setblocking(False)
+        self._socket.bind(str(self._path))
+
+        self._loop = asyncio.get_running_loop()
+        self._loop.add_reader(self._socket.fileno(), self._receive)
+        self._db.on_local_write(self._publish_write)
+
+        logger.info(f"Invalidation bus listening on {self._path}")
+
+    def stop(self) -> None:
+        if self._socket is None:
+            return
+
+        if self._loop is not None:
+            self._loop.remove_reader(self._socket.fileno())
+
+        self._socket.close()
+        self._socket = None
+
+        if self._path is not None:
+            self._path.unlink(missing_ok=True)
+
+    def _publish_write(self, table: str) -> None:
+        self.publish("write", table)
+
+    def publish(self, kind: str, payload: Any) -> None:
+        """Send a message to every other worker, a no-op until ``start``."""
+
+        if self._socket is None:
+            return
+
+        message = dumps([kind, payload])
+
+        for peer in Path(Settings.bus.path).glob("*.sock"):
+            if peer == self._path:
+                continue
+
+            try:
+                self._socket.sendto(message, str(peer))
+                metrics.increment("bus.sent")
+            except (ConnectionRefusedError, FileNotFoundError):
+                # The worker is gone, its socket was left behind.
+                peer.unlink(missing_ok=True)
+            except OSError as e:
+                metrics.increment("bus.dropped")
+                logger.warning(f"Couldn't send {kind} to {peer.name}: {e}")
+
+    def _receive(self) -> None:
+        while self._socket is not None:
+            try:
+                message = self._socket.recv(65536)
+            except BlockingIOError:
+                return
+
+            try:
+                kind, payload = orjson.loads(message)
+                handler = self._handlers.get(kind)
+                if handler is not None:
+                    handler(payload)
+                metrics.increment("bus.received")
+            except Exception as e:
+                logger.error(f"Couldn't handle invalidation message: {e}")
+
+
+bus = InvalidationBus()
@@ -0,0 +1,106 @@
+from typing import Annotated, Any, Optional
+
+from fastapi import HTTPException, Query
+
+FORMATS = ("json", "columnar")
+
+
+class ListFormat:
+    """``?format=`` and ``?fields=`` options shared by the list endpoints.
+
+    Used as a dependency::
+
+        async def list_brands(..., fmt: ListFormat = Depends()):
+            columns = fmt.select(BRAND_COLUMNS)
+            result = db.fetchAll(f'SELECT {columns} FROM brands ...')
+            return fmt.render(result, count=count, pages=pages)
+
+    ``fields`` is a comma separated list of column names that gets pushed
+    down into the SELECT list, ``format=columnar`` returns
+    ``{"columns": [...], "rows": [[...], ...]}`` instead of a list of
+    objects so the column names aren't repeated for every row.
+    """
+
+    def __init__(self,
+                 format: Annotated[Optional[str], Query()] = None,
+                 fields: Annotated[Optional[str], Query()] = None):
+
+        if format and format not in FORMATS:
+            raise HTTPException(
+                400, f"Unknown format '{format}', expected one of {', '.join(FORMATS)}.")
+
+        self.columnar = format == "columnar"
+        self.fields: list[str] | None = None
+
+        if fields:
+            self.fields = list(dict.fromkeys(
+                field.strip() for field in fields.split(",") if field.strip()))
+
+    def wants(self, field: str) -> bool:
+        """Whether ``field`` is part of the response."""
+        return self.fields is None or field in self.fields
+
+    def select(self,
+               columns: dict[str, str],
+               default: str | None = "*",
+               extra: tuple[str, ...] = (),
+               required: tuple[str, ...] = ()) -> str:
+        """Build the SELECT list for the requested fields.
+
+        Args:
+            columns: Field name to SQL expression for every selectable column.
+            default: SELECT list used when no ``fields`` were requested,
+                ``None`` selects every column in ``columns``.
+            extra: Fields the endpoint fills in itself (e.g. nested lists),
+                accepted in ``fields`` but not selected.
+            required: Columns the endpoint needs internally, always selected.
+
+        Raises:
+            HTTPException: If an unknown field was requested.
+        """
+
+        if self.fields is None:
+            if default is None:
+                return ", ".join(f"{expression} AS {field}"
+                                 for field, expression in columns.items())
+            return default
+
+        unknown = [field for field in self.fields
+                   if field not in columns and field not in extra]
+        if unknown:
+            raise HTTPException(
+                400, f"Unknown fields: {', '.join(unknown)}")
+
+        selected = [field for field in self.fields if field in columns]
+        selected += [field for field in required if field not in selected]
+
+        if not selected:
+            selected = list(required) or [next(iter(columns))]
+
+        return ", ".join(f"{columns[field]} AS {field}" for field in selected)
+
+    def render(self, result: list[dict[str, Any]], **extra: Any) -> dict[str, Any]:
+        """Shape ``result`` for the response, ``extra`` is merged in as-is."""
+
+        if self.fields is not None:
+            columns = self.fields
+        elif result:
+            columns = list(result[0].keys())
+        else:
+            columns = []
+
+        if self.columnar:
+            return {
+                "columns": columns,
+                "rows": [[row.get(column) for column in columns] for row in result],
+                **extra
+            }
+
+        if self.fields is not None:
+            result = [{column: row.get(column) for column in columns}
+                      for row in result]
+
+        return {
+            "result": result,
+            **extra
+        }
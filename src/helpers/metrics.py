@@ -0,0 +1,37 @@
+from collections import defaultdict
+
+
+class Metrics:
+    """Counters and gauges of this worker, served by ``GET /api/metrics``.
+
+    Counters only go up (e.g. cache hits), gauges hold the last value set
+    (e.g. bytes held by a cache, how long warm-up took).
+    """
+
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        if not hasattr(self, '_initialized'):
+            self._initialized = True
+            self._counters: defaultdict[str, int] = defaultdict(int)
+            self._gauges: dict[str, float] = {}
+
+    def increment(self, name: str, amount: int = 1) -> None:
+        self._counters[name] += amount
+
+    def set(self, name: str, value: float) -> None:
+        self._gauges[name] = value
+
+    def snapshot(self) -> dict[str, dict[str, float]]:
+        return {
+            "counters": dict(sorted(self._counters.items())),
+            "gauges": dict(sorted(self._gauges.items())),
+        }
+
+
+metrics = Metrics()
@@ -0,0 +1,93 @@
+import logging
+from typing import Callable
+
+from .database import Database
+from .image_store import import_image_directories, render_shoe_placeholders
+
+logger = logging.getLogger(__name__)
+
+# Writes recorded in catalog_changes for catalog versioning: table the
+# trigger is on -> (catalog table, id column). Changes to the categories
+# and demographics of a shoe count as changes to the shoe.
+_CATALOG_CHANGE_SOURCES = {
+    "shoes": ("shoes", "shoe_id"),
+    "shoe_categories": ("shoes", "shoe_id"),
+    "shoe_demographics": ("shoes", "shoe_id"),
+    "variants": ("variants", "variant_id"),
+    "brands": ("brands", "brand_id"),
+    "categories": ("categories", "category_id"),
+    "sizes": ("sizes", "size_id"),
+}
+
+_CATALOG_CHANGE_TRIGGERS = [
+    statement
+    for source, (table, key) in _CATALOG_CHANGE_SOURCES.items()
+    for event, row in (("INSERT", "NEW"), ("UPDATE", "NEW"), ("DELETE", "OLD"))
+    for statement in (
+        f"DROP TRIGGER IF EXISTS catalog_{source}_{event.lower()}",
+        f"CREATE TRIGGER catalog_{source}_{event.lower()} AFTER {event} ON {source} FOR EACH ROW "
+        f"INSERT INTO catalog_changes (table_name, record_id) VALUES ('{table}', {row}.{key})",
+    )
+]
+
+# Schema changes the code relies on, applied in order at startup. Each one
+# is recorded in schema_migrations and never runs twice, so entries must
+# never be edited or reordered once released, only appended.
+MIGRATIONS: list[tuple[str, list[str] | Callable[[], None]]] = [
+    ("0001_image_hashes", [
+        r'ALTER TABLE shoes ADD COLUMN image_hash CHAR(16) NULL, ADD INDEX idx_shoes_image_hash (image_hash)',
+        r'ALTER TABLE users ADD COLUMN image_hash CHAR(16) NULL, ADD INDEX idx_users_image_hash (image_hash)',
+    ]),
+    ("0002_import_image_directories", import_image_directories),
+    ("0003_shoe_image_placeholders", [
+        r'ALTER TABLE shoes ADD COLUMN image_placeholder VARCHAR(1024) NULL',
+    ]),
+    ("0004_render_shoe_image_placeholders", render_shoe_placeholders),
+    ("0005_catalog_changes", [
+        r"""CREATE TABLE IF NOT EXISTS catalog_changes (
+            version BIGINT UNSIGNED NOT NULL AUTO_INCREMENT PRIMARY KEY,
+            table_name VARCHAR(32) NOT NULL,
+            record_id INT NOT NULL,
+            changed_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            INDEX idx_catalog_changes_changed_at (changed_at)
+        )""",
+        *_CATALOG_CHANGE_TRIGGERS,
+    ]),
+]
+
+# Lets only one worker migrate when several start at once.
+LOCK_NAME = "schema_migrations"
+LOCK_TIMEOUT = 300
+
+
+def apply_migrations() -> None:
+    db = Database()
+
+    db.commitOne(r"""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            name VARCHAR(255) NOT NULL PRIMARY KEY,
+            applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )""")
+
+    lock = db.fetchOne(r'SELECT GET_LOCK(%s, %s) AS locked', (LOCK_NAME, LOCK_TIMEOUT))
+    if not lock or not lock["locked"]:
+        raise RuntimeError("Timed out waiting for another worker to apply migrations.")
+
+    try:
+        applied = {row["name"] for row in db.fetchAll(r'SELECT name FROM schema_migrations')}
+
+        for name, migration in MIGRATIONS:
+            if name in applied:
+                continue
+
+            logger.info(f"Applying migration {name}")
+
+            if callable(migration):
+                migration()
+            else:
+                for statement in migration:
+                    db.commitOne(statement)
+
+            db.commitOne(r'INSERT INTO schema_migrations (name) VALUES (%s)', (name,))
+    finally:
+        db.fetchOne(r'SELECT RELEASE_LOCK(%s) AS released', (LOCK_NAME,))
@@ -0,0 +1,60 @@
+import time
+
+from ..Settings import Settings
+from .database import Database
+
+# Tables the permissions of a user are derived from.
+PERMISSION_TABLES = {"users", "roles", "user_roles", "role_permissions", "permissions"}
+
+
+class PermissionMap:
+    """Permission codes of every user, read with a single query.
+
+    Checked on nearly every request, so it's kept in memory and dropped
+    when one of ``PERMISSION_TABLES`` is written to (every commit is
+    reported through ``Database.on_write``), or after
+    ``Settings.cache.ttl`` seconds.
+    """
+
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        if not hasattr(self, '_initialized'):
+            self._initialized = True
+            self._db = Database()
+            self._permissions: dict[int, list[str]] | None = None
+            self._loaded_at = 0.0
+            self._db.on_write(self._on_write)
+
+    def _on_write(self, table: str) -> None:
+        if table in PERMISSION_TABLES:
+            self._permissions = None
+
+    def load(self) -> dict[int, list[str]]:
+        """Permission codes by user id, of the users that have any."""
+
+        permissions = self._permissions
+        if permissions is None or time.monotonic() - self._loaded_at > Settings.cache.ttl:
+            rows = self._db.fetchAll(r"""
+                SELECT DISTINCT ur.user_id, p.permission_code
+                FROM user_roles ur
+                JOIN role_permissions rp ON rp.role_id = ur.role_id
+                JOIN permissions p ON rp.permission_id = p.permission_id
+                """)
+
+            permissions = {}
+            for row in rows:
+                permissions.setdefault(row["user_id"], []).append(row["permission_code"])
+
+            self._permissions = permissions
+            self._loaded_at = time.monotonic()
+
+        return permissions
+
+    def permissions(self, user_id: int | None) -> list[str]:
+        return list(self.load().get(user_id, ()))
@@ -0,0 +1,127 @@
+import hashlib
+import time
+from dataclasses import dataclass
+from typing import Any
+
+from fastapi import Request, Response
+
+from ..Settings import Settings
+from .database import Database
+from .image_serving import REVALIDATE_CACHE_CONTROL, etag_matches
+from .responses import FastJSONResponse, dumps, negotiated_media_type
+
+# Small, rarely changing tables kept in memory, and their id columns.
+REFERENCE_TABLES = {
+    "brands": "brand_id",
+    "sizes": "size_id",
+    "categories": "category_id",
+    "demographics": "demographic_id",
+}
+
+SIZE_FIELDS = ("us_size", "uk_size", "eu_size")
+
+
+@dataclass
+class ReferenceTable:
+    rows: list[dict[str, Any]]
+    by_id: dict[int, dict[str, Any]]
+    etag: str
+    loaded_at: float
+
+
+class ReferenceData:
+    """In-memory copies of brands, sizes, categories and demographics.
+
+    Each table is read once and dropped again when it's written to (every
+    commit is reported through ``Database.on_write``), so the CRUD
+    endpoints invalidate it without knowing about it. Copies are also
+    reloaded after ``Settings.catalog.max_age`` seconds for writes made by
+    other worker processes.
+    """
+
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        if not hasattr(self, '_initialized'):
+            self._initialized = True
+            self._db = Database()
+            self._tables: dict[str, ReferenceTable] = {}
+            self._db.on_write(self._on_write)
+
+    def _on_write(self, table: str) -> None:
+        self._tables.pop(table, None)
+
+    def table(self, name: str) -> ReferenceTable:
+        table = self._tables.get(name)
+        if table is None or time.monotonic() - table.loaded_at > Settings.catalog.max_age:
+            key = REFERENCE_TABLES[name]
+            rows = self._db.fetchAll(f'SELECT * FROM {name} ORDER BY {key}')
+
+            table = self._tables[name] = ReferenceTable(
+                rows=rows,
+                by_id={row[key]: row for row in rows},
+                etag=hashlib.sha256(dumps(rows)).hexdigest()[:16],
+                loaded_at=time.monotonic(),
+            )
+
+        return table
+
+    def rows(self, name: str) -> list[dict[str, Any]]:
+        return self.table(name).rows
+
+    def etag(self, *names: str) -> str:
+        """ETag of a response built from the tables ``names`` and nothing else."""
+
+        versions = ",".join(self.table(name).etag for name in names)
+        media_type = negotiated_media_type.get() or ""
+        return f'"{hashlib.sha256(f"{versions};{media_type}".encode()).hexdigest()[:16]}"'
+
+    def with_sizes(self, variants: list[dict[str, Any]], sort: bool = True) -> list[dict[str, Any]]:
+        """Add the US/UK/EU sizes to variant rows, what joining ``sizes`` used to do.
+
+        Variants of unknown sizes are left out like the join left them out,
+        ``sort`` orders them by US size.
+        """
+
+        sizes = self.table("sizes").by_id
+
+        result = []
+        for variant in variants:
+            size = sizes.get(variant["size_id"])
+            if size is not None:
+                variant.update({field: size[field] for field in SIZE_FIELDS})
+                result.append(variant)
+
+        if sort:
+            result.sort(key=_us_size_key)
+
+        return result
+
+
+def _us_size_key(variant: dict[str, Any]) -> tuple:
+    # Unknown sizes first like ORDER BY put them, then by number, sizes
+    # that aren't numbers last.
+    size = variant["us_size"]
+    if size is None:
+        return (0, 0.0, "")
+    try:
+        return (1, float(size), "")
+    except (TypeError, ValueError):
+        return (2, 0.0, str(size))
+
+
+def reference_response(request: Request, content: Any, *tables: str) -> Response:
+    """``content`` built from the reference ``tables``, or a 304 when the client has it."""
+
+    etag = ReferenceData().etag(*tables)
+    headers = {"ETag": etag, "Cache-Control": REVALIDATE_CACHE_CONTROL}
+
+    if etag_matches(request.headers.get("if-none-match", ""), etag):
+        return Response(status_code=304, headers=headers)
+
+    return FastJSONResponse(content, headers=headers)
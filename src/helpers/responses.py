@@ -0,0 +1,136 @@
+import dataclasses
+from contextvars import ContextVar
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from typing import Any, Mapping
+
+import msgpack
+import orjson
+from fastapi.responses import JSONResponse
+from starlette.background import BackgroundTask
+
+JSON_MEDIA_TYPE = "application/json"
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+
+MSGPACK_MEDIA_TYPES = (MSGPACK_MEDIA_TYPE, "application/x-msgpack")
+
+# Media type picked for the current request by the negotiate_content
+# dependency, None outside of the negotiated routers.
+negotiated_media_type: ContextVar[str | None] = ContextVar(
+    "negotiated_media_type", default=None)
+
+
+def serialize_default(obj: Any) -> Any:
+    """Fallback for values orjson can't serialize on its own.
+
+    datetimes, dates, times and dataclasses are handled natively by orjson,
+    this only covers what MySQL hands back on top of that.
+    """
+
+    if isinstance(obj, Decimal):
+        return float(obj)
+
+    if isinstance(obj, timedelta):
+        return obj.total_seconds()
+
+    if isinstance(obj, (bytes, bytearray)):
+        return obj.decode()
+
+    if isinstance(obj, set):
+        return list(obj)
+
+    if hasattr(obj, "model_dump"):
+        return obj.model_dump()
+
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def pack_default(obj: Any) -> Any:
+    """msgpack counterpart of serialize_default.
+
+    Dates are sent as ISO 8601 strings so both wire formats decode to the
+    same values on the client.
+    """
+
+    if isinstance(obj, (datetime, date, time)):
+        return obj.isoformat()
+
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        return dataclasses.asdict(obj)
+
+    return serialize_default(obj)
+
+
+def dumps(content: Any) -> bytes:
+    return orjson.dumps(
+        content,
+        default=serialize_default,
+        option=orjson.OPT_NON_STR_KEYS
+    )
+
+
+def packb(content: Any) -> bytes:
+    return msgpack.packb(content, default=pack_default, use_bin_type=True)
+
+
+def select_media_type(accept: str) -> str:
+    """Pick JSON or msgpack from an Accept header.
+
+    An explicit application/json wins ties, wildcards don't.
+    """
+
+    best, best_q = JSON_MEDIA_TYPE, 0.0
+    for part in accept.split(","):
+        media_type, _, params = part.strip().partition(";")
+        media_type = media_type.strip().lower()
+
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+
+        if media_type in MSGPACK_MEDIA_TYPES and q > best_q:
+            best, best_q = MSGPACK_MEDIA_TYPE, q
+        elif media_type == JSON_MEDIA_TYPE and q >= best_q and q > 0:
+            best, best_q = JSON_MEDIA_TYPE, q
+        elif media_type in ("application/*", "*/*") and q > best_q:
+            best, best_q = JSON_MEDIA_TYPE, q
+
+    return best
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson.
+
+    Rows from the dictionary cursors can be passed as-is, datetime and
+    Decimal columns don't need converting by hand anymore.
+
+    When the request negotiated ``application/msgpack`` (see
+    ``depedencies.negotiate_content``) the same content is sent as
+    MessagePack instead.
+    """
+
+    def __init__(self,
+                 content: Any,
+                 status_code: int = 200,
+                 headers: Mapping[str, str] | None = None,
+                 media_type: str | None = None,
+                 background: BackgroundTask | None = None) -> None:
+
+        negotiated = negotiated_media_type.get()
+        if negotiated is not None and media_type is None:
+            media_type = negotiated
+
+        super().__init__(content, status_code, headers, media_type, background)
+
+        if negotiated is not None:
+            self.headers.add_vary_header("Accept")
+
+    def render(self, content: Any) -> bytes:
+        if self.media_type == MSGPACK_MEDIA_TYPE:
+            return packb(content)
+        return dumps(content)
@@ -0,0 +1,157 @@
+import functools
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Hashable
+
+from cachetools import LRUCache
+from fastapi import Request, Response
+
+from ..Settings import Settings
+from .database import Database
+from .metrics import metrics
+from .responses import FastJSONResponse, negotiated_media_type
+
+
+def request_key(kwargs: dict[str, Any]) -> tuple:
+    """Key of a GET request from the arguments of its endpoint.
+
+    Path, query parameters, the caller's permissions (when the endpoint
+    takes ``user_perms``) and the negotiated media type.
+    """
+
+    request: Request = kwargs["request"]
+    return (
+        request.url.path,
+        tuple(sorted(request.query_params.multi_items())),
+        tuple(sorted(kwargs.get("user_perms") or ())),
+        negotiated_media_type.get(),
+    )
+
+
+@dataclass
+class CachedResponse:
+    body: bytes
+    status_code: int
+    raw_headers: list[tuple[bytes, bytes]]
+    expires_at: float
+    versions: tuple[int, ...]
+
+
+class RouteCache:
+    """Rendered responses of GET endpoints that only read slowly changing tables.
+
+    Entries are keyed by path, query parameters, the caller's permissions
+    and the negotiated media type, and tagged with the tables the endpoint
+    reads. Every table has a version that's bumped when it's written to
+    (every commit is reported through ``Database.on_write``); an entry
+    stored under older versions of its tables is stale and dropped when
+    it's next looked up. Entries also expire after ``Settings.cache.ttl``
+    seconds, which picks up writes made by other workers. The cache is an
+    LRU bounded by ``Settings.cache.max_size`` bytes of response bodies.
+    """
+
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        if not hasattr(self, '_initialized'):
+            self._initialized = True
+            self.max_size = Settings.cache.max_size
+            self._entries: LRUCache = LRUCache(
+                maxsize=max(self.max_size, 1), getsizeof=lambda entry: len(entry.body) or 1)
+            self._versions: dict[str, int] = {}
+            Database().on_write(self.invalidate)
+
+    def invalidate(self, table: str) -> None:
+        """Make every entry reading ``table`` stale."""
+
+        self._versions[table] = self._versions.get(table, 0) + 1
+        metrics.increment("route_cache.invalidations")
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def _versions_of(self, tables: tuple[str, ...]) -> tuple[int, ...]:
+        return tuple(self._versions.get(table, 0) for table in tables)
+
+    def get(self, key: Hashable, tables: tuple[str, ...]) -> Response | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        if entry.expires_at < time.monotonic() or entry.versions != self._versions_of(tables):
+            self._entries.pop(key, None)
+            return None
+
+        response = Response(entry.body, entry.status_code)
+        response.raw_headers = list(entry.raw_headers)
+        return response
+
+    def put(self, key: Hashable, response: Response, ttl: float, versions: tuple[int, ...]) -> None:
+        if not 0 < len(response.body) <= self.max_size:
+            return
+
+        self._entries[key] = CachedResponse(
+            body=bytes(response.body),
+            status_code=response.status_code,
+            raw_headers=list(response.raw_headers),
+            expires_at=time.monotonic() + ttl,
+            versions=versions,
+        )
+        metrics.set("route_cache.entries", len(self._entries))
+        metrics.set("route_cache.bytes", self._entries.currsize)
+
+    def cached(self, *tables: str, ttl: float | None = None):
+        """Cache the responses of a GET endpoint reading ``tables``.
+
+        The endpoint has to be async and take ``request: Request``; when it
+        takes ``user_perms`` the permissions are part of the key. Only 200
+        responses are cached. Goes under the route decorator::
+
+            @router.get("/permissions", response_class=FastJSONResponse)
+            @route_cache.cached("permissions")
+            async def list_permissions(request: Request): ...
+        """
+
+        tables = tuple(sorted(set(tables)))
+
+        def decorator(endpoint: Callable[..., Awaitable[Any]]):
+            name = endpoint.__name__
+
+            @functools.wraps(endpoint)
+            async def wrapper(*args, **kwargs):
+                if not Settings.cache.enabled:
+                    return await endpoint(*args, **kwargs)
+
+                key = request_key(kwargs)
+
+                response = self.get(key, tables)
+                if response is not None:
+                    metrics.increment("route_cache.hits")
+                    metrics.increment(f"route_cache.hits.{name}")
+                    return response
+
+                metrics.increment("route_cache.misses")
+                metrics.increment(f"route_cache.misses.{name}")
+
+                # Versions from before the endpoint ran, a write racing
+                # with it leaves the entry stale rather than wrong.
+                versions = self._versions_of(tables)
+                result = await endpoint(*args, **kwargs)
+
+                response = result if isinstance(result, Response) else FastJSONResponse(result)
+                if response.status_code == 200 and hasattr(response, "body"):
+                    self.put(key, response, Settings.cache.ttl if ttl is None else ttl, versions)
+
+                return response
+
+            return wrapper
+
+        return decorator
+
+
+route_cache = RouteCache()
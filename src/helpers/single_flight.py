@@ -0,0 +1,113 @@
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Hashable
+
+from fastapi import Response
+
+from .metrics import metrics
+from .responses import FastJSONResponse
+from .route_cache import request_key
+
+
+# Threads coalesced endpoints run on, every one of them opens its own
+# database connection (see ``Database``).
+MAX_THREADS = 4
+
+
+class _Abandoned(Exception):
+    """The leading request was cancelled before it had a result."""
+
+
+def _copy(response: Response) -> Response:
+    # Every waiter sends its own response, middlewares change headers in place.
+    copy = Response(response.body, response.status_code)
+    copy.raw_headers = list(response.raw_headers)
+    return copy
+
+
+class SingleFlight:
+    """Serves identical concurrent GETs from one computation.
+
+    The first request for a key (see ``route_cache.request_key``) runs
+    the endpoint on one of ``MAX_THREADS`` threads, so the event loop
+    takes further requests meanwhile; the ones for the same key arriving
+    before it's done wait for its result instead of querying again.
+    Nothing is kept once the computation is done, the next request
+    computes afresh.
+    """
+
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        if not hasattr(self, '_initialized'):
+            self._initialized = True
+            self._flights: dict[Hashable, asyncio.Future[Response]] = {}
+            self._executor = ThreadPoolExecutor(MAX_THREADS, thread_name_prefix="single-flight")
+
+    def coalesce(self, endpoint: Callable[..., Any]):
+        """Coalesce concurrent calls of a read-only GET endpoint.
+
+        The endpoint is a plain (blocking) function taking ``request:
+        Request`` and returning a response with a body (or content for
+        ``FastJSONResponse``); it's called on a worker thread. What it
+        caches has to be replaced whole rather than changed in place, as
+        ``CatalogIndex`` and ``ReferenceData`` do. Goes under the route
+        decorator, and under ``route_cache.cached`` when both are used.
+        """
+
+        name = endpoint.__name__
+
+        @functools.wraps(endpoint)
+        async def wrapper(*args, **kwargs):
+            key = (name, request_key(kwargs))
+
+            flight = self._flights.get(key)
+            if flight is not None:
+                metrics.increment("single_flight.coalesced")
+                metrics.increment(f"single_flight.coalesced.{name}")
+                try:
+                    return _copy(await asyncio.shield(flight))
+                except _Abandoned:
+                    # The client of the leading request went away, compute
+                    # it for this one instead.
+                    return await wrapper(*args, **kwargs)
+
+            loop = asyncio.get_running_loop()
+            flight = self._flights[key] = loop.create_future()
+            metrics.increment("single_flight.computed")
+            metrics.increment(f"single_flight.computed.{name}")
+
+            # The negotiated media type is a context variable.
+            call = functools.partial(contextvars.copy_context().run, endpoint, *args, **kwargs)
+
+            try:
+                result = await loop.run_in_executor(self._executor, call)
+                response = result if isinstance(result, Response) else FastJSONResponse(result)
+            except asyncio.CancelledError:
+                flight.set_exception(_Abandoned())
+                flight.exception()
+                raise
+            except Exception as e:
+                flight.set_exception(e)
+                # Retrieved here, nobody might have been waiting for it.
+                flight.exception()
+                raise
+            else:
+                flight.set_result(response)
+            finally:
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+
+            return _copy(response)
+
+        return wrapper
+
+
+single_flight = SingleFlight()
@@ -0,0 +1,14 @@
+from fastapi.templating import Jinja2Templates
+
+# One environment for every page, so each template is compiled only once.
+templates = Jinja2Templates(directory="assets/public/templates")
+
+
+def precompile_templates() -> int:
+    """Compile every page template up front, returns how many there are."""
+
+    names = [name for name in templates.env.list_templates() if name.endswith(".html")]
+    for name in names:
+        templates.env.get_template(name)
+
+    return len(names)
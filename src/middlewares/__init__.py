@@ -0,0 +1,2 @@
+from .compression import CompressionMiddleware
+from .upload_limit import UploadLimitMiddleware
@@ -0,0 +1,223 @@
+import zlib
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli is optional
+    brotli = None
+
+
+# Already compressed payloads, compressing them again only burns CPU.
+EXCLUDED_MEDIA_TYPES = (
+    "text/event-stream",
+    "image/",
+    "video/",
+    "audio/",
+    "application/zip",
+    "application/gzip",
+)
+
+
+def parse_accept_encoding(header: str) -> dict[str, float]:
+    """Parse an Accept-Encoding header into ``{coding: q}``."""
+
+    codings = {}
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+
+        codings[coding] = q
+
+    return codings
+
+
+class GZipCompressor:
+    content_encoding = "gzip"
+
+    def __init__(self, level: int) -> None:
+        # wbits=31 makes zlib write the gzip header and trailer.
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, body: bytes, *, more_body: bool) -> bytes:
+        data = self._compressor.compress(body)
+        if more_body:
+            return data + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+        return data + self._compressor.flush(zlib.Z_FINISH)
+
+
+class BrotliCompressor:
+    content_encoding = "br"
+
+    def __init__(self, quality: int) -> None:
+        self._compressor = brotli.Compressor(quality=quality)  # type: ignore
+
+    def compress(self, body: bytes, *, more_body: bool) -> bytes:
+        data = self._compressor.process(body)
+        if more_body:
+            return data + self._compressor.flush()
+        return data + self._compressor.finish()
+
+
+class CompressionResponder:
+    """Compresses a single response once it is known to be big enough.
+
+    Bodies are buffered until ``minimum_size`` bytes have been seen, so
+    responses streamed in small chunks (e.g. through BaseHTTPMiddleware)
+    still get the size check.
+    """
+
+    def __init__(self, app: ASGIApp, compressor: GZipCompressor | BrotliCompressor | None, minimum_size: int) -> None:
+        self.app = app
+        self.compressor = compressor
+        self.minimum_size = minimum_size
+
+        self.send: Send
+        self.initial_message: Message = {}
+        self.buffer = b""
+        self.started = False
+        self.passthrough = False
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        self.send = send
+        await self.app(scope, receive, self.send_with_compression)
+
+    async def start(self, body: bytes, more_body: bool, compress: bool) -> None:
+        self.started = True
+
+        headers = MutableHeaders(raw=self.initial_message["headers"])
+        headers.add_vary_header("Accept-Encoding")
+
+        if compress:
+            body = self.compressor.compress(  # type: ignore
+                body, more_body=more_body)
+            headers["Content-Encoding"] = self.compressor.content_encoding  # type: ignore
+            if more_body:
+                del headers["Content-Length"]
+            else:
+                headers["Content-Length"] = str(len(body))
+
+        await self.send(self.initial_message)
+        await self.send({
+            "type": "http.response.body",
+            "body": body,
+            "more_body": more_body
+        })
+
+    async def send_with_compression(self, message: Message) -> None:
+        message_type = message["type"]
+
+        if message_type == "http.response.start":
+            # Hold the headers back until we know whether we compress.
+            self.initial_message = message
+            headers = Headers(raw=message["headers"])
+            self.passthrough = (
+                self.compressor is None
+                or "content-encoding" in headers
+                or headers.get("content-type", "").startswith(EXCLUDED_MEDIA_TYPES)
+            )
+            return
+
+        if message_type != "http.response.body":
+            # e.g. http.response.pathsend, never compressed.
+            if not self.started:
+                self.started = True
+                await self.send(self.initial_message)
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.passthrough:
+            if not self.started:
+                await self.start(self.buffer + body, more_body, compress=False)
+            else:
+                await self.send(message)
+            return
+
+        if not self.started:
+            self.buffer += body
+
+            if more_body and len(self.buffer) < self.minimum_size:
+                return
+
+            await self.start(self.buffer, more_body,
+                             compress=len(self.buffer) >= self.minimum_size)
+            self.buffer = b""
+            return
+
+        await self.send({
+            "type": "http.response.body",
+            "body": self.compressor.compress(  # type: ignore
+                body, more_body=more_body),
+            "more_body": more_body
+        })
+
+
+class CompressionMiddleware:
+    """Negotiated brotli/gzip compression for responses.
+
+    Responses smaller than ``minimum_size``, responses that already carry a
+    Content-Encoding, media in EXCLUDED_MEDIA_TYPES and the paths listed in
+    ``excluded_paths`` are sent as they are.
+    """
+
+    def __init__(self,
+                 app: ASGIApp,
+                 minimum_size: int = 1024,
+                 level: int = 6,
+                 brotli_quality: int = 5,
+                 excluded_paths: list[str] | None = None) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.level = level
+        self.brotli_quality = brotli_quality
+        self.excluded_paths = [path.rstrip("/") for path in excluded_paths or []]
+
+    def is_excluded(self, path: str) -> bool:
+        for excluded in self.excluded_paths:
+            if path == excluded or path.startswith(excluded + "/"):
+                return True
+        return False
+
+    def select_encoding(self, accept_encoding: str) -> str | None:
+        codings = parse_accept_encoding(accept_encoding)
+        wildcard = codings.get("*", 0.0)
+
+        candidates = ["br", "gzip"] if brotli is not None else ["gzip"]
+
+        best, best_q = None, 0.0
+        for coding in candidates:
+            q = codings.get(coding, wildcard)
+            if q > best_q:
+                best, best_q = coding, q
+
+        return best
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or self.is_excluded(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        encoding = self.select_encoding(headers.get("accept-encoding", ""))
+
+        compressor: GZipCompressor | BrotliCompressor | None = None
+        if encoding == "br":
+            compressor = BrotliCompressor(self.brotli_quality)
+        elif encoding == "gzip":
+            compressor = GZipCompressor(self.level)
+
+        await CompressionResponder(self.app, compressor, self.minimum_size)(scope, receive, send)
@@ -0,0 +1,70 @@
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Room for the other form fields and the multipart boundaries and headers
+# on top of the file itself.
+FORM_OVERHEAD = 64 * 1024
+
+
+def too_large_message(limit: int) -> str:
+    return f"Upload is too large, the limit is {limit / 1024 / 1024:.1f} MB."
+
+
+class UploadLimitMiddleware:
+    """Caps the request body size of upload endpoints.
+
+    ``limits`` maps a path to the largest file it accepts. Requests
+    announcing a larger Content-Length are refused with 413 before the app
+    sees them, chunked or lying bodies are counted while they stream in
+    and cut off with 413 as soon as they go over, so an oversized upload is
+    never spooled in full.
+    """
+
+    def __init__(self,
+                 app: ASGIApp,
+                 limits: dict[str, int],
+                 overhead: int = FORM_OVERHEAD) -> None:
+        self.app = app
+        self.limits = {path.rstrip("/"): limit for path, limit in limits.items()}
+        self.overhead = overhead
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        limit = self.limits.get(scope["path"].rstrip("/"))
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+
+        max_body_size = limit + self.overhead
+
+        content_length = Headers(scope=scope).get("content-length", "")
+        if content_length.isdigit() and int(content_length) > max_body_size:
+            response = JSONResponse({
+                "success": False,
+                "message": too_large_message(limit)
+            },
+                status_code=413
+            )
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive() -> Message:
+            nonlocal received
+
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > max_body_size:
+                    # Raised into the form parser, FastAPI passes it through.
+                    raise HTTPException(413, too_large_message(limit))
+
+            return message
+
+        await self.app(scope, limited_receive, send)
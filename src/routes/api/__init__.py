@@ -1,6 +1,7 @@
-from fastapi import APIRouter, Request
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, Depends, Request
 
+from ...depedencies import negotiate_content
+from ...helpers import FastJSONResponse
 from .auth import auth_router
 from .inventory import inventory_router
 from .management import management_router
@@ -8,7 +9,9 @@ from .sales import sales_router
 from .users import users_router
 
 
-api_router = APIRouter(prefix="/api")
+api_router = APIRouter(prefix="/api",
+                       default_response_class=FastJSONResponse,
+                       dependencies=[Depends(negotiate_content)])
 
 api_router.include_router(auth_router)
 api_router.include_router(inventory_router)
@@ -2,9 +2,9 @@ from typing import Annotated, Optional
 from datetime import datetime
 
 from fastapi import APIRouter, Request, Form
-from fastapi.responses import JSONResponse, RedirectResponse
+from fastapi.responses import RedirectResponse
 
-from ...helpers import Database
+from ...helpers import Database, FastJSONResponse
 from ...exceptions import DatabaseException
 from ...models.users import User
 from ...models.session import Session
@@ -16,7 +16,7 @@ auth_router = APIRouter(prefix="/auth")
 db = Database()
 
 
-@auth_router.post("/register", response_class=JSONResponse)
+@auth_router.post("/register", response_class=FastJSONResponse)
 async def register(request: Request,
                    first_name: str = Form(),
                    last_name: str = Form(),
@@ -25,7 +25,7 @@ async def register(request: Request,
                    email: str = Form()):
 
     if not request.session.get("otp_verified"):
-        return JSONResponse({
+        return FastJSONResponse({
             "success": False,
             "message": "Unathorized Registration."
         },
@@ -50,12 +50,12 @@ async def register(request: Request,
 
         request.session.pop("otp_verified", None)
 
-        return JSONResponse({
+        return FastJSONResponse({
             "success": True,
             "message": "User registered successfully"
         }, status_code=201)
     except Exception as e:
-        return JSONResponse({
+        return FastJSONResponse({
             "success": False,
             "message": f"{e}"
         },
@@ -63,11 +63,11 @@ async def register(request: Request,
         )
 
 
-@auth_router.post("/login", response_class=JSONResponse)
+@auth_router.post("/login", response_class=FastJSONResponse)
 async def login(request: Request, email: str = Form(), password: str = Form()):
 
     if request.session.get("authenticated"):
-        return JSONResponse({
+        return FastJSONResponse({
             "success": False,
             "message": f"A user is already logged in."
         },
@@ -91,7 +91,7 @@ async def login(request: Request, email: str = Form(), password: str = Form()):
                 "message": "User logged in successfully."
             }
         except ValueError as e:
-            return JSONResponse({
+            return FastJSONResponse({
                 "success": False,
                 "message": str(e)
             },
@@ -126,7 +126,7 @@ async def login(request: Request, email: str = Form(), password: str = Form()):
             "message": "User logged in successfully."
         }
     except Exception as e:
-        return JSONResponse({
+        return FastJSONResponse({
             "success": False,
             "message": f"{e}"
         },
@@ -138,7 +138,7 @@ async def login(request: Request, email: str = Form(), password: str = Form()):
 async def logout(request: Request):
 
     if not request.session.get("authenticated"):
-        return JSONResponse({
+        return FastJSONResponse({
             "success": False,
             "message": f"Login first."
         },
@@ -156,7 +156,7 @@ async def logout(request: Request):
 
     except Exception as e:
 
-        return JSONResponse({
+        return FastJSONResponse({
             "success": False,
             "message": f"{e}"
         },
@@ -168,7 +168,7 @@ async def logout(request: Request):
 async def request_otp(request: Request, email: str = Form(), request_new: Annotated[bool, Form()] = False):
 
     if request.session.get("authenticated"):
-        return JSONResponse({
+        return FastJSONResponse({
             "success": False,
             "message": "User is logged in"
         },
@@ -176,7 +176,7 @@ async def request_otp(request: Request, email: str = Form(), request_new: Annota
         )
 
     if email is None:
-        return JSONResponse({
+        return FastJSONResponse({
             "success": False,
             "message": "Email is invalid or empty."
         },
@@ -193,7 +193,7 @@ async def request_otp(request: Request, email: str = Form(), request_new: Annota
             otp_elapsed_time = datetime.now() - otp_timestamp
 
             if otp_elapsed_time.total_seconds() < otp_timeout:
-                return JSONResponse({
+                return FastJSONResponse({
                     "success": False,
                     "message": "OTP is still valid. Please wait for it to expire or verify the current OTP."
                 },
@@ -208,7 +208,7 @@ async def request_otp(request: Request, email: str = Form(), request_new: Annota
 
         if otp_cooldown_elapsed.total_seconds() < 30:
             remaining_cooldown = 30 - otp_cooldown_elapsed.total_seconds()
-            return JSONResponse({
+            return FastJSONResponse({
                 "success": False,
                 "message": f"OTP request is on cooldown. Please wait {int(remaining_cooldown)} seconds."
             },
@@ -225,7 +225,7 @@ async def request_otp(request: Request, email: str = Form(), request_new: Annota
         request.session["otp_timestamp"] = datetime.now().timestamp()
         request.session["otp_cooldown_timestamp"] = datetime.now().timestamp()
 
-        return JSONResponse({
+        return FastJSONResponse({
             "success": True,
             "message": "OTP Sent"
         },
@@ -233,7 +233,7 @@ async def request_otp(request: Request, email: str = Form(), request_new: Annota
         )
 
     except Exception as e:
-        return JSONResponse({
+        return FastJSONResponse({
             "success": False,
             "message": f"{type(e)}: {e}"
         },
@@ -245,7 +245,7 @@ async def request_otp(request: Request, email: str = Form(), request_new: Annota
 async def verify_otp(request: Request, otp: str = Form()):
 
     if request.session.get("authenticated"):
-        return JSONResponse({
+        return FastJSONResponse({
             "success": False,
             "message": "User is logged in"
         },
@@ -253,7 +253,7 @@ async def verify_otp(request: Request, otp: str = Form()):
         )
 
     if otp is None:
-        return JSONResponse({
+        return FastJSONResponse({
             "success": False,
             "message": "OTP is empty."
         },
@@ -263,7 +263,7 @@ async def verify_otp(request: Request, otp: str = Form()):
     # Check if OTP exists in session
     server_otp = request.session.get("otp")
     if not server_otp:
-        return JSONResponse({
+        return FastJSONResponse({
             "success": False,
             "message": "No OTP found. Please request a new OTP."
         },
@@ -283,7 +283,7 @@ async def verify_otp(request: Request, otp: str = Form()):
             request.session.pop("otp_cooldown_timestamp", None)
             request.session.pop("otp_timestamp", None)
 
-            return JSONResponse({
+            return FastJSONResponse({
                 "success": False,
                 "message": "OTP Expired. Please request a new OTP."
             },
@@ -302,7 +302,7 @@ async def verify_otp(request: Request, otp: str = Form()):
         # Get email from session for potential user creation or login
         email = request.session.pop("email", None)
 
-        return JSONResponse({
+        return FastJSONResponse({
             "success": True,
             "message": "OTP matches",
             "email": email
@@ -310,7 +310,7 @@ async def verify_otp(request: Request, otp: str = Form()):
             status_code=200
         )
 
-    return JSONResponse({
+    return FastJSONResponse({
         "success": False,
         "message": "OTP is invalid."
     },
@@ -321,7 +321,7 @@ async def verify_otp(request: Request, otp: str = Form()):
 @auth_router.post("/verify_email")
 async def verify_email(request: Request, email: str = Form()):
     if request.session.get("authenticated"):
-        return JSONResponse({
+        return FastJSONResponse({
             "success": False,
             "message": "User is logged in"
         },
@@ -329,7 +329,7 @@ async def verify_email(request: Request, email: str = Form()):
         )
 
     if email is None:
-        return JSONResponse({
+        return FastJSONResponse({
             "success": False,
             "message": "email is empty."
         },
@@ -337,14 +337,14 @@ async def verify_email(request: Request, email: str = Form()):
         )
 
     if _ := db.fetchOne(r"SELECT * FROM emails where email = %s", (email,)):
-        return JSONResponse({
+        return FastJSONResponse({
             "success": False,
             "message": "email is already in use."
         },
             status_code=406
         )
 
-    return JSONResponse({
+    return FastJSONResponse({
         "success": True,
         "message": "email is not in use."
     },
@@ -1,5 +1,8 @@
 from .brands import brands_router
+from .catalog import catalog_router
 from .categories import categories_router
+from .events import events_router
+from .search import search_router
 from .shoes import shoes_router
 from .sizes import sizes_router
 from .variants import variants_router
@@ -8,6 +11,9 @@ __all__ = [
     "shoes_router",
     "brands_router",
     "categories_router",
+    "catalog_router",
+    "events_router",
+    "search_router",
     "sizes_router",
     "variants_router",
 ]
@@ -19,6 +25,9 @@ inventory_router = APIRouter(prefix="/inventory")
 inventory_router.include_router(shoes_router)
 inventory_router.include_router(brands_router)
 inventory_router.include_router(categories_router)
+inventory_router.include_router(search_router)
+inventory_router.include_router(catalog_router)
+inventory_router.include_router(events_router)
 inventory_router.include_router(sizes_router)
 inventory_router.include_router(variants_router)
 
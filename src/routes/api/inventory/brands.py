@@ -2,12 +2,12 @@ import math
 from typing import Annotated, Optional
 
 from fastapi import APIRouter, Depends, Form, Query, Request
-from fastapi.responses import JSONResponse
 
 from .... import utils
 from ....depedencies import user_permissions, is_authenticated
 from ....exceptions import DatabaseException
-from ....helpers import Database
+from ....helpers import Database, FastJSONResponse, ListFormat, ReferenceData
+from ....helpers.reference_data import reference_response
 from ....models.inventory import Brand
 from ....utils import Permissions
 
@@ -15,25 +15,33 @@ brands_router = APIRouter(
     prefix="/brands", dependencies=[Depends(is_authenticated)])
 
 db = Database()
+reference = ReferenceData()
 
+BRAND_COLUMNS = {
+    "brand_id": "brand_id",
+    "brand_name": "brand_name",
+}
 
-@brands_router.get("/suggestions", response_class=JSONResponse)
+
+@brands_router.get("/suggestions", response_class=FastJSONResponse)
 async def get_suggestions(request: Request, user_perms: list[str] = Depends(user_permissions)):
     """Get all brands for autocomplete suggestions"""
-    brands = db.fetchAll(r'SELECT * FROM brands')
-    
-    return JSONResponse({
-        "brands": brands
-    })
+
+    return reference_response(request, {
+        "brands": reference.rows("brands")
+    }, "brands")
 
 
-@brands_router.get("", response_class=JSONResponse)
+@brands_router.get("", response_class=FastJSONResponse)
 async def list_brands(request: Request,
                       query: Annotated[Optional[str], Query()] = None,
                       page: Annotated[Optional[int], Query()] = 1,
-                      limit: Annotated[Optional[int], Query()] = 10
+                      limit: Annotated[Optional[int], Query()] = 10,
+                      fmt: ListFormat = Depends()
                       ):
 
+    columns = fmt.select(BRAND_COLUMNS)
+
     count = db.fetchOne(r'SELECT COUNT(*) as count FROM brands')["count"]
     pages = math.ceil(count / limit)
     offset = (page - 1) * limit
@@ -41,25 +49,17 @@ async def list_brands(request: Request,
     if query:
 
         result = db.fetchAll(
-            r'SELECT * FROM brands WHERE brand_id = %s OR brand_name LIKE %s LIMIT %s OFFSET %s', (query, f"%{query}%", limit, offset))
+            f'SELECT {columns} FROM brands WHERE brand_id = %s OR brand_name LIKE %s LIMIT %s OFFSET %s', (query, f"%{query}%", limit, offset))
 
-        return JSONResponse({
-            "result": result,
-            "count": count,
-            "pages": pages
-        })
+        return FastJSONResponse(fmt.render(result, count=count, pages=pages))
 
     result = db.fetchAll(
-        r'SELECT * FROM brands LIMIT %s OFFSET %s', (limit, offset))
+        f'SELECT {columns} FROM brands LIMIT %s OFFSET %s', (limit, offset))
 
-    return JSONResponse({
-        "result": result,
-        "count": count,
-        "pages": pages
-    })
+    return FastJSONResponse(fmt.render(result, count=count, pages=pages))
 
 
-@brands_router.post("/add", response_class=JSONResponse)
+@brands_router.post("/add", response_class=FastJSONResponse)
 async def add_brand(request: Request, brand_name: str = Form(), user_perms: list[str] = Depends(user_permissions)):
 
     utils.check_user_permissions(
@@ -79,12 +79,12 @@ async def add_brand(request: Request, brand_name: str = Form(), user_perms: list
         db.commitOne(
             r'INSERT INTO brands (brand_name) VALUES (%s)', (brand_name,))
 
-        return JSONResponse({
+        return FastJSONResponse({
             "success": True,
             "message": "Successfully Added Brand."
         }, status_code=201)
     except Exception as e:
-        return JSONResponse({
+        return FastJSONResponse({
             "success": False,
             "message": f"{e}"
         },
@@ -92,7 +92,7 @@ async def add_brand(request: Request, brand_name: str = Form(), user_perms: list
         )
 
 
-@brands_router.post("/update", response_class=JSONResponse)
+@brands_router.post("/update", response_class=FastJSONResponse)
 async def edit_brand(request: Request, brand: Annotated[Brand, Form()], user_perms: list[str] = Depends(user_permissions)):
 
     utils.check_user_permissions(
@@ -120,7 +120,7 @@ async def edit_brand(request: Request, brand: Annotated[Brand, Form()], user_per
             "message": f"Successfully Updated Brand."
         }
     except Exception as e:
-        return JSONResponse({
+        return FastJSONResponse({
             "success": False,
             "message": f"{e}"
         },
@@ -149,7 +149,7 @@ async def delete_brand(request: Request, brand_id: int, user_perms: list[str] =
             "message": f"Successfully Deleted Brand."
         }
     except Exception as e:
-        return JSONResponse({
+        return FastJSONResponse({
             "success": False,
             "message": f"{e}"
         },
@@ -157,7 +157,7 @@ async def delete_brand(request: Request, brand_id: int, user_perms: list[str] =
         )
 
 
-@brands_router.get("/{brand_id}", response_class=JSONResponse)
+@brands_router.get("/{brand_id}", response_class=FastJSONResponse)
 async def fetch_brand(request: Request, brand_id: int):
 
     return db.fetchOne(r'SELECT * FROM brands WHERE brand_id = %s', (brand_id,))
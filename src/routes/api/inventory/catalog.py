@@ -0,0 +1,36 @@
+from typing import Annotated, Optional
+
+from fastapi import APIRouter, Depends, Query, Request, Response
+
+from ....depedencies import is_authenticated
+from ....helpers import FastJSONResponse, catalog_feed
+from ....helpers.image_serving import REVALIDATE_CACHE_CONTROL, etag_matches
+from ....helpers.responses import JSON_MEDIA_TYPE
+
+catalog_router = APIRouter(
+    prefix="/catalog", dependencies=[Depends(is_authenticated)])
+
+
+@catalog_router.get("", response_class=FastJSONResponse)
+async def fetch_catalog(request: Request,
+                        since: Annotated[Optional[int], Query()] = None):
+    """Shoes, variants, brands, categories and sizes for POS terminals to keep a copy of.
+
+    Without ``since`` (or when changes that old are gone) the whole catalog
+    is returned with ``"full": true``. With ``since`` set to the
+    ``version`` of an earlier response only the records changed since then
+    are returned, along with the ids of the ones deleted in ``deleted``.
+    """
+
+    if since is not None:
+        if changes := catalog_feed.catalog_changes(since):
+            return FastJSONResponse(changes)
+
+    catalog = catalog_feed.full_catalog()
+    etag = f'"catalog-{catalog.version}"'
+    headers = {"ETag": etag, "Cache-Control": REVALIDATE_CACHE_CONTROL}
+
+    if etag_matches(request.headers.get("if-none-match", ""), etag):
+        return Response(status_code=304, headers=headers)
+
+    return Response(catalog.data, media_type=JSON_MEDIA_TYPE, headers=headers)
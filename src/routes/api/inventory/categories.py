@@ -2,12 +2,11 @@ import math
 from typing import Annotated, Optional
 
 from fastapi import APIRouter, Depends, Form, Query, Request
-from fastapi.responses import JSONResponse
 
 from .... import utils
 from ....depedencies import is_authenticated, user_permissions
 from ....exceptions import DatabaseException
-from ....helpers import Database
+from ....helpers import Database, FastJSONResponse, ListFormat
 from ....models.inventory import Category
 from ....utils import Permissions
 
@@ -16,14 +15,22 @@ categories_router = APIRouter(
 
 db = Database()
 
+CATEGORY_COLUMNS = {
+    "category_id": "category_id",
+    "category_name": "category_name",
+}
 
-@categories_router.get("", response_class=JSONResponse)
+
+@categories_router.get("", response_class=FastJSONResponse)
 async def list_categories(request: Request,
                           query: Annotated[Optional[str], Query()] = None,
                           page: Annotated[Optional[int], Query()] = 1,
-                          limit: Annotated[Optional[int], Query()] = 10
+                          limit: Annotated[Optional[int], Query()] = 10,
+                          fmt: ListFormat = Depends()
                           ):
 
+    columns = fmt.select(CATEGORY_COLUMNS)
+
     count = db.fetchOne(r'SELECT COUNT(*) as count FROM categories')["count"]
     pages = math.ceil(count / limit)
     offset = (page - 1) * limit
@@ -31,25 +38,17 @@ async def list_categories(request: Request,
     if query:
 
         result = db.fetchAll(
-            r'SELECT * FROM categories WHERE category_id = %s OR category_name LIKE %s LIMIT %s OFFSET %s', (query, f"%{query}%", limit, offset))
+            f'SELECT {columns} FROM categories WHERE category_id = %s OR category_name LIKE %s LIMIT %s OFFSET %s', (query, f"%{query}%", limit, offset))
 
-        return JSONResponse({
-            "result": result,
-            "count": count,
-            "pages": pages
-        })
+        return FastJSONResponse(fmt.render(result, count=count, pages=pages))
 
     result = db.fetchAll(
-        r'SELECT * FROM categories LIMIT %s OFFSET %s', (limit, offset))
+        f'SELECT {columns} FROM categories LIMIT %s OFFSET %s', (limit, offset))
 
-    return JSONResponse({
-        "result": result,
-        "count": count,
-        "pages": pages
-    })
+    return FastJSONResponse(fmt.render(result, count=count, pages=pages))
 
 
-@categories_router.post("/add", response_class=JSONResponse)
+@categories_router.post("/add", response_class=FastJSONResponse)
 async def add_category(request: Request, category_name: str = Form(), user_perms: list[str] = Depends(user_permissions)):
     utils.check_user_permissions(
         user_perms,
@@ -63,7 +62,7 @@ async def add_category(request: Request, category_name: str = Form(), user_perms
             raise DatabaseException("category_name is empty.")
 
         if _ := db.fetchOne(r'SELECT * FROM categories WHERE category_name = %s', (category_name,)):
-            return JSONResponse({
+            return FastJSONResponse({
                 "success": False,
                 "message": "Category already exists."
             },
@@ -73,12 +72,12 @@ async def add_category(request: Request, category_name: str = Form(), user_perms
         db.commitOne(
             r'INSERT INTO categories (category_name) VALUES (%s)', (category_name,))
 
-        return JSONResponse({
+        return FastJSONResponse({
             "success": True,
             "message": "Successfully Added Category."
         }, status_code=201)
     except Exception as e:
-        return JSONResponse({
+        return FastJSONResponse({
             "success": False,
             "message": f"{e}"
         },
@@ -86,7 +85,7 @@ async def add_category(request: Request, category_name: str = Form(), user_perms
         )
 
 
-@categories_router.post("/update", response_class=JSONResponse)
+@categories_router.post("/update", response_class=FastJSONResponse)
 async def edit_category(request: Request, category: Annotated[Category, Form()], user_perms: list[str] = Depends(user_permissions)):
     utils.check_user_permissions(
         user_perms,
@@ -109,7 +108,7 @@ async def edit_category(request: Request, category: Annotated[Category, Form()],
             "message": f"Successfully Updated Category."
         }
     except Exception as e:
-        return JSONResponse({
+        return FastJSONResponse({
             "success": False,
             "message": f"{e}"
         },
@@ -137,7 +136,7 @@ async def delete_category(request: Request, category_id: int, user_perms: list[s
             "message": f"Successfully Deleted Category."
         }
     except Exception as e:
-        return JSONResponse({
+        return FastJSONResponse({
             "success": False,
             "message": f"{e}"
         },
@@ -145,7 +144,7 @@ async def delete_category(request: Request, category_id: int, user_perms: list[s
         )
 
 
-@categories_router.get("/{category_id}", response_class=JSONResponse)
+@categories_router.get("/{category_id}", response_class=FastJSONResponse)
 async def fetch_category(request: Request, category_id: int, user_perms: list[str] = Depends(user_permissions)):
     utils.check_user_permissions(
         user_perms,
@@ -0,0 +1,41 @@
+from fastapi import APIRouter, Depends, Request
+from fastapi.responses import StreamingResponse
+
+from ....depedencies import is_authenticated
+from ....helpers.catalog_events import broker
+from ....Settings import Settings
+
+events_router = APIRouter(
+    prefix="/events", dependencies=[Depends(is_authenticated)])
+
+
+@events_router.get("")
+async def stream_events(request: Request):
+    """Server-sent events for POS terminals.
+
+    ``variant`` carries the stock of a variant, ``shoe`` the price and
+    markup of a shoe, both with ``deleted: true`` once the record is gone.
+    ``resync`` means events were dropped and everything shown should be
+    fetched again.
+    """
+
+    subscription = broker.subscribe()
+
+    async def stream():
+        try:
+            yield b"retry: 3000\n\n"
+
+            while not await request.is_disconnected():
+                events = await subscription.get(Settings.events.keepalive)
+                if not events:
+                    yield b": keep-alive\n\n"
+
+                for event in events:
+                    yield event.encode()
+        finally:
+            broker.unsubscribe(subscription)
+
+    return StreamingResponse(stream(), media_type="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",
+    })
@@ -0,0 +1,25 @@
+from typing import Annotated, Optional
+
+from fastapi import APIRouter, Depends, Query, Request
+
+from ....depedencies import is_authenticated
+from ....helpers import CatalogIndex, FastJSONResponse
+from ....helpers.catalog_index import SUGGEST_LIMIT
+
+search_router = APIRouter(
+    prefix="/search", dependencies=[Depends(is_authenticated)])
+
+catalog = CatalogIndex()
+
+
+@search_router.get("/suggest", response_class=FastJSONResponse)
+async def suggest(request: Request,
+                  q: Annotated[Optional[str], Query()] = None,
+                  limit: Annotated[Optional[int], Query()] = SUGGEST_LIMIT):
+    """Typeahead suggestions for the search boxes, answered from memory."""
+
+    limit = max(1, min(limit or SUGGEST_LIMIT, SUGGEST_LIMIT))
+
+    return FastJSONResponse({
+        "suggestions": catalog.suggest(q or "", limit)
+    })
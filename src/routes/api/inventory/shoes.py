@@ -1,17 +1,17 @@
 
 import math
-import os
-import shutil
-from io import BytesIO
 from typing import Annotated, Optional
 
 from fastapi import APIRouter, Depends, File, Form, Query, Request, UploadFile
-from fastapi.responses import JSONResponse
 
 from .... import utils
 from ....depedencies import is_authenticated, user_permissions
 from ....exceptions import DatabaseException
-from ....helpers import Database
+from ....helpers import (CatalogIndex, Database, FastJSONResponse, ImagePool, ListFormat,
+                         ReferenceData, catalog_events, image_store)
+from ....helpers.reference_data import reference_response
+from ....helpers.route_cache import route_cache
+from ....helpers.single_flight import single_flight
 from ....Settings import Settings
 from ....utils import Permissions, image
 
@@ -19,147 +19,137 @@ shoes_router = APIRouter(
     prefix="/shoes", dependencies=[Depends(is_authenticated)])
 
 db = Database()
+image_pool = ImagePool()
+catalog = CatalogIndex()
+reference = ReferenceData()
 
+SHOE_COLUMNS = {
+    "shoe_id": "s.shoe_id",
+    "shoe_name": "s.shoe_name",
+    "brand_id": "s.brand_id",
+    "markup": "s.markup",
+    "shoe_price": "s.shoe_price",
+    "first_sale_at": "s.first_sale_at",
+    "image_hash": "s.image_hash",
+    "image_placeholder": "s.image_placeholder",
+    "created_at": "s.created_at",
+}
 
-@shoes_router.get("", response_class=JSONResponse)
+SHOE_BRAND_COLUMNS = {
+    **SHOE_COLUMNS,
+    "brand_name": "b.brand_name",
+}
+
+
+def _id_list(ids: str | None) -> list[int]:
+    return [int(value.strip()) for value in (ids or "").split(",") if value.strip()]
+
+
+@shoes_router.get("", response_class=FastJSONResponse)
 async def list_shoes(request: Request,
                      query: Annotated[Optional[str], Query()] = None,
                      page: Annotated[Optional[int], Query()] = 1,
-                     limit: Annotated[Optional[int], Query()] = 10
+                     limit: Annotated[Optional[int], Query()] = 10,
+                     fmt: ListFormat = Depends()
                      ):
 
-    count = db.fetchOne(r'SELECT COUNT(*) as count FROM shoes')["count"]
-    pages = math.ceil(count / limit)
+    columns = fmt.select(SHOE_COLUMNS, default="s.*")
+
     offset = (page - 1) * limit
 
     if query:
+        shoe_ids = catalog.search(query)
+        count = len(shoe_ids)
+        pages = math.ceil(count / limit)
+
+        # Only the page is fetched, in the order of the ranking.
+        page_ids = shoe_ids[offset:offset + limit]
+        if not page_ids:
+            return FastJSONResponse(fmt.render([], count=count, pages=pages))
+
+        placeholders = ','.join(['%s'] * len(page_ids))
         result = db.fetchAll(
-            r'SELECT * FROM shoes WHERE shoe_id = %s OR shoe_name LIKE %s LIMIT %s OFFSET %s', (query, f"%{query}%", limit, offset))
+            f'SELECT {columns} FROM shoes s WHERE s.shoe_id IN ({placeholders}) ORDER BY FIELD(s.shoe_id, {placeholders})',
+            (*page_ids, *page_ids))
 
-        return JSONResponse({
-            "result": result,
-            "count": count,
-            "pages": pages
-        })
+        return FastJSONResponse(fmt.render(result, count=count, pages=pages))
+
+    count = db.fetchOne(r'SELECT COUNT(*) as count FROM shoes')["count"]
+    pages = math.ceil(count / limit)
 
     result = db.fetchAll(
-        r'SELECT * FROM shoes LIMIT %s OFFSET %s', (limit, offset))
+        f'SELECT {columns} FROM shoes s LIMIT %s OFFSET %s', (limit, offset))
 
-    return JSONResponse({
-        "result": result,
-        "count": count,
-        "pages": pages
-    })
+    return FastJSONResponse(fmt.render(result, count=count, pages=pages))
 
 
-@shoes_router.get("/all", response_class=JSONResponse)
-async def list_shoes(request: Request,
+@shoes_router.get("/all", response_class=FastJSONResponse)
+@single_flight.coalesce
+def list_shoes(request: Request,
                      query: Annotated[Optional[str], Query()] = None,
                      brand_ids: Annotated[Optional[str], Query()] = None,
                      category_ids: Annotated[Optional[str], Query()] = None,
                      demographic_ids: Annotated[Optional[str], Query()] = None,
                      page: Annotated[Optional[int], Query()] = 1,
-                     limit: Annotated[Optional[int], Query()] = 10
+                     limit: Annotated[Optional[int], Query()] = 10,
+                     fmt: ListFormat = Depends()
                      ):
 
-    # Build WHERE conditions
-    where_conditions = []
-    params = []
+    columns = fmt.select(SHOE_BRAND_COLUMNS,
+                         extra=("categories", "demographics", "variants"),
+                         required=("shoe_id",))
 
-    if query:
-        where_conditions.append("(s.shoe_id = %s OR s.shoe_name LIKE %s)")
-        params.extend([query, f"%{query}%"])
-
-    if brand_ids:
-        brand_list = [int(bid.strip())
-                      for bid in brand_ids.split(',') if bid.strip()]
-        if brand_list:
-            placeholders = ','.join(['%s'] * len(brand_list))
-            where_conditions.append(f"s.brand_id IN ({placeholders})")
-            params.extend(brand_list)
-
-    if category_ids:
-        category_list = [int(cid.strip())
-                         for cid in category_ids.split(',') if cid.strip()]
-        if category_list:
-            placeholders = ','.join(['%s'] * len(category_list))
-            where_conditions.append(
-                f"EXISTS (SELECT 1 FROM shoe_categories sc WHERE sc.shoe_id = s.shoe_id AND sc.category_id IN ({placeholders}))")
-            params.extend(category_list)
-
-    if demographic_ids:
-        demographic_list = [int(did.strip())
-                            for did in demographic_ids.split(',') if did.strip()]
-        if demographic_list:
-            for demo_id in demographic_list:
-                where_conditions.append(
-                    f"EXISTS (SELECT 1 FROM shoe_demographics sd WHERE sd.shoe_id = s.shoe_id AND sd.demographic_id = %s)")
-                params.append(demo_id)
-
-    where_clause = " AND ".join(
-        where_conditions) if where_conditions else "1=1"
-
-    # Count query
-    count_query = f"""
-    SELECT COUNT(*) as count
-    FROM shoes s
-    JOIN brands b ON b.brand_id = s.brand_id
-    WHERE {where_clause}
-    """
-    count = db.fetchOne(count_query, tuple(params))["count"]
-    pages = math.ceil(count / limit) if count > 0 else 1
+    # Filtering and counting is done on the in-memory catalog index, only
+    # the shoes of the page are fetched.
+    shoe_ids, facets = catalog.filter(query,
+                                      brands=_id_list(brand_ids),
+                                      categories=_id_list(category_ids),
+                                      demographics=_id_list(demographic_ids))
+
+    count = len(shoe_ids)
+    pages = math.ceil(count / limit)
     offset = (page - 1) * limit
 
-    # Data query
-    data_query = f"""
-    SELECT *
-    FROM shoes s
-    JOIN brands b ON b.brand_id = s.brand_id
-    WHERE {where_clause}
-    LIMIT %s OFFSET %s
-    """
-    params.extend([limit, offset])
-    result = db.fetchAll(data_query, tuple(params))
+    result = []
+    if page_ids := shoe_ids[offset:offset + limit]:
+        placeholders = ','.join(['%s'] * len(page_ids))
+        result = db.fetchAll(f"""
+            SELECT {columns}
+            FROM shoes s
+            JOIN brands b ON b.brand_id = s.brand_id
+            WHERE s.shoe_id IN ({placeholders})
+            ORDER BY FIELD(s.shoe_id, {placeholders})
+            """, (*page_ids, *page_ids))
 
     for shoe in result:
         shoe_id = shoe["shoe_id"]
 
-        shoe["created_at"] = shoe["created_at"].isoformat()
-        shoe["first_sale_at"] = shoe["first_sale_at"].isoformat()
-
-        shoe["categories"] = db.fetchAll(
-            r"""
-            SELECT c.*
-            FROM shoe_categories sc
-            JOIN categories c ON sc.category_id = c.category_id
-            WHERE sc.shoe_id = %s """, (shoe_id,)
-        )
+        if fmt.wants("categories"):
+            shoe["categories"] = db.fetchAll(
+                r"""
+                SELECT c.*
+                FROM shoe_categories sc
+                JOIN categories c ON sc.category_id = c.category_id
+                WHERE sc.shoe_id = %s """, (shoe_id,)
+            )
 
-        shoe["demographics"] = db.fetchAll(
-            r"""
-            SELECT d.*
-            FROM shoe_demographics sd
-            JOIN demographics d ON sd.demographic_id = d.demographic_id
-            WHERE sd.shoe_id = %s """, (shoe_id,)
-        )
+        if fmt.wants("demographics"):
+            shoe["demographics"] = db.fetchAll(
+                r"""
+                SELECT d.*
+                FROM shoe_demographics sd
+                JOIN demographics d ON sd.demographic_id = d.demographic_id
+                WHERE sd.shoe_id = %s """, (shoe_id,)
+            )
 
-        shoe["variants"] = db.fetchAll(
-            r"""
-            SELECT v.*, sz.us_size, sz.uk_size, sz.eu_size
-            FROM variants v
-            JOIN sizes sz ON sz.size_id = v.size_id
-            WHERE v.shoe_id = %s
-            ORDER BY sz.us_size
-            """, (shoe_id,))
+        if fmt.wants("variants"):
+            shoe["variants"] = reference.with_sizes(db.fetchAll(
+                r'SELECT v.* FROM variants v WHERE v.shoe_id = %s', (shoe_id,)))
 
-    return JSONResponse({
-        "result": result,
-        "count": count,
-        "pages": pages
-    })
+    return FastJSONResponse(fmt.render(result, count=count, pages=pages, facets=facets))
 
 
-@shoes_router.post("/add", response_class=JSONResponse)
+@shoes_router.post("/add", response_class=FastJSONResponse)
 async def add_shoe(request: Request,
                    file: UploadFile | None = File(None),
                    shoe_name: str = Form(),
@@ -178,7 +168,15 @@ async def add_shoe(request: Request,
         Permissions.inventory.manage_shoes
     )
 
+    image_job = None
+    if file is not None:
+        data = await image.read_upload(file, Settings.products.max_file_size)
+        image_job = image_pool.submit(image.save_shoe_image, data)
+
     try:
+        if image_job is not None:
+            await image_pool.wait(image_job)
+
         if shoe_name.strip() == "":
             raise DatabaseException("shoe_name is empty.")
 
@@ -209,42 +207,23 @@ async def add_shoe(request: Request,
                     (shoe_id, demo_id)
                 )
 
-        # Handle image upload
-        if file is not None:
-            if not file.content_type or not file.content_type.startswith("image"):
-                return JSONResponse(
-                    {"success": False,
-                        "message": f"Uploaded file ({file.content_type}) is not an image."},
-                    status_code=415
-                )
-
-            square_image, shoe_dir = image.create_square_image(shoe_id, file)
+        catalog_events.publish_shoes([shoe_id])
 
-            # Save the square image
-            buffer = BytesIO()
-            square_image.save(buffer, format="JPEG",
-                              quality=Settings.shoes.quality)
-            buffer.seek(0)
+        # Handle image upload, shoes without one show the default image
+        image_hash = None
+        if image_job is not None:
+            image_hash = image_pool.finish(
+                image_job, lambda image_hash: image_store.assign_shoe_image(shoe_id, image_hash))
 
-            image_path = os.path.join(
-                shoe_dir, f"shoe-{shoe_id:05d}.jpeg")
-            with open(image_path, "wb") as f:
-                f.write(buffer.read())
-        else:
-            # Copy default image
-            from ....Settings import Settings
-            shoe_dir = os.path.join(
-                Settings.shoes.path, f"shoe-{shoe_id:05d}")
-            os.makedirs(shoe_dir, exist_ok=True)
-            shutil.copy(Settings.shoes.default, os.path.join(
-                shoe_dir, f"shoe-{shoe_id:05d}.jpeg"))
-
-        return JSONResponse({
+        return FastJSONResponse({
             "success": True,
-            "message": "Successfully Added shoe."
+            "message": "Successfully Added shoe.",
+            "shoe_id": shoe_id,
+            "image_hash": image_hash,
+            "image_pending": image_job is not None and image_hash is None
         }, status_code=201)
     except Exception as e:
-        return JSONResponse({
+        return FastJSONResponse({
             "success": False,
             "message": f"{e}"
         },
@@ -252,7 +231,7 @@ async def add_shoe(request: Request,
         )
 
 
-@shoes_router.post("/update", response_class=JSONResponse)
+@shoes_router.post("/update", response_class=FastJSONResponse)
 async def edit_shoe(request: Request,
                     file: UploadFile | None = File(None),
                     shoe_id: int = Form(),
@@ -271,7 +250,14 @@ async def edit_shoe(request: Request,
         Permissions.inventory.manage_shoes
     )
 
+    image_job = None
+    if file is not None:
+        data = await image.read_upload(file, Settings.products.max_file_size)
+        image_job = image_pool.submit(image.save_shoe_image, data)
+
     try:
+        if image_job is not None:
+            await image_pool.wait(image_job)
 
         if brand_id < 0:
             raise DatabaseException("brand_id cannot be negative")
@@ -310,36 +296,23 @@ async def edit_shoe(request: Request,
                     (shoe_id, demo_id)
                 )
 
-        # Handle image upload (if provided)
-        if file is not None:
-            if not file.content_type or not file.content_type.startswith("image"):
-                return JSONResponse(
-                    {"success": False,
-                        "message": f"Uploaded file ({file.content_type}) is not an image."},
-                    status_code=415
-                )
-
-            # Create/update shoe directory
-
-            square_image, shoe_dir = image.create_square_image(shoe_id, file)
+        catalog_events.publish_shoes([shoe_id])
 
-            # Save the square image
-            buffer = BytesIO()
-            square_image.save(buffer, format="JPEG",
-                              quality=Settings.shoes.quality)
-            buffer.seek(0)
-
-            image_path = os.path.join(
-                shoe_dir, f"shoe-{shoe_id:05d}.jpeg")
-            with open(image_path, "wb") as f:
-                f.write(buffer.read())
+        # Handle image upload (if provided)
+        if image_job is not None:
+            image_hash = image_pool.finish(
+                image_job, lambda image_hash: image_store.assign_shoe_image(shoe_id, image_hash))
+        else:
+            image_hash = image_store.shoe_image_hash(shoe_id)
 
         return {
             "success": True,
-            "message": "Successfully Updated shoe."
+            "message": "Successfully Updated shoe.",
+            "image_hash": image_hash,
+            "image_pending": image_job is not None and image_hash is None
         }
     except Exception as e:
-        return JSONResponse({
+        return FastJSONResponse({
             "success": False,
             "message": f"{e}"
         },
@@ -366,18 +339,22 @@ async def delete_shoe(request: Request, shoe_id: int, user_perms: list[str] = De
         db.commitOne(
             r'DELETE FROM variants WHERE shoe_id = %s', (shoe_id,))
 
+        image_store.assign_shoe_image(shoe_id, None)
+
         rowCount = db.commitOne(
             r'DELETE FROM shoes WHERE shoe_id = %s', (shoe_id,)).rowcount
 
         if rowCount <= 0:
             raise DatabaseException("shoe_id doesn't exist.")
 
+        catalog_events.publish_shoes([shoe_id])
+
         return {
             "success": True,
             "message": "Successfully Deleted shoe."
         }
     except Exception as e:
-        return JSONResponse({
+        return FastJSONResponse({
             "success": False,
             "message": f"{e}"
         },
@@ -385,8 +362,10 @@ async def delete_shoe(request: Request, shoe_id: int, user_perms: list[str] = De
         )
 
 
-@shoes_router.get("/popular", response_class=JSONResponse)
-async def list_popular(request: Request, limit: int = 10):
+@shoes_router.get("/popular", response_class=FastJSONResponse)
+@route_cache.cached("sales_items", "variants", "shoes")
+@single_flight.coalesce
+def list_popular(request: Request, limit: int = 10):
 
     return db.fetchAll(r"""
             SELECT
@@ -410,25 +389,24 @@ async def list_popular(request: Request, limit: int = 10):
                """, (limit,))
 
 
-@shoes_router.get("/suggestions", response_class=JSONResponse)
+@shoes_router.get("/suggestions", response_class=FastJSONResponse)
 async def get_suggestions(request: Request, user_perms: list[str] = Depends(user_permissions)):
     """Get all categories and demographics for autocomplete suggestions"""
-    categories = db.fetchAll(r'SELECT * FROM categories')
-    demographics = db.fetchAll(r'SELECT * FROM demographics')
 
-    return JSONResponse({
-        "categories": categories,
-        "demographics": demographics
-    })
+    return reference_response(request, {
+        "categories": reference.rows("categories"),
+        "demographics": reference.rows("demographics")
+    }, "categories", "demographics")
 
 
-@shoes_router.get("/{shoe_id}", response_class=JSONResponse)
+@shoes_router.get("/{shoe_id}", response_class=FastJSONResponse)
 async def fetch_shoe(request: Request, shoe_id: int, user_perms: list[str] = Depends(user_permissions)):
 
     return db.fetchOne(r'SELECT * FROM shoes WHERE shoe_id = %s', (shoe_id,))
 
 
-@shoes_router.get("/{shoe_id}/all", response_class=JSONResponse)
+@shoes_router.get("/{shoe_id}/all", response_class=FastJSONResponse)
+@route_cache.cached("shoes", "brands", "shoe_categories", "categories", "shoe_demographics", "demographics")
 async def fetch_shoe_all_details(request: Request, shoe_id: int, user_perms: list[str] = Depends(user_permissions)):
 
     if all_shoe_details := db.fetchOne(r"""
@@ -459,9 +437,11 @@ async def fetch_shoe_all_details(request: Request, shoe_id: int, user_perms: lis
     return None
 
 
-@shoes_router.get("/total/count", response_class=JSONResponse)
-async def total_shoes(request: Request, user_perms: list[str] = Depends(user_permissions)):
+@shoes_router.get("/total/count", response_class=FastJSONResponse)
+@route_cache.cached("shoes")
+@single_flight.coalesce
+def total_shoes(request: Request, user_perms: list[str] = Depends(user_permissions)):
 
     result = db.fetchOne(r"SELECT COUNT(*) AS total_count FROM shoes")
 
-    return JSONResponse(result)
+    return FastJSONResponse(result)
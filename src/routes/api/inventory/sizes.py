@@ -2,51 +2,54 @@ import math
 from typing import Annotated, Optional
 
 from fastapi import APIRouter, Depends, Form, Query, Request
-from fastapi.responses import JSONResponse
 
 from .... import utils
 from ....depedencies import is_authenticated, user_permissions
 from ....exceptions import DatabaseException
-from ....helpers import Database
+from ....helpers import Database, FastJSONResponse, ListFormat, ReferenceData
+from ....helpers.reference_data import reference_response
 from ....utils import Permissions
 
 sizes_router = APIRouter(prefix="/sizes", dependencies=[Depends(is_authenticated)])
 
 db = Database()
+reference = ReferenceData()
 
+SIZE_COLUMNS = {
+    "size_id": "size_id",
+    "us_size": "us_size",
+    "uk_size": "uk_size",
+    "eu_size": "eu_size",
+}
 
-@sizes_router.get("", response_class=JSONResponse)
+
+@sizes_router.get("", response_class=FastJSONResponse)
 async def list_sizes(request: Request,
                      query: Annotated[Optional[str], Query()] = None,
                      page: Annotated[Optional[int], Query()] = 1,
-                     limit: Annotated[Optional[int], Query()] = 10
+                     limit: Annotated[Optional[int], Query()] = 10,
+                     fmt: ListFormat = Depends()
                      ):
 
-    count = db.fetchOne(r'SELECT COUNT(*) as count FROM sizes')["count"]
-    pages = math.ceil(count / limit)
-    offset = (page - 1) * limit
+    # Validates the requested fields, the rows come from the reference cache.
+    fmt.select(SIZE_COLUMNS)
 
+    sizes = reference.rows("sizes")
     if query:
-        result = db.fetchAll(
-            r'SELECT * FROM sizes WHERE size_id = %s OR us_size LIKE %s OR uk_size LIKE %s OR eu_size LIKE %s LIMIT %s OFFSET %s', (query, f"%{query}%", f"%{query}%", f"%{query}%", limit, offset))
+        sizes = [size for size in sizes
+                 if str(size["size_id"]) == query
+                 or any(query in str(size[field]) for field in ("us_size", "uk_size", "eu_size"))]
 
-        return JSONResponse({
-            "result": result,
-            "count": count,
-            "pages": pages
-        })
+    count = len(sizes)
+    pages = math.ceil(count / limit)
+    offset = (page - 1) * limit
 
-    result = db.fetchAll(
-        r'SELECT * FROM sizes LIMIT %s OFFSET %s', (limit, offset))
+    result = sizes[offset:offset + limit]
 
-    return JSONResponse({
-        "result": result,
-        "count": count,
-        "pages": pages
-    })
+    return reference_response(request, fmt.render(result, count=count, pages=pages), "sizes")
 
 
-@sizes_router.post("/add", response_class=JSONResponse)
+@sizes_router.post("/add", response_class=FastJSONResponse)
 async def add_size(request: Request,
                    us_size: float = Form(),
                    uk_size: float = Form(),
@@ -72,12 +75,12 @@ async def add_size(request: Request,
         db.commitOne(
             r'INSERT INTO sizes (us_size, uk_size, eu_size) VALUES (%s, %s, %s)', (us_size, uk_size, eu_size))
 
-        return JSONResponse({
+        return FastJSONResponse({
             "success": True,
             "message": "Successfully Added Size."
         }, status_code=201)
     except Exception as e:
-        return JSONResponse({
+        return FastJSONResponse({
             "success": False,
             "message": f"{e}"
         },
@@ -85,7 +88,7 @@ async def add_size(request: Request,
         )
 
 
-@sizes_router.post("/update", response_class=JSONResponse)
+@sizes_router.post("/update", response_class=FastJSONResponse)
 async def edit_size(request: Request,
                     size_id: int = Form(),
                     us_size: float = Form(),
@@ -120,7 +123,7 @@ async def edit_size(request: Request,
             "message": f"Successfully Updated Size."
         }
     except Exception as e:
-        return JSONResponse({
+        return FastJSONResponse({
             "success": False,
             "message": f"{e}"
         },
@@ -148,7 +151,7 @@ async def delete_size(request: Request, size_id: int, user_perms: list[str] = De
             "message": f"Successfully Deleted Size."
         }
     except Exception as e:
-        return JSONResponse({
+        return FastJSONResponse({
             "success": False,
             "message": f"{e}"
         },
@@ -156,7 +159,7 @@ async def delete_size(request: Request, size_id: int, user_perms: list[str] = De
         )
 
 
-@sizes_router.get("/{size_id}", response_class=JSONResponse)
+@sizes_router.get("/{size_id}", response_class=FastJSONResponse)
 async def fetch_size(request: Request, size_id: int, user_perms: list[str] = Depends(user_permissions)):
     utils.check_user_permissions(
         user_perms,
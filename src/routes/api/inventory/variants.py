@@ -2,12 +2,12 @@ import math
 from typing import Annotated, Optional
 
 from fastapi import APIRouter, Depends, Form, Query, Request
-from fastapi.responses import JSONResponse
 
 from .... import utils
 from ....depedencies import is_authenticated, user_permissions
 from ....exceptions import DatabaseException
-from ....helpers import Database
+from ....helpers import (CatalogIndex, Database, FastJSONResponse, ListFormat, ReferenceData,
+                         catalog_events)
 from ....models.inventory import Variant
 from ....utils import Permissions
 
@@ -15,31 +15,61 @@ variants_router = APIRouter(
     prefix="/variants", dependencies=[Depends(is_authenticated)])
 
 db = Database()
-
-
-@variants_router.get("", response_class=JSONResponse)
+catalog = CatalogIndex()
+reference = ReferenceData()
+
+SHOE_BRAND_COLUMNS = {
+    "shoe_id": "s.shoe_id",
+    "shoe_name": "s.shoe_name",
+    "brand_id": "s.brand_id",
+    "markup": "s.markup",
+    "shoe_price": "s.shoe_price",
+    "first_sale_at": "s.first_sale_at",
+    "image_hash": "s.image_hash",
+    "image_placeholder": "s.image_placeholder",
+    "created_at": "s.created_at",
+    "brand_name": "b.brand_name",
+}
+
+
+@variants_router.get("", response_class=FastJSONResponse)
 async def list_variants(request: Request,
                         query: Annotated[Optional[str], Query()] = None,
                         page: Annotated[Optional[int], Query()] = 1,
                         limit: Annotated[Optional[int], Query()] = 10,
-                        low_stock: Annotated[Optional[str], Query()] = None):
+                        low_stock: Annotated[Optional[str], Query()] = None,
+                        fmt: ListFormat = Depends()):
+
+    columns = fmt.select(SHOE_BRAND_COLUMNS,
+                         default="s.*, b.brand_name",
+                         extra=("variants",),
+                         required=("shoe_id",))
 
     # First, get the shoes for the current page
-    base_query = """
-        SELECT s.*, b.brand_name
+    base_query = f"""
+        SELECT {columns}
         FROM shoes s
         JOIN brands b ON b.brand_id = s.brand_id
     """
     count_query = "SELECT COUNT(*) as count FROM shoes s JOIN brands b ON b.brand_id = s.brand_id"
     where_clauses = []
     params = []
+    order_sql = ""
+    order_params = []
 
     if low_stock == '1':
         where_clauses.append("EXISTS (SELECT 1 FROM variants v WHERE v.shoe_id = s.shoe_id AND v.variant_stock <= 20)")
     
     if query:
-        where_clauses.append("(s.shoe_id = %s OR s.shoe_name LIKE %s OR b.brand_name LIKE %s)")
-        params.extend([query, f"%{query}%", f"%{query}%"])
+        shoe_ids = catalog.search(query)
+        if not shoe_ids:
+            return FastJSONResponse(fmt.render([], count=0, pages=0))
+
+        placeholders = ','.join(['%s'] * len(shoe_ids))
+        where_clauses.append(f"s.shoe_id IN ({placeholders})")
+        params.extend(shoe_ids)
+        order_sql = f" ORDER BY FIELD(s.shoe_id, {placeholders})"
+        order_params.extend(shoe_ids)
 
     if where_clauses:
         where_sql = " WHERE " + " AND ".join(where_clauses)
@@ -50,37 +80,29 @@ async def list_variants(request: Request,
     shoe_pages = math.ceil(shoe_count / limit)
     shoe_offset = (page - 1) * limit
 
-    shoes = db.fetchAll(base_query + " LIMIT %s OFFSET %s", params + [limit, shoe_offset])
+    shoes = db.fetchAll(base_query + order_sql + " LIMIT %s OFFSET %s",
+                        params + order_params + [limit, shoe_offset])
 
     # For each shoe, get its variants
     result = []
     for shoe in shoes:
+        result.append(shoe)
+
+        if not fmt.wants("variants"):
+            continue
+
         shoe_id = shoe["shoe_id"]
-        variant_query = """
-            SELECT v.*, sz.us_size, sz.uk_size, sz.eu_size
-            FROM variants v
-            JOIN sizes sz ON sz.size_id = v.size_id
-            WHERE v.shoe_id = %s
-        """
+        variant_query = "SELECT v.* FROM variants v WHERE v.shoe_id = %s"
         params = [shoe_id]
         if low_stock == '1':
             variant_query += " AND v.variant_stock <= 20"
-        variant_query += " ORDER BY sz.us_size"
         variants = db.fetchAll(variant_query, params)
-        shoe["variants"] = variants
-        shoe["created_at"] = shoe["created_at"].isoformat()
-        shoe["first_sale_at"] = shoe["first_sale_at"].isoformat()
+        shoe["variants"] = reference.with_sizes(variants)
 
-        result.append(shoe)
-
-    return JSONResponse({
-        "result": result,
-        "count": shoe_count,
-        "pages": shoe_pages
-    })
+    return FastJSONResponse(fmt.render(result, count=shoe_count, pages=shoe_pages))
 
 
-@variants_router.post("/add", response_class=JSONResponse)
+@variants_router.post("/add", response_class=FastJSONResponse)
 async def add_variant(request: Request,
                       shoe_id: int = Form(),
                       size_id: int = Form(),
@@ -106,20 +128,22 @@ async def add_variant(request: Request,
             raise DatabaseException("variant_stock is invalid.")
 
         if _ := db.fetchOne(r'SELECT * FROM variants WHERE size_id = %s AND shoe_id = %s', (size_id, shoe_id)):
-            return JSONResponse({
+            return FastJSONResponse({
                 "success": False,
                 "message": "Variant already exists."
             }, status_code=201)
 
-        db.commitOne(
+        cursor = db.commitOne(
             r'INSERT INTO variants (shoe_id, size_id, variant_stock) VALUES (%s, %s, %s)', (shoe_id, size_id, variant_stock))
 
-        return JSONResponse({
+        catalog_events.publish_variants([cursor.lastrowid])
+
+        return FastJSONResponse({
             "success": True,
             "message": "Successfully Added Variant."
         }, status_code=201)
     except Exception as e:
-        return JSONResponse({
+        return FastJSONResponse({
             "success": False,
             "message": f"{e}"
         },
@@ -127,7 +151,7 @@ async def add_variant(request: Request,
         )
 
 
-@variants_router.post("/update", response_class=JSONResponse)
+@variants_router.post("/update", response_class=FastJSONResponse)
 async def edit_variant(request: Request, variant: Annotated[Variant, Form()], user_perms: list[str] = Depends(user_permissions)):
     utils.check_user_permissions(
         user_perms,
@@ -149,7 +173,7 @@ async def edit_variant(request: Request, variant: Annotated[Variant, Form()], us
             raise DatabaseException("variant_stock is invalid.")
 
         if _ := db.fetchOne(r'SELECT * FROM variants WHERE size_id = %s AND shoe_id = %s', (variant.size_id, variant.shoe_id)):
-            return JSONResponse({
+            return FastJSONResponse({
                 "success": False,
                 "message": "Variant already exists."
             }, status_code=201)
@@ -160,12 +184,14 @@ async def edit_variant(request: Request, variant: Annotated[Variant, Form()], us
              variant.variant_stock, variant.variant_id)
         )
 
+        catalog_events.publish_variants([variant.variant_id])
+
         return {
             "success": True,
             "message": f"Successfully Updated Variant."
         }
     except Exception as e:
-        return JSONResponse({
+        return FastJSONResponse({
             "success": False,
             "message": f"{e}"
         },
@@ -188,12 +214,14 @@ async def delete_variant(request: Request, variant_id: int, user_perms: list[str
         if rowCount <= 0:
             raise DatabaseException("variant_id doesn't exist.")
 
+        catalog_events.publish_variants([variant_id])
+
         return {
             "success": True,
             "message": f"Successfully Deleted Variant."
         }
     except Exception as e:
-        return JSONResponse({
+        return FastJSONResponse({
             "success": False,
             "message": f"{e}"
         },
@@ -201,7 +229,7 @@ async def delete_variant(request: Request, variant_id: int, user_perms: list[str
         )
 
 
-@variants_router.get("/low-stock", response_class=JSONResponse)
+@variants_router.get("/low-stock", response_class=FastJSONResponse)
 async def low_stock_variants(request: Request, threshold: int = 20, user_perms: list[str] = Depends(user_permissions)):
     utils.check_user_permissions(
         user_perms,
@@ -216,27 +244,24 @@ async def low_stock_variants(request: Request, threshold: int = 20, user_perms:
         WHERE v.variant_stock <= %s
     """, (threshold,))["count"]
 
-    result = db.fetchAll(r"""
+    result = reference.with_sizes(db.fetchAll(r"""
         SELECT
             v.variant_id,
             s.shoe_id,
             s.shoe_name,
-            sz.us_size,
-            sz.uk_size,
-            sz.eu_size,
+            v.size_id,
             v.variant_stock
         FROM variants v
         JOIN shoes s ON v.shoe_id = s.shoe_id
-        JOIN sizes sz ON v.size_id = sz.size_id
         WHERE v.variant_stock <= %s
         ORDER BY v.variant_stock ASC
         LIMIT 20
-    """, (threshold,))
+    """, (threshold,)), sort=False)
 
-    return JSONResponse({"data": result, "total": total})
+    return FastJSONResponse({"data": result, "total": total})
 
 
-@variants_router.get("/{variant_id}", response_class=JSONResponse)
+@variants_router.get("/{variant_id}", response_class=FastJSONResponse)
 async def fetch_variant(request: Request, variant_id: int, user_perms: list[str] = Depends(user_permissions)):
     utils.check_user_permissions(
         user_perms,
@@ -249,14 +274,15 @@ async def fetch_variant(request: Request, variant_id: int, user_perms: list[str]
     result = db.fetchOne(r'''
         SELECT
             v.variant_id, v.shoe_id, v.size_id, v.variant_stock,
-            sz.us_size, sz.uk_size, sz.eu_size,
             s.shoe_name, s.shoe_price, s.markup,
             b.brand_name
         FROM variants v
-        JOIN sizes sz ON sz.size_id = v.size_id
         JOIN shoes s ON s.shoe_id = v.shoe_id
         JOIN brands b ON b.brand_id = s.brand_id
         WHERE v.variant_id = %s
     ''', (variant_id,))
 
-    return result
+    if result is None:
+        return None
+
+    return next(iter(reference.with_sizes([result])), None)
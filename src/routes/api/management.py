@@ -2,10 +2,11 @@ import math
 from typing import Optional, Annotated
 
 from fastapi import APIRouter, Request, Form, Depends, Query
-from fastapi.responses import JSONResponse
 
 from ...depedencies import is_authenticated
-from ...helpers import Database
+from ...helpers import Database, FastJSONResponse
+from ...helpers.metrics import metrics
+from ...helpers.route_cache import route_cache
 from ...exceptions import DatabaseException
 
 management_router = APIRouter(prefix="", dependencies=[
@@ -14,7 +15,7 @@ management_router = APIRouter(prefix="", dependencies=[
 db = Database()
 
 
-@management_router.get("/roles", response_class=JSONResponse)
+@management_router.get("/roles", response_class=FastJSONResponse)
 async def list_roles(request: Request,
                      query: Annotated[Optional[str], Query()] = None,
                      page: Annotated[Optional[int], Query()] = 1,
@@ -43,14 +44,14 @@ async def list_roles(request: Request,
             (limit, offset)
         )
 
-    return JSONResponse({
+    return FastJSONResponse({
         "result": results,
         "count": count,
         "pages": pages
     })
 
 
-@management_router.get("/roles/all", response_class=JSONResponse)
+@management_router.get("/roles/all", response_class=FastJSONResponse)
 async def list_roles(request: Request,
                      query: Annotated[Optional[str], Query()] = None,
                      page: Annotated[Optional[int], Query()] = 1,
@@ -90,14 +91,14 @@ async def list_roles(request: Request,
         )
         role["permissions"] = perms
 
-    return JSONResponse({
+    return FastJSONResponse({
         "result": results,
         "count": count,
         "pages": pages
     })
 
 
-@management_router.post("/roles/add", response_class=JSONResponse)
+@management_router.post("/roles/add", response_class=FastJSONResponse)
 async def add_role(request: Request, role_name: str = Form(), permission_ids: Optional[str] = Form(None)):
     try:
         if role_name.strip() == "":
@@ -146,13 +147,13 @@ async def add_role(request: Request, role_name: str = Form(), permission_ids: Op
                 db.commitMany(
                     r'INSERT INTO role_permissions (role_id, permission_id) VALUES (%s, %s)', permissions)
 
-        return JSONResponse({
+        return FastJSONResponse({
             "success": True,
             "message": "Successfully Added Role.",
             "role_id": role_id
         }, status_code=201)
     except Exception as e:
-        return JSONResponse({
+        return FastJSONResponse({
             "success": False,
             "message": f"{e}"
         },
@@ -160,7 +161,7 @@ async def add_role(request: Request, role_name: str = Form(), permission_ids: Op
         )
 
 
-@management_router.post("/roles/update", response_class=JSONResponse)
+@management_router.post("/roles/update", response_class=FastJSONResponse)
 async def edit_role(request: Request, role_id: int = Form(), role_name: str = Form(), permission_ids: Optional[str] = Form(None)):
     try:
         if role_id < 0:
@@ -214,7 +215,7 @@ async def edit_role(request: Request, role_id: int = Form(), role_name: str = Fo
             "message": "Successfully Updated Role."
         }
     except Exception as e:
-        return JSONResponse({
+        return FastJSONResponse({
             "success": False,
             "message": f"{e}"
         },
@@ -222,7 +223,7 @@ async def edit_role(request: Request, role_id: int = Form(), role_name: str = Fo
         )
 
 
-@management_router.delete("/roles/delete", response_class=JSONResponse)
+@management_router.delete("/roles/delete", response_class=FastJSONResponse)
 async def delete_role(request: Request, role_id: int = Form()):
     try:
         rowCount = db.commitOne(
@@ -236,7 +237,7 @@ async def delete_role(request: Request, role_id: int = Form()):
             "message": "Successfully Deleted Role."
         }
     except Exception as e:
-        return JSONResponse({
+        return FastJSONResponse({
             "success": False,
             "message": f"{e}"
         },
@@ -244,7 +245,8 @@ async def delete_role(request: Request, role_id: int = Form()):
         )
 
 
-@management_router.get("/roles/{role_id}", response_class=JSONResponse)
+@management_router.get("/roles/{role_id}", response_class=FastJSONResponse)
+@route_cache.cached("roles")
 async def fetch_role(request: Request, role_id: int):
     return db.fetchOne(r"SELECT * FROM roles WHERE role_id = %s", (role_id,))
 
@@ -272,21 +274,27 @@ async def list_role_permissions(request: Request, role_id: int):
 #         db.commitOne('')
 
 
-@management_router.get("/permissions", response_class=JSONResponse)
+@management_router.get("/permissions", response_class=FastJSONResponse)
+@route_cache.cached("permissions")
 async def list_permissions(request: Request):
     return db.fetchAll(r"SELECT * from permissions")
 
 
-@management_router.get("/permissions/{permission_id}", response_class=JSONResponse)
+@management_router.get("/permissions/{permission_id}", response_class=FastJSONResponse)
 async def fetch_permission(request: Request, permission_id: int):
     return db.fetchOne(r"SELECT * FROM permissions WHERE permission_id = %s", (permission_id,))
 
 
-@management_router.get("/userRoles", response_class=JSONResponse)
+@management_router.get("/userRoles", response_class=FastJSONResponse)
 async def list_user_roles(request: Request):
     return db.fetchAll(r'SELECT * from user_roles')
 
 
-@management_router.get("/rolePerms", response_class=JSONResponse)
+@management_router.get("/rolePerms", response_class=FastJSONResponse)
 async def list_all_role_permissions(request: Request):
     return db.fetchAll(r'SELECT * from role_permissions')
+
+
+@management_router.get("/metrics", response_class=FastJSONResponse)
+async def list_metrics(request: Request):
+    return metrics.snapshot()
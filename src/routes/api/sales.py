@@ -1,11 +1,12 @@
 import math
 from typing import Annotated, Optional
 
-from fastapi import APIRouter, Form, Query, Request
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, Depends, Form, Query, Request
 
 from ...exceptions import DatabaseException
-from ...helpers import Database
+from ...helpers import Database, FastJSONResponse, ListFormat, catalog_events
+from ...helpers.route_cache import route_cache
+from ...helpers.single_flight import single_flight
 from ...models.inventory import Variant
 from ...models.sales import Return, Sale
 
@@ -13,23 +14,56 @@ sales_router = APIRouter(prefix="/sales")
 
 db = Database()
 
-
-@sales_router.get("/", response_class=JSONResponse)
+SALE_COLUMNS = {
+    "sale_id": "s.sale_id",
+    "user_id": "s.user_id",
+    "customer_name": "s.customer_name",
+    "total_amount": "s.total_amount",
+    "cash_received": "s.cash_received",
+    "change_amount": "s.change_amount",
+    "sales_date": "s.sales_date",
+    "username": "u.username",
+    "first_name": "u.first_name",
+    "last_name": "u.last_name",
+    "status": "CASE WHEN r.return_id IS NOT NULL THEN 'Returned' ELSE 'Active' END",
+}
+
+RETURN_COLUMNS = {
+    "return_id": "r.return_id",
+    "sale_id": "r.sale_id",
+    "customer_name": "r.customer_name",
+    "return_reason": "r.return_reason",
+    "total_refund": "r.total_refund",
+    "return_date": "r.return_date",
+    "user_id": "s.user_id",
+    "total_amount": "s.total_amount",
+    "cash_received": "s.cash_received",
+    "change_amount": "s.change_amount",
+    "sales_date": "s.sales_date",
+}
+
+
+@sales_router.get("/", response_class=FastJSONResponse)
 async def list_sales(request: Request,
                      query: Annotated[Optional[str], Query()] = None,
                      page: Annotated[Optional[int], Query()] = 1,
-                     limit: Annotated[Optional[int], Query()] = 10
+                     limit: Annotated[Optional[int], Query()] = 10,
+                     fmt: ListFormat = Depends()
                      ):
 
+    columns = fmt.select(SALE_COLUMNS, default=r"""
+        s.*, u.user_id, u.username, u.first_name, u.last_name,
+        CASE WHEN r.return_id IS NOT NULL THEN 'Returned' ELSE 'Active' END as status
+        """)
+
     count = db.fetchOne(r'SELECT COUNT(*) as count FROM sales')["count"]
     pages = math.ceil(count / limit)
     offset = (page - 1) * limit
 
     if query:
         result = db.fetchAll(
-            r"""
-            SELECT s.*, u.user_id, u.username, u.first_name, u.last_name,
-                   CASE WHEN r.return_id IS NOT NULL THEN 'Returned' ELSE 'Active' END as status
+            f"""
+            SELECT {columns}
             FROM sales s
             JOIN users u ON u.user_id = s.user_id
             LEFT JOIN returns r ON r.sale_id = s.sale_id
@@ -41,9 +75,8 @@ async def list_sales(request: Request,
 
     else:
         result = db.fetchAll(
-            r"""
-            SELECT s.*, u.user_id, u.username, u.first_name, u.last_name,
-                   CASE WHEN r.return_id IS NOT NULL THEN 'Returned' ELSE 'Active' END as status
+            f"""
+            SELECT {columns}
             FROM sales s
             JOIN users u ON u.user_id = s.user_id
             LEFT JOIN returns r ON r.sale_id = s.sale_id
@@ -52,17 +85,10 @@ async def list_sales(request: Request,
             (limit, offset)
         )
 
-    for sale in result:
-        sale["sales_date"] = sale["sales_date"].isoformat()
-
-    return JSONResponse({
-        "result": result,
-        "count": count,
-        "pages": pages
-    })
+    return FastJSONResponse(fmt.render(result, count=count, pages=pages))
 
 
-@sales_router.post("/add", response_class=JSONResponse)
+@sales_router.post("/add", response_class=FastJSONResponse)
 async def add_sale(request: Request,
                    customer_name: str = Form(),
                    total_amount: float = Form(),
@@ -91,6 +117,7 @@ async def add_sale(request: Request,
                               (user_id, customer_name, total_amount, cash_received, change_amount))
 
         sale_id = cursor.lastrowid
+        sold_variant_ids = []
 
         for item in items.split(","):
             item = item.strip().split(":")
@@ -110,14 +137,17 @@ async def add_sale(request: Request,
                     # Update stock
                     db.commitOne(r'UPDATE variants SET variant_stock = variant_stock - %s WHERE variant_id = %s',
                                  (quantity, variant_id))
+                    sold_variant_ids.append(variant_id)
 
-        return JSONResponse({
+        catalog_events.publish_variants(sold_variant_ids)
+
+        return FastJSONResponse({
             "success": True,
             "message": "Sale added successfully",
             "sale_id": sale_id
         }, status_code=201)
     except Exception as e:
-        return JSONResponse({
+        return FastJSONResponse({
             "success": False,
             "message": f"{e}"
         },
@@ -125,7 +155,7 @@ async def add_sale(request: Request,
         )
 
 
-@sales_router.post("/update", response_class=JSONResponse)
+@sales_router.post("/update", response_class=FastJSONResponse)
 async def update_sale(request: Request,
                       sale_id: int = Form(),
                       user_id: int = Form(),
@@ -145,7 +175,7 @@ async def update_sale(request: Request,
             "message": "Sale updated successfully"
         }
     except Exception as e:
-        return JSONResponse({
+        return FastJSONResponse({
             "success": False,
             "message": f"{e}"
         },
@@ -153,7 +183,7 @@ async def update_sale(request: Request,
         )
 
 
-@sales_router.delete("/delete/{sale_id}", response_class=JSONResponse)
+@sales_router.delete("/delete/{sale_id}", response_class=FastJSONResponse)
 async def delete_sale(request: Request, sale_id: int):
     try:
         # Delete sales_items first
@@ -170,7 +200,7 @@ async def delete_sale(request: Request, sale_id: int):
             "message": "Sale deleted successfully"
         }
     except Exception as e:
-        return JSONResponse({
+        return FastJSONResponse({
             "success": False,
             "message": f"{e}"
         },
@@ -178,21 +208,24 @@ async def delete_sale(request: Request, sale_id: int):
         )
 
 
-@sales_router.get("/returns", response_class=JSONResponse)
+@sales_router.get("/returns", response_class=FastJSONResponse)
 async def list_returns(request: Request,
                        query: Annotated[Optional[str], Query()] = None,
                        page: Annotated[Optional[int], Query()] = 1,
-                       limit: Annotated[Optional[int], Query()] = 10
+                       limit: Annotated[Optional[int], Query()] = 10,
+                       fmt: ListFormat = Depends()
                        ):
 
+    columns = fmt.select(RETURN_COLUMNS)
+
     count = db.fetchOne(r'SELECT COUNT(*) as count FROM returns')["count"]
     pages = math.ceil(count / limit)
     offset = (page - 1) * limit
 
     if query:
         result = db.fetchAll(
-            r"""
-            SELECT * 
+            f"""
+            SELECT {columns}
             FROM returns r
             JOIN sales s ON s.sale_id = r.sale_id
             WHERE s.sale_id = % OR r.return_id = %s OR s.customer_name = %s
@@ -201,26 +234,18 @@ async def list_returns(request: Request,
             (query, query, f"{query}%", limit, offset))
     else:
         result = db.fetchAll(
-            r"""
-            SELECT * 
+            f"""
+            SELECT {columns}
             FROM returns r
             JOIN sales s ON s.sale_id = r.sale_id
             LIMIT %s OFFSET %s
             """,
             (limit, offset))
 
-    for ret in result:
-        ret["return_date"] = ret["return_date"].isoformat()
-        ret["sales_date"] = ret["sales_date"].isoformat()
+    return FastJSONResponse(fmt.render(result, count=count, pages=pages))
 
-    return JSONResponse({
-        "result": result,
-        "count": count,
-        "pages": pages
-    })
 
-
-@sales_router.post("/returns/add", response_class=JSONResponse)
+@sales_router.post("/returns/add", response_class=FastJSONResponse)
 async def add_return(request: Request,
                      sale_id: int = Form(),
                      customer_name: str = Form(),
@@ -230,12 +255,12 @@ async def add_return(request: Request,
         db.commitOne(r'INSERT INTO returns (sale_id, customer_name, return_reason, total_refund) VALUES (%s, %s, %s, %s)',
                      (sale_id, customer_name, return_reason, total_refund))
 
-        return JSONResponse({
+        return FastJSONResponse({
             "success": True,
             "message": "Return added successfully"
         }, status_code=201)
     except Exception as e:
-        return JSONResponse({
+        return FastJSONResponse({
             "success": False,
             "message": f"{e}"
         },
@@ -243,7 +268,7 @@ async def add_return(request: Request,
         )
 
 
-@sales_router.post("/returns/update", response_class=JSONResponse)
+@sales_router.post("/returns/update", response_class=FastJSONResponse)
 async def update_return(request: Request,
                         return_id: int = Form(),
                         sale_id: int = Form(),
@@ -262,7 +287,7 @@ async def update_return(request: Request,
             "message": "Return updated successfully"
         }
     except Exception as e:
-        return JSONResponse({
+        return FastJSONResponse({
             "success": False,
             "message": f"{e}"
         },
@@ -270,7 +295,7 @@ async def update_return(request: Request,
         )
 
 
-@sales_router.delete("/returns/delete/{return_id}", response_class=JSONResponse)
+@sales_router.delete("/returns/delete/{return_id}", response_class=FastJSONResponse)
 async def delete_return(request: Request, return_id: int):
     try:
         rowCount = db.commitOne(
@@ -284,7 +309,7 @@ async def delete_return(request: Request, return_id: int):
             "message": "Return deleted successfully"
         }
     except Exception as e:
-        return JSONResponse({
+        return FastJSONResponse({
             "success": False,
             "message": f"{e}"
         },
@@ -292,8 +317,10 @@ async def delete_return(request: Request, return_id: int):
         )
 
 
-@sales_router.get("/returns/total", response_class=JSONResponse)
-async def total_returns(request: Request):
+@sales_router.get("/returns/total", response_class=FastJSONResponse)
+@route_cache.cached("returns")
+@single_flight.coalesce
+def total_returns(request: Request):
 
     result = db.fetchOne(r"""
         SELECT
@@ -302,21 +329,19 @@ async def total_returns(request: Request):
         FROM returns
     """)
 
-    return JSONResponse(result)
+    return FastJSONResponse(result)
 
 
-@sales_router.get("/returns/{return_id}", response_class=JSONResponse)
+@sales_router.get("/returns/{return_id}", response_class=FastJSONResponse)
 async def fetch_return(request: Request, return_id: int):
-    result = db.fetchOne(
+    return db.fetchOne(
         r'SELECT * FROM returns r JOIN sales s ON s.sale_id = r.sale_id WHERE return_id = %s', (return_id,))
-    if result:
-        result["return_date"] = result["return_date"].isoformat()
-        result["sales_date"] = result["sales_date"].isoformat()
-    return result
 
 
-@sales_router.get("/monthly", response_class=JSONResponse)
-async def monthly_sales(request: Request):
+@sales_router.get("/monthly", response_class=FastJSONResponse)
+@route_cache.cached("sales")
+@single_flight.coalesce
+def monthly_sales(request: Request):
 
     # Get current year
     from datetime import datetime
@@ -353,11 +378,13 @@ async def monthly_sales(request: Request):
                 'num_sales': 0
             })
 
-    return JSONResponse(result)
+    return FastJSONResponse(result)
 
 
-@sales_router.get("/yearly", response_class=JSONResponse)
-async def yearly_sales(request: Request):
+@sales_router.get("/yearly", response_class=FastJSONResponse)
+@route_cache.cached("sales")
+@single_flight.coalesce
+def yearly_sales(request: Request):
 
     result = db.fetchAll(r"""
         SELECT
@@ -370,11 +397,13 @@ async def yearly_sales(request: Request):
         LIMIT 5
     """)
 
-    return JSONResponse(result)
+    return FastJSONResponse(result)
 
 
-@sales_router.get("/total", response_class=JSONResponse)
-async def total_sales(request: Request):
+@sales_router.get("/total", response_class=FastJSONResponse)
+@route_cache.cached("sales")
+@single_flight.coalesce
+def total_sales(request: Request):
 
     result = db.fetchOne(r"""
         SELECT
@@ -383,10 +412,10 @@ async def total_sales(request: Request):
         FROM sales
     """)
 
-    return JSONResponse(result)
+    return FastJSONResponse(result)
 
 
-@sales_router.get("/{sale_id}", response_class=JSONResponse)
+@sales_router.get("/{sale_id}", response_class=FastJSONResponse)
 async def fetch_sale(request: Request, sale_id: int):
 
     result = db.fetchOne(
@@ -401,13 +430,10 @@ async def fetch_sale(request: Request, sale_id: int):
         (sale_id,)
     )
 
-    if result:
-        result["sales_date"] = result["sales_date"].isoformat()
-
     return result
 
 
-@sales_router.get("/{sale_id}/items", response_class=JSONResponse)
+@sales_router.get("/{sale_id}/items", response_class=FastJSONResponse)
 async def list_sales_items(request: Request, sale_id: int):
 
     return db.fetchAll(r'SELECT * FROM sales_items WHERE sale_id = %s', (sale_id,))
@@ -1,35 +1,44 @@
 import math
-import os
-import shutil
-from io import BytesIO
 from typing import Annotated, Optional
 
 from fastapi import APIRouter, Depends, File, Form, Request, UploadFile, Query
-from fastapi.responses import JSONResponse
-from PIL import Image
 
 from ... import utils
 from ...depedencies import is_authenticated, user_permissions
 from ...exceptions import DatabaseException
-from ...helpers import Database
+from ...helpers import Database, FastJSONResponse, ImagePool, ListFormat, image_store
 from ...models.users import UserForm
 from ...Settings import Settings
 from ...utils import Permissions
-from ...utils.image import create_profile_image
+from ...utils.image import read_upload, save_profile_image
 
 users_router = APIRouter(prefix="/users",
                          dependencies=[Depends(is_authenticated)])
 
 db = Database()
+image_pool = ImagePool()
 
+USER_COLUMNS = {
+    "user_id": "u.user_id",
+    "first_name": "u.first_name",
+    "last_name": "u.last_name",
+    "username": "u.username",
+    "created_at": "u.created_at",
+    "email": "e.email",
+}
 
-@users_router.get("/", response_class=JSONResponse)
+
+@users_router.get("/", response_class=FastJSONResponse)
 async def list_users(request: Request,
                      query: Annotated[Optional[str], Query()] = None,
                      page: Annotated[Optional[int], Query()] = 1,
-                     limit: Annotated[Optional[int], Query()] = 10
+                     limit: Annotated[Optional[int], Query()] = 10,
+                     fmt: ListFormat = Depends()
                      ):
 
+    columns = fmt.select(USER_COLUMNS, default=None,
+                         extra=("roles",), required=("user_id",))
+
     count = db.fetchOne(r'SELECT COUNT(*) as count FROM users')["count"]
     pages = math.ceil(count / limit)
     offset = (page - 1) * limit
@@ -37,9 +46,9 @@ async def list_users(request: Request,
     # Fetch results based on query
     if query:
         results = db.fetchAll(
-            r"""
-            SELECT u.user_id, u.first_name, u.last_name, u.username, u.created_at, e.email
-            FROM users u 
+            f"""
+            SELECT {columns}
+            FROM users u
             JOIN emails e ON u.user_id = e.user_id
             WHERE u.user_id = %s OR u.username LIKE %s OR u.first_name LIKE %s OR u.last_name LIKE %s OR e.email = %s
             LIMIT %s OFFSET %s
@@ -49,34 +58,29 @@ async def list_users(request: Request,
         )
     else:
         results = db.fetchAll(
-            r"""
-            SELECT u.user_id, u.first_name, u.last_name, u.username, u.created_at, e.email
-            FROM users u 
+            f"""
+            SELECT {columns}
+            FROM users u
             JOIN emails e ON u.user_id = e.user_id
             LIMIT %s OFFSET %s
             """,
             (limit, offset)
         )
 
-    # Enrich users with roles and convert dates to ISO format
-    for user in results:
-        user["roles"] = db.fetchAll(
-            r"""
-            SELECT r.* FROM user_roles ur
-            JOIN roles r ON ur.role_id = r.role_id
-            WHERE ur.user_id = %s
-            """, (user["user_id"],))
-        if user.get("created_at"):
-            user["created_at"] = user["created_at"].isoformat()
-
-    return JSONResponse({
-        "result": results,
-        "count": count,
-        "pages": pages
-    })
-
-
-@users_router.post("/add", response_class=JSONResponse)
+    # Enrich users with roles
+    if fmt.wants("roles"):
+        for user in results:
+            user["roles"] = db.fetchAll(
+                r"""
+                SELECT r.* FROM user_roles ur
+                JOIN roles r ON ur.role_id = r.role_id
+                WHERE ur.user_id = %s
+                """, (user["user_id"],))
+
+    return FastJSONResponse(fmt.render(results, count=count, pages=pages))
+
+
+@users_router.post("/add", response_class=FastJSONResponse)
 async def add_user(request: Request,
                    file: Annotated[UploadFile | None, File()] = None,
                    first_name: str = Form(),
@@ -94,15 +98,11 @@ async def add_user(request: Request,
     if db.fetchOne(r'SELECT * FROM users WHERE username = %s', (username,)):
         raise DatabaseException("Username is already taken")
 
+    image_job = None
     if file is not None:
-        if not file.content_type.startswith("image"):  # type: ignore
-            return JSONResponse(
-                {
-                    "success": False,
-                    "message": f"Uploaded file ({file.content_type}) is not an image."
-                },
-                status_code=415
-            )
+        data = await read_upload(file, Settings.profiles.max_file_size)
+        image_job = image_pool.submit(save_profile_image, data)
+        await image_pool.wait(image_job)
 
     hashed_pw = utils.hash_password(password)
 
@@ -116,29 +116,10 @@ async def add_user(request: Request,
 
     del hashed_pw
 
-    download_path = os.path.join(
-        Settings.profiles.path, f"user-{cursor.lastrowid:05d}")
-    download_profile_path = os.path.join(
-        download_path, f"user-{cursor.lastrowid:05d}.jpeg")
-
-    os.makedirs(download_path, exist_ok=True)
-
-    if file is not None:
-
-        image = Image.open(file.file)
-
-        if image.mode in ('RGBA', 'P'):
-            image = image.convert("RGB")
-
-        image = image.resize(
-            (Settings.profiles.size, Settings.profiles.size))
-
-        buffer = BytesIO()
-        image.save(buffer, format="JPEG", quality=85)
-        buffer.seek(0)
-
-        with open(download_profile_path, "wb") as f:
-            f.write(buffer.read())
+    if image_job is not None:
+        user_id = cursor.lastrowid
+        image_pool.finish(
+            image_job, lambda image_hash: image_store.assign_profile_image(user_id, image_hash))
 
     return {
         "success": True,
@@ -146,7 +127,7 @@ async def add_user(request: Request,
     }
 
 
-@users_router.post("/update", response_class=JSONResponse)
+@users_router.post("/update", response_class=FastJSONResponse)
 async def update_user(request: Request, file: Annotated[UploadFile | None, File()] = None, user_id: int = Form(), username: str = Form(), email: str = Form(), first_name: str = Form(default=""), last_name: str = Form(default=""), password: str = Form(default=""), role_ids: list[str] = Form(default=[]), user_perms: list[str] = Depends(user_permissions)):
 
     if user_id != request.session["user_id"]:
@@ -155,7 +136,14 @@ async def update_user(request: Request, file: Annotated[UploadFile | None, File(
             Permissions.users.manage_users
         )
 
+    image_job = None
+    if file is not None:
+        data = await read_upload(file, Settings.profiles.max_file_size)
+        image_job = image_pool.submit(save_profile_image, data)
+
     try:
+        if image_job is not None:
+            await image_pool.wait(image_job)
 
         if user_id < 0 and user_id != -1:
             raise DatabaseException("user_id cannot be negative")
@@ -232,28 +220,16 @@ async def update_user(request: Request, file: Annotated[UploadFile | None, File(
                     r'INSERT INTO user_roles (user_id, role_id) VALUES (%s, %s)', (user_id, role_id))
 
         # Handle profile picture upload
-        if file is not None:
-            if not file.content_type.startswith("image"):  # type: ignore
-                raise DatabaseException(f"Uploaded file ({file.content_type}) is not an image.")
-
-            image, user_dir = create_profile_image(user_id, file)
-
-            download_profile_path = os.path.join(
-                user_dir, f"user-{user_id:05d}.jpeg")
-
-            buffer = BytesIO()
-            image.save(buffer, format="JPEG", quality=85)
-            buffer.seek(0)
-
-            with open(download_profile_path, "wb") as f:
-                f.write(buffer.read())
+        if image_job is not None:
+            image_pool.finish(
+                image_job, lambda image_hash: image_store.assign_profile_image(user_id, image_hash))
 
         return {
             "success": True,
             "message": "Successfully Updated User."
         }
     except Exception as e:
-        return JSONResponse({
+        return FastJSONResponse({
             "success": False,
             "message": f"{e}"
         },
@@ -261,7 +237,7 @@ async def update_user(request: Request, file: Annotated[UploadFile | None, File(
         )
 
 
-@users_router.post("/updatePassword", response_class=JSONResponse)
+@users_router.post("/updatePassword", response_class=FastJSONResponse)
 async def update_user_password(request: Request, user_id: int = Form(), password: str = Form(), old_password: str = Form(default=""), user_perms: list[str] = Depends(user_permissions)):
 
     if user_id != request.session["user_id"]:
@@ -304,7 +280,7 @@ async def update_user_password(request: Request, user_id: int = Form(), password
             "message": "Successfully Updated User Password."
         }
     except Exception as e:
-        return JSONResponse({
+        return FastJSONResponse({
             "success": False,
             "message": f"{e}"
         },
@@ -312,7 +288,7 @@ async def update_user_password(request: Request, user_id: int = Form(), password
         )
 
 
-@users_router.delete("/delete/{user_id}", response_class=JSONResponse)
+@users_router.delete("/delete/{user_id}", response_class=FastJSONResponse)
 async def delete_user(request: Request, user_id: int, user_perms: list[str] = Depends(user_permissions)):
     utils.check_user_permissions(
         user_perms,
@@ -320,7 +296,7 @@ async def delete_user(request: Request, user_id: int, user_perms: list[str] = De
     )
 
     if user_id is None or user_id < 0:
-        return JSONResponse(
+        return FastJSONResponse(
             {
                 "success": False,
                 "message": "user_id is invalid."
@@ -332,6 +308,8 @@ async def delete_user(request: Request, user_id: int, user_perms: list[str] = De
         db.commitOne(r'DELETE FROM emails WHERE user_id = %s', (user_id,))
         db.commitOne(r'DELETE FROM user_roles WHERE user_id = %s', (user_id,))
 
+        image_store.assign_profile_image(user_id, None)
+
         cursor = db.commitOne(
             r'DELETE FROM users WHERE user_id = %s', (user_id,))
 
@@ -339,18 +317,12 @@ async def delete_user(request: Request, user_id: int, user_perms: list[str] = De
         if rowCount <= 0:
             raise DatabaseException("user_id doesn't exist.")
 
-        profile_path = os.path.join(
-            Settings.profiles.path, f"user-{user_id:05d}")
-
-        if os.path.exists(profile_path):
-            shutil.rmtree(profile_path)
-
         return {
             "success": True,
             "message": "Successfully Deleted User."
         }
     except Exception as e:
-        return JSONResponse({
+        return FastJSONResponse({
             "success": False,
             "message": f"{e}"
         },
@@ -358,16 +330,16 @@ async def delete_user(request: Request, user_id: int, user_perms: list[str] = De
         )
 
 
-@users_router.get("/{user_id}", response_class=JSONResponse)
+@users_router.get("/{user_id}", response_class=FastJSONResponse)
 async def fetch_user(request: Request, user_id: Optional[int] = None, user_perms: list[str] = Depends(user_permissions)):
     if user_id is None:
-        return JSONResponse({"error": "user_id is required"}, status_code=400)
+        return FastJSONResponse({"error": "user_id is required"}, status_code=400)
 
     user = db.fetchOne(
         r'SELECT u.user_id, u.username, u.first_name, u.last_name, e.email FROM users u JOIN emails e ON u.user_id = e.user_id WHERE u.user_id = %s', (user_id,))
 
     if not user:
-        return JSONResponse({"error": "User not found"}, status_code=404)
+        return FastJSONResponse({"error": "User not found"}, status_code=404)
 
     # Fetch roles for this user
     roles = db.fetchAll(
@@ -381,7 +353,7 @@ async def fetch_user(request: Request, user_id: Optional[int] = None, user_perms
     return user
 
 
-@users_router.get("/{user_id}/emails", response_class=JSONResponse)
+@users_router.get("/{user_id}/emails", response_class=FastJSONResponse)
 async def list_user_emails(request: Request, user_id: int, user_perms: list[str] = Depends(user_permissions)):
     utils.check_user_permissions(
         user_perms,
@@ -392,7 +364,7 @@ async def list_user_emails(request: Request, user_id: int, user_perms: list[str]
     return db.fetchAll(r'SELECT * FROM emails WHERE user_id = %s', (user_id, ))
 
 
-@users_router.get("/{user_id}/roles", response_class=JSONResponse)
+@users_router.get("/{user_id}/roles", response_class=FastJSONResponse)
 async def list_user_roles(request: Request, user_id: int, user_perms: list[str] = Depends(user_permissions)):
     utils.check_user_permissions(
         user_perms,
@@ -403,7 +375,7 @@ async def list_user_roles(request: Request, user_id: int, user_perms: list[str]
     return db.fetchAll(r'SELECT * FROM user_roles WHERE user_id = %s', (user_id, ))
 
 
-@users_router.post("/{user_id}/roles/add", response_class=JSONResponse)
+@users_router.post("/{user_id}/roles/add", response_class=FastJSONResponse)
 async def add_user_role(request: Request, user_id: int, role_id: int = Form(), user_perms: list[str] = Depends(user_permissions)):
     utils.check_user_permissions(
         user_perms,
@@ -412,7 +384,7 @@ async def add_user_role(request: Request, user_id: int, role_id: int = Form(), u
     )
 
     if not db.fetchOne(r'SELECT * FROM users where user_id = %s', (user_id,)):
-        return JSONResponse(
+        return FastJSONResponse(
             {
                 "success": False,
                 "message": "User doesn\'t exist."
@@ -429,7 +401,7 @@ async def add_user_role(request: Request, user_id: int, role_id: int = Form(), u
             "message": "Successfully Added Role to User."
         }
 
-    return JSONResponse(
+    return FastJSONResponse(
         {
             "success": False,
             "message": "Role doesn\'t exist."
@@ -438,7 +410,7 @@ async def add_user_role(request: Request, user_id: int, role_id: int = Form(), u
     )
 
 
-@users_router.delete("/{user_id}/roles/delete", response_class=JSONResponse)
+@users_router.delete("/{user_id}/roles/delete", response_class=FastJSONResponse)
 async def delete_user_role(request: Request, user_id: int, role_id: int = Form(), user_perms: list[str] = Depends(user_permissions)):
     utils.check_user_permissions(
         user_perms,
@@ -446,7 +418,7 @@ async def delete_user_role(request: Request, user_id: int, role_id: int = Form()
     )
 
     if not db.fetchOne(r'SELECT * FROM users where user_id = %s', (user_id,)):
-        return JSONResponse(
+        return FastJSONResponse(
             {
                 "success": False,
                 "message": "User doesn\'t exist."
@@ -463,7 +435,7 @@ async def delete_user_role(request: Request, user_id: int, role_id: int = Form()
             "message": "Successfully Removed Role to User."
         }
 
-    return JSONResponse(
+    return FastJSONResponse(
         {
             "success": False,
             "message": "Role doesn\'t exist."
@@ -472,7 +444,7 @@ async def delete_user_role(request: Request, user_id: int, role_id: int = Form()
     )
 
 
-@users_router.get("/{user_id}/roles/{role_id}", response_class=JSONResponse)
+@users_router.get("/{user_id}/roles/{role_id}", response_class=FastJSONResponse)
 async def fetch_user_role(request: Request, user_id: int, role_id, user_perms: list[str] = Depends(user_permissions)):
     utils.check_user_permissions(
         user_perms,
@@ -484,7 +456,7 @@ async def fetch_user_role(request: Request, user_id: int, role_id, user_perms: l
         r'SELECT * FROM user_roles WHERE user_id = %s AND role_id = %s', (user_id, role_id))
 
 
-@users_router.get("/{user_id}/roles/{role_id}/permissions", response_class=JSONResponse)
+@users_router.get("/{user_id}/roles/{role_id}/permissions", response_class=FastJSONResponse)
 async def list_user_role_permissions(request: Request, user_id: int, role_id: int, user_perms: list[str] = Depends(user_permissions)):
     utils.check_user_permissions(
         user_perms,
@@ -501,7 +473,7 @@ async def list_user_role_permissions(request: Request, user_id: int, role_id: in
                     """, (user_id, role_id))
 
 
-@users_router.get("/{user_id}/roles/{role_id}/permissions/{permission_id}", response_class=JSONResponse)
+@users_router.get("/{user_id}/roles/{role_id}/permissions/{permission_id}", response_class=FastJSONResponse)
 async def fetch_user_role_permission(request: Request, user_id: int, role_id: int, permission_id: int, user_perms: list[str] = Depends(user_permissions)):
     utils.check_user_permissions(
         user_perms,
@@ -2,17 +2,15 @@ from typing import Annotated
 
 from fastapi import APIRouter, Depends, Request
 from fastapi.responses import RedirectResponse
-from fastapi.templating import Jinja2Templates
 
 from ..depedencies import is_authenticated, user_permissions
+from ..helpers.templates import templates
 from ..utils import Permissions
 from ..helpers import sidebar
 
 manage_router = APIRouter(prefix="/manage",
                           dependencies=[Depends(is_authenticated)])
 
-templates = Jinja2Templates("assets/public/templates")
-
 
 @manage_router.get("/")
 async def dashboard(request: Request):
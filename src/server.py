@@ -1,18 +1,27 @@
 import logging
-from pathlib import Path
+from contextlib import asynccontextmanager
+from typing import Optional
 
 from fastapi import FastAPI, Request, HTTPException
 from fastapi.responses import FileResponse, JSONResponse, RedirectResponse
 from fastapi.staticfiles import StaticFiles
-from fastapi.templating import Jinja2Templates
 from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.middleware.sessions import SessionMiddleware
 
+from .exceptions import ImageQueueFullException
+from .helpers import ImagePool, image_store
+from .helpers.invalidation_bus import bus
+from .helpers.migrations import apply_migrations
+from .helpers.templates import templates
+from .helpers.image_serving import serve_image
+from .middlewares import CompressionMiddleware, UploadLimitMiddleware
 from .routes.api import api_router
 from .routes.manage import manage_router
 from .routes.pos import pos_router
 from .routes.settings import settings_router
 from .Settings import Settings, setup_logging
+from .utils import image
+from .warmup import warm_up
 
 logger = logging.getLogger(__name__)
 
@@ -25,16 +34,50 @@ class LoggingMiddleware(BaseHTTPMiddleware):
         return response
 
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Relay cache invalidations and catalog events to the other workers
+    bus.start()
+
+    if Settings.cache.warm_up:
+        await warm_up()
+
+    yield
+
+    bus.stop()
+
+    # Stop the image workers with the server
+    ImagePool().shutdown()
+
+
+app = FastAPI(lifespan=lifespan)
 
 # Setup logging
 setup_logging()
 
+apply_migrations()
+
 # Add middlewares
+# Refuse oversized uploads while they stream in. Innermost, so its errors
+# reach the form parser directly instead of through BaseHTTPMiddleware.
+app.add_middleware(UploadLimitMiddleware, limits={
+    "/api/inventory/shoes/add": Settings.products.max_file_size,
+    "/api/inventory/shoes/update": Settings.products.max_file_size,
+    "/api/users/add": Settings.profiles.max_file_size,
+    "/api/users/update": Settings.profiles.max_file_size,
+})
 app.add_middleware(LoggingMiddleware)
 app.add_middleware(SessionMiddleware,
                    secret_key=Settings.secrets.session_secret_key)
 
+if Settings.compression.enabled:
+    app.add_middleware(CompressionMiddleware,
+                       minimum_size=Settings.compression.minimum_size,
+                       level=Settings.compression.level,
+                       brotli_quality=Settings.compression.brotli_quality,
+                       excluded_paths=Settings.compression.excluded_paths)
+
+
 app.include_router(api_router)
 app.include_router(pos_router)
 app.include_router(manage_router)
@@ -42,7 +85,6 @@ app.include_router(settings_router)
 
 
 app.mount("/static", StaticFiles(directory="assets/public/static"), name="static")
-templates = Jinja2Templates(directory="assets/public/templates")
 
 
 @app.get("/")
@@ -90,30 +132,50 @@ async def favicon():
 
 
 @app.get("/profile")
-async def get_profile_picture(request: Request, user_id: int):
-
-    filename = f"user-{user_id:05d}"
+async def get_profile_picture(request: Request,
+                              user_id: Optional[int] = None,
+                              h: Optional[str] = None,
+                              v: Optional[str] = None):
 
+    # ?h=<hash> addresses the stored picture directly, ?user_id= looks it up
+    if h is None and user_id is not None:
+        h = image_store.profile_image_hash(user_id)
+    else:
+        v = h
 
-    profiles_path = Path("assets", "public", "profiles")
-    profile_path = profiles_path.joinpath(filename)
+    if not image.is_image_hash(h):
+        h = None
 
-    if profile_path.exists():
-        return FileResponse(profile_path.joinpath(f"{filename}.jpeg"))
+    return serve_image(request, ("profile", h),
+                       lambda: image.profile_image_path(h),
+                       immutable=h is not None and v == h)
 
-    return FileResponse(profiles_path.joinpath("default", "default.jpeg"))
 
 @app.get("/shoe")
-async def get_shoe_image(request: Request, shoe_id: int):
-    filename = f"shoe-{shoe_id:05d}"
+async def get_shoe_image(request: Request,
+                         shoe_id: Optional[int] = None,
+                         h: Optional[str] = None,
+                         v: Optional[str] = None,
+                         w: Optional[int] = None):
+
+    # ?h=<hash> addresses the stored image directly, ?shoe_id= looks it up
+    if h is None and shoe_id is not None:
+        h = image_store.shoe_image_hash(shoe_id)
+    else:
+        v = h
+
+    if not image.is_image_hash(h):
+        h = None
 
-    shoe_dir = Path(Settings.shoes.path, filename)
-    image_path = shoe_dir / f"{filename}.jpeg"
+    width = image.rendition_width(w)
+    formats = tuple(image.accepted_formats(request.headers.get("accept", "")))
 
-    if image_path.exists():
-        return FileResponse(image_path)
+    return serve_image(request, ("shoe", h, width, formats),
+                       lambda: image.shoe_rendition_path(h, width, ",".join(
+                           image.FORMAT_MEDIA_TYPES[format] for format in formats)),
+                       immutable=h is not None and v == h,
+                       vary="Accept")
 
-    return FileResponse(Settings.shoes.default)
 
 @app.get("/clearSession")
 async def clear_session(request: Request):
@@ -157,3 +219,29 @@ async def not_found_handler(request: Request, exception: HTTPException):
         },
         status_code=404
     )
+
+
+@app.exception_handler(ImageQueueFullException)
+async def image_queue_full_handler(request: Request, exception: ImageQueueFullException):
+
+    return JSONResponse(
+        {
+            "success": False,
+            "message": f"{exception}"
+        },
+        status_code=503,
+        headers={"Retry-After": "5"}
+    )
+
+
+@app.exception_handler(413)
+@app.exception_handler(415)
+async def upload_rejected_handler(request: Request, exception: HTTPException):
+
+    return JSONResponse(
+        {
+            "success": False,
+            "message": f"{exception.detail}"
+        },
+        status_code=exception.status_code
+    )
@@ -1,65 +1,540 @@
+import base64
+import hashlib
 import os
-from fastapi import UploadFile
-from PIL import Image
+import re
+import shutil
+from io import BytesIO
+from typing import BinaryIO
+
+from fastapi import HTTPException, UploadFile
+from PIL import Image, UnidentifiedImageError, features
+
 from ..Settings import Settings
 
+# path -> (st_mtime_ns, st_size, version)
+_versions: dict[str, tuple[int, int, str]] = {}
+
+FORMAT_EXTENSIONS = {
+    "JPEG": "jpeg",
+    "WEBP": "webp",
+    "AVIF": "avif",
+}
+
+FORMAT_MEDIA_TYPES = {
+    "JPEG": "image/jpeg",
+    "WEBP": "image/webp",
+    "AVIF": "image/avif",
+}
+
+# Bump when a change to the pipeline should re-render stored images.
+RENDER_PIPELINE = 1
+
+# Settings hashes a blob was last rendered with.
+RENDER_MARKER = ".rendered"
+
+# Stored images are content addressed: every distinct image is kept once,
+# in <root>/<hash[:2]>/<hash>/ next to its renditions, and shoes and users
+# point at it by hash (shoes.image_hash, users.image_hash).
+BLOB_IMAGE = "image.jpeg"
+
+# Tiny version of a shoe image shown while the image itself loads, stored
+# as a data URI in the blob and in shoes.image_placeholder.
+BLOB_PLACEHOLDER = "placeholder.txt"
+PLACEHOLDER_SIZE = 16
+
+IMAGE_HASH_PATTERN = re.compile(r"^[0-9a-f]{16}$")
+
+
+def content_version(data: bytes) -> str:
+    """Short content hash used for ETags, versioned image URLs and blob names."""
+    return hashlib.sha256(data).hexdigest()[:16]
+
+
+def image_version(path: str) -> str:
+    """Content hash of the image at ``path``.
+
+    Hashes are remembered per file and only recomputed when the file's
+    mtime or size changes.
+    """
+
+    stat = os.stat(path)
+    cached = _versions.get(path)
+    if cached and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+        return cached[2]
+
+    with open(path, "rb") as f:
+        version = content_version(f.read())
+
+    _versions[path] = (stat.st_mtime_ns, stat.st_size, version)
+    return version
+
+
+def write_image(path: str, data: bytes) -> str:
+    """Write encoded image bytes to ``path`` and return their version."""
+
+    with open(path, "wb") as f:
+        f.write(data)
+
+    stat = os.stat(path)
+    version = content_version(data)
+    _versions[path] = (stat.st_mtime_ns, stat.st_size, version)
+    return version
+
+
+def is_image_hash(value: str | None) -> bool:
+    return value is not None and IMAGE_HASH_PATTERN.match(value) is not None
+
+
+def blob_dir(root: str, image_hash: str) -> str:
+    """Directory of the stored image ``image_hash`` under ``root``.
+
+    Raises:
+        ValueError: If ``image_hash`` isn't an image hash, it ends up in a
+            path and may come straight from a query string.
+    """
+
+    if not is_image_hash(image_hash):
+        raise ValueError(f"Invalid image hash '{image_hash}'.")
+
+    return os.path.join(root, image_hash[:2], image_hash)
+
+
+def stored_blobs(root: str) -> list[str]:
+    """Hashes of every image stored under ``root``."""
+
+    hashes = []
+    if not os.path.isdir(root):
+        return hashes
+
+    for prefix in os.scandir(root):
+        if len(prefix.name) != 2 or not prefix.is_dir():
+            continue
+
+        for entry in os.scandir(prefix.path):
+            if is_image_hash(entry.name) and entry.name.startswith(prefix.name):
+                hashes.append(entry.name)
+
+    return sorted(hashes)
+
+
+def delete_blob(root: str, image_hash: str) -> None:
+    directory = blob_dir(root, image_hash)
+    shutil.rmtree(directory, ignore_errors=True)
+
+    try:
+        os.rmdir(os.path.dirname(directory))
+    except OSError:
+        pass  # Other images share the prefix directory
+
+
+def shoe_image_path(image_hash: str | None) -> str:
+    """Path of a stored shoe image, or of the default image if there is none."""
+
+    if is_image_hash(image_hash):
+        image_path = os.path.join(
+            blob_dir(Settings.shoes.path, image_hash), BLOB_IMAGE)  # type: ignore
+
+        if os.path.isfile(image_path):
+            return image_path
 
-def create_square_image(shoe_id: int, file: UploadFile):
+    return Settings.shoes.default
 
-    shoe_dir = os.path.join(
-        Settings.shoes.path, f"shoe-{shoe_id:05d}")
 
-    os.makedirs(shoe_dir, exist_ok=True)
+def profile_image_path(image_hash: str | None) -> str:
+    """Path of a stored profile picture, or of the default picture."""
 
-    # Process image
-    image = Image.open(file.file)
-    if image.mode in ('RGBA', 'P'):
+    if is_image_hash(image_hash):
+        image_path = os.path.join(
+            blob_dir(Settings.profiles.path, image_hash), BLOB_IMAGE)  # type: ignore
+
+        if os.path.isfile(image_path):
+            return image_path
+
+    return Settings.profiles.default
+
+
+def open_image(file: BinaryIO) -> Image.Image:
+    """Open an uploaded image without decoding its pixels yet.
+
+    Only the header has been read at this point, oversized images are
+    refused before any pixel data is decoded.
+
+    Raises:
+        Image.DecompressionBombError: If the image has more pixels than
+            ``Settings.images.max_pixels``.
+    """
+
+    image = Image.open(file)
+
+    if image.width * image.height > Settings.images.max_pixels:
+        raise Image.DecompressionBombError(
+            f"Image is too large ({image.width}x{image.height}), "
+            f"the limit is {Settings.images.max_pixels} pixels.")
+
+    return image
+
+
+async def read_upload(file: UploadFile, max_file_size: int) -> bytes:
+    """Read an uploaded image after checking everything that doesn't need decoding.
+
+    The content type, the size in bytes and, from the image header only,
+    the pixel count are checked before the upload is handed to the image
+    pool.
+
+    Raises:
+        HTTPException: 415 if the upload isn't an image, 413 if it is too
+            large in bytes or pixels.
+    """
+
+    if not file.content_type or not file.content_type.startswith("image"):
+        raise HTTPException(415, f"Uploaded file ({file.content_type}) is not an image.")
+
+    if file.size is not None and file.size > max_file_size:
+        raise HTTPException(
+            413, f"Image is too large, the limit is {max_file_size / 1024 / 1024:.1f} MB.")
+
+    data = await file.read()
+
+    try:
+        open_image(BytesIO(data)).close()
+    except Image.DecompressionBombError as e:
+        raise HTTPException(413, f"{e}")
+    except (UnidentifiedImageError, OSError):
+        raise HTTPException(415, "Uploaded file is not a readable image.")
+
+    return data
+
+
+def resize_image(image: Image.Image, size: tuple[int, int]) -> Image.Image:
+    """Decode ``image`` and resample it to ``size`` in a single pass.
+
+    JPEGs are decoded in draft mode, the decoder itself scales them down
+    by the largest power of two that keeps them at least ``size``, so a
+    phone photo is never fully materialized. The remaining scaling is one
+    LANCZOS resample, with a cheap box reduce first for large factors.
+    """
+
+    image.draft("RGB", size)
+    if image.mode != "RGB":
         image = image.convert("RGB")
 
-    # Resize to fit within target size while maintaining aspect ratio (fit-to-screen)
-    target_size = Settings.shoes.size
-    image.thumbnail((target_size, target_size),
-                    Image.Resampling.LANCZOS)
+    return image.resize(size, Image.Resampling.LANCZOS, reducing_gap=3.0)
 
-    # Create square canvas and center the image (fit-to-screen in square)
-    square_image = Image.new(
-        'RGB', (target_size, target_size), (255, 255, 255))
 
-    # Calculate position to center the image
+def fit_size(width: int, height: int, target_size: int) -> tuple[int, int]:
+    """Size of a ``width`` x ``height`` image scaled to fit a square box."""
 
-    aspect_ratio = image.width / image.height
+    aspect_ratio = width / height
     if aspect_ratio > 1:
-        new_width = target_size
-        new_height = int(target_size / aspect_ratio)
-    else:
-        new_height = target_size
-        new_width = int(target_size * aspect_ratio)
+        return target_size, max(1, int(target_size / aspect_ratio))
+
+    return max(1, int(target_size * aspect_ratio)), target_size
+
+
+def square_image(file: BinaryIO, target_size: int) -> Image.Image:
+    """Fit an image into a white ``target_size`` square."""
 
-    image = image.resize((new_width, new_height), Image.Resampling.LANCZOS)
+    image = open_image(file)
+    image = resize_image(image, fit_size(image.width, image.height, target_size))
+
+    # Create square canvas and center the image (fit-to-screen in square)
+    square = Image.new('RGB', (target_size, target_size), (255, 255, 255))
 
     x = (target_size - image.width) // 2
     y = (target_size - image.height) // 2
 
-    # Paste the resized image onto the square canvas
-    square_image.paste(image, (x, y))
+    square.paste(image, (x, y))
 
-    return square_image, shoe_dir
+    return square
 
 
-def create_profile_image(user_id: int, file: UploadFile):
+def create_square_image(file: BinaryIO) -> Image.Image:
+    return square_image(file, Settings.shoes.size)
 
-    user_dir = os.path.join(
-        Settings.profiles.path, f"user-{user_id:05d}")
 
-    os.makedirs(user_dir, exist_ok=True)
-
-    # Process image
-    image = Image.open(file.file)
-    if image.mode in ('RGBA', 'P'):
-        image = image.convert("RGB")
+def create_profile_image(file: BinaryIO) -> Image.Image:
 
     # Resize to target size
     target_size = Settings.profiles.size
-    image = image.resize((target_size, target_size), Image.Resampling.LANCZOS)
+    return resize_image(open_image(file), (target_size, target_size))
+
+
+def encode_image(image: Image.Image, format: str, quality: int) -> bytes:
+    buffer = BytesIO()
+    image.save(buffer, format=format, quality=quality)
+    return buffer.getvalue()
+
+
+def rendition_formats() -> list[str]:
+    """JPEG plus the configured modern formats this Pillow build can encode."""
+
+    formats = ["JPEG"]
+    for format in Settings.shoes.formats:
+        format = format.upper()
+        if format in FORMAT_EXTENSIONS and format not in formats and features.check(format.lower()):
+            formats.append(format)
+
+    return formats
+
+
+def rendition_widths() -> list[int]:
+    """Configured rendition widths, never larger than the stored image."""
+
+    widths = {width for width in Settings.shoes.renditions
+              if 0 < width <= Settings.shoes.size}
+    widths.add(Settings.shoes.size)
+
+    return sorted(widths)
+
+
+def rendition_filename(width: int, format: str) -> str:
+    return f"{width}.{FORMAT_EXTENSIONS[format]}"
+
+
+def save_renditions(directory: str, square_image: Image.Image) -> None:
+    """Write every configured width/format of a shoe image into its blob."""
+
+    for width in rendition_widths():
+        if width == square_image.width:
+            resized = square_image
+        else:
+            resized = square_image.resize(
+                (width, width), Image.Resampling.LANCZOS)
+
+        for format in rendition_formats():
+            if format == "JPEG" and width == Settings.shoes.size:
+                # That's the stored image itself.
+                continue
+
+            write_image(os.path.join(directory, rendition_filename(width, format)),
+                        encode_image(resized, format, Settings.shoes.quality))
+
+
+def placeholder_data_uri(image: Image.Image) -> str:
+    """A few hundred bytes at most, meant to be stretched and blurry."""
+
+    image.draft("RGB", (PLACEHOLDER_SIZE, PLACEHOLDER_SIZE))
+    image = image.convert("RGB").resize((PLACEHOLDER_SIZE, PLACEHOLDER_SIZE),
+                                        Image.Resampling.BOX)
+
+    format = "WEBP" if features.check("webp") else "JPEG"
+    data = encode_image(image, format, 40)
+
+    return f"data:{FORMAT_MEDIA_TYPES[format]};base64,{base64.b64encode(data).decode()}"
+
+
+def save_placeholder(directory: str, image: Image.Image) -> None:
+    with open(os.path.join(directory, BLOB_PLACEHOLDER), "w") as f:
+        f.write(placeholder_data_uri(image))
+
+
+def read_placeholder(root: str, image_hash: str | None) -> str | None:
+    if not is_image_hash(image_hash):
+        return None
+
+    try:
+        with open(os.path.join(blob_dir(root, image_hash), BLOB_PLACEHOLDER), "r") as f:  # type: ignore
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def accepted_formats(accept: str) -> list[str]:
+    """Image formats the client accepts, most preferred (smallest) first."""
+
+    accept = accept.lower()
+    formats = [format for format in ("AVIF", "WEBP")
+               if FORMAT_MEDIA_TYPES[format] in accept]
+
+    return formats + ["JPEG"]
+
+
+def rendition_width(width: int | None) -> int:
+    """Width of the smallest rendition at least ``width`` wide, the largest one by default."""
+
+    widths = rendition_widths()
+    if width:
+        return next((w for w in widths if w >= width), widths[-1])
+
+    return widths[-1]
+
+
+def shoe_rendition_path(image_hash: str | None, width: int | None, accept: str) -> str:
+    """Best stored rendition of a shoe image for a display width and Accept header.
+
+    Picks the smallest rendition at least ``width`` pixels wide (the
+    largest one when no width is given) in the most compact format the
+    client accepts, falling back to the stored JPEG or the default image.
+    """
+
+    if not is_image_hash(image_hash):
+        return Settings.shoes.default
+
+    target = rendition_width(width)
+
+    directory = blob_dir(Settings.shoes.path, image_hash)  # type: ignore
+    for format in accepted_formats(accept):
+        path = os.path.join(directory, rendition_filename(target, format))
+        if os.path.isfile(path):
+            return path
+
+    return shoe_image_path(image_hash)
+
+
+def settings_hash(*values) -> str:
+    return content_version(repr((RENDER_PIPELINE, *values)).encode())
+
+
+def shoe_render_hashes() -> list[str]:
+    """Hashes of the settings behind a stored shoe image and its renditions."""
+
+    return [
+        settings_hash(Settings.shoes.size, Settings.shoes.quality),
+        settings_hash(Settings.shoes.size, Settings.shoes.quality,
+                      rendition_widths(), rendition_formats(), PLACEHOLDER_SIZE),
+    ]
+
+
+def profile_render_hashes() -> list[str]:
+    return [settings_hash(Settings.profiles.size, Settings.profiles.quality)]
+
+
+def read_render_marker(directory: str) -> list[str]:
+    try:
+        with open(os.path.join(directory, RENDER_MARKER), "r") as f:
+            return f.read().split()
+    except FileNotFoundError:
+        return []
+
+
+def write_render_marker(directory: str, hashes: list[str]) -> None:
+    with open(os.path.join(directory, RENDER_MARKER), "w") as f:
+        f.write(" ".join(hashes))
+
+
+def store_blob(root: str, data: bytes, render=None) -> str:
+    """Store encoded JPEG ``data`` under its hash and return the hash.
+
+    Identical images are only stored once. New blobs are written to a
+    temporary directory, ``render(directory)`` adds whatever belongs next
+    to the image, and the directory is then renamed into place, so a blob
+    that exists is always complete.
+    """
+
+    image_hash = content_version(data)
+    directory = blob_dir(root, image_hash)
+
+    if os.path.isfile(os.path.join(directory, BLOB_IMAGE)):
+        # Marks the blob as in use again, see image_store._release.
+        os.utime(directory)
+        return image_hash
+
+    staging = f"{directory}.tmp-{os.getpid()}"
+    os.makedirs(staging, exist_ok=True)
+
+    try:
+        write_image(os.path.join(staging, BLOB_IMAGE), data)
+        if render is not None:
+            render(staging)
+
+        try:
+            os.rename(staging, directory)
+        except OSError:
+            # Stored by someone else in the meantime.
+            if not os.path.isfile(os.path.join(directory, BLOB_IMAGE)):
+                raise
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+
+    return image_hash
+
+
+def store_shoe_image(square_image: Image.Image) -> str:
+    """Store a processed shoe image with its renditions, returns its hash."""
+
+    def render(directory: str) -> None:
+        save_renditions(directory, square_image)
+        save_placeholder(directory, square_image)
+        write_render_marker(directory, shoe_render_hashes())
+
+    return store_blob(Settings.shoes.path,
+                      encode_image(square_image, "JPEG", Settings.shoes.quality),
+                      render)
+
+
+def store_profile_image(image: Image.Image) -> str:
+    """Store a processed profile picture, returns its hash."""
+
+    def render(directory: str) -> None:
+        write_render_marker(directory, profile_render_hashes())
+
+    return store_blob(Settings.profiles.path,
+                      encode_image(image, "JPEG", Settings.profiles.quality),
+                      render)
+
+
+def rerender_shoe_image(image_hash: str, force: bool = False) -> str | None:
+    """Bring a stored shoe image in line with the current settings.
+
+    Renditions are regenerated in place when only they are out of date.
+    When the stored image itself has to be re-encoded (its size or quality
+    changed) the result is a different image and is stored as a new blob,
+    the caller moves the references over and releases the old one.
+
+    Returns the hash the image is stored under afterwards, or None when it
+    was already up to date.
+    """
+
+    directory = blob_dir(Settings.shoes.path, image_hash)
+
+    hashes = shoe_render_hashes()
+    rendered = read_render_marker(directory)
+    if rendered == hashes and not force:
+        return None
+
+    with open(os.path.join(directory, BLOB_IMAGE), "rb") as f:
+        square = square_image(f, Settings.shoes.size)
+
+    if force or rendered[:1] != hashes[:1]:
+        stored_hash = store_shoe_image(square)
+        if stored_hash != image_hash:
+            return stored_hash
+
+    save_renditions(directory, square)
+    save_placeholder(directory, square)
+    write_render_marker(directory, hashes)
+
+    return image_hash
+
+
+def rerender_profile_image(image_hash: str, force: bool = False) -> str | None:
+    """Profile picture counterpart of ``rerender_shoe_image``."""
+
+    directory = blob_dir(Settings.profiles.path, image_hash)
+
+    if read_render_marker(directory) == profile_render_hashes() and not force:
+        return None
+
+    with open(os.path.join(directory, BLOB_IMAGE), "rb") as f:
+        stored_hash = store_profile_image(create_profile_image(f))
+
+    # A re-encoded picture is a different blob, the marker goes with it.
+    write_render_marker(blob_dir(Settings.profiles.path, stored_hash), profile_render_hashes())
+
+    return stored_hash
+
+
+def save_shoe_image(data: bytes) -> str:
+    """Process an uploaded shoe image and store it with its renditions.
+
+    Runs in the image pool (see ``helpers.image_pool``), so it takes the
+    raw upload bytes. Returns the hash of the stored image.
+    """
+
+    return store_shoe_image(create_square_image(BytesIO(data)))
+
+
+def save_profile_image(data: bytes) -> str:
+    """Process uploaded profile picture bytes and store them, returns their hash."""
 
-    return image, user_dir
+    return store_profile_image(create_profile_image(BytesIO(data)))
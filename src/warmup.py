@@ -0,0 +1,106 @@
+import inspect
+import logging
+import time
+from urllib.parse import urlencode
+
+from fastapi import Request
+
+from .helpers import CatalogIndex, ReferenceData, catalog_feed
+from .helpers.metrics import metrics
+from .helpers.permission_map import PermissionMap
+from .helpers.reference_data import REFERENCE_TABLES
+from .helpers.responses import JSON_MEDIA_TYPE, negotiated_media_type
+from .helpers.templates import precompile_templates
+from .routes.api.inventory.shoes import list_popular, total_shoes
+from .routes.api.sales import monthly_sales, total_returns, total_sales, yearly_sales
+from .utils import Permissions
+
+logger = logging.getLogger(__name__)
+
+# What the dashboard asks for when it's opened: endpoint, path and query.
+DASHBOARD_REQUESTS = [
+    (monthly_sales, "/api/sales/monthly", {}),
+    (yearly_sales, "/api/sales/yearly", {}),
+    (total_sales, "/api/sales/total", {}),
+    (total_returns, "/api/sales/returns/total", {}),
+    (list_popular, "/api/inventory/shoes/popular", {"limit": 5}),
+]
+
+
+def _request(path: str, params: dict) -> Request:
+    return Request({
+        "type": "http",
+        "method": "GET",
+        "path": path,
+        "query_string": urlencode(params).encode(),
+        "headers": [],
+    })
+
+
+def _warm_reference() -> None:
+    reference = ReferenceData()
+    for name in REFERENCE_TABLES:
+        reference.table(name)
+
+
+def _warm_catalog() -> None:
+    CatalogIndex().snapshot
+    catalog_feed.full_catalog()
+
+
+def _warm_permissions() -> None:
+    PermissionMap().load()
+
+
+async def _warm_dashboard() -> None:
+    # Fills the response cache under the keys the dashboard's requests
+    # have, its fetch() calls accept anything and are answered in JSON.
+    token = negotiated_media_type.set(JSON_MEDIA_TYPE)
+    try:
+        for endpoint, path, params in DASHBOARD_REQUESTS:
+            await endpoint(request=_request(path, params), **params)
+
+        # The shoe count is cached per set of permissions.
+        scopes = {tuple(sorted(permissions)) for permissions in PermissionMap().load().values()}
+        scopes.add((Permissions.management.admin_all,))
+        for scope in scopes:
+            await total_shoes(request=_request("/api/inventory/shoes/total/count", {}),
+                              user_perms=list(scope))
+    finally:
+        negotiated_media_type.reset(token)
+
+
+WARM_UP_STEPS = [
+    ("reference", _warm_reference),
+    ("catalog", _warm_catalog),
+    ("permissions", _warm_permissions),
+    ("dashboard", _warm_dashboard),
+    ("templates", precompile_templates),
+]
+
+
+async def warm_up() -> None:
+    """Fill the caches before the worker takes its first request.
+
+    How long every step took goes to the ``warmup.<step>_seconds`` metric.
+    A step that fails is logged and skipped, what it would have loaded is
+    then loaded by the first request that needs it.
+    """
+
+    start = time.perf_counter()
+
+    for name, step in WARM_UP_STEPS:
+        step_start = time.perf_counter()
+        try:
+            result = step()
+            if inspect.isawaitable(result):
+                await result
+        except Exception as e:
+            metrics.increment("warmup.failures")
+            logger.error(f"Warm-up of {name} failed: {e}")
+
+        metrics.set(f"warmup.{name}_seconds", time.perf_counter() - step_start)
+
+    elapsed = time.perf_counter() - start
+    metrics.set("warmup.seconds", elapsed)
+    logger.info(f"Caches warmed up in {elapsed * 1000:.0f} ms")
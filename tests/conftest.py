@@ -0,0 +1,7 @@
+from unittest import mock
+
+import mysql.connector
+
+# Nothing here talks to MySQL, every connection is a mock. Patched before
+# the test modules import src, which connects on import.
+mysql.connector.connect = mock.MagicMock(side_effect=lambda **kwargs: mock.MagicMock())
@@ -0,0 +1,33 @@
+from unittest import mock
+
+import orjson
+
+from src.helpers import catalog_events
+from src.helpers.catalog_events import broker, publish_variants
+from src.helpers.invalidation_bus import bus
+from src.helpers.responses import dumps
+
+
+def test_other_workers_are_sent_the_committed_rows():
+    subscription = broker.subscribe()
+    rows = [{"variant_id": 1, "shoe_id": 2, "size_id": 3, "variant_stock": 0}]
+
+    try:
+        with mock.patch.object(catalog_events.db, "fetchAll", return_value=rows), \
+                mock.patch.object(bus, "publish") as publish:
+            publish_variants([1, 4])
+
+        kind, variants = publish.call_args.args
+        assert kind == "variants"
+        assert variants == [{**rows[0], "deleted": False}, {"variant_id": 4, "deleted": True}]
+
+        # The receiving worker passes them on without reading the database.
+        subscription._pending.clear()
+        with mock.patch.object(catalog_events.db, "fetchAll") as fetch_all:
+            bus._handlers["variants"](orjson.loads(dumps(variants)))
+
+        fetch_all.assert_not_called()
+        assert subscription._pending[("variant", 1)].data["variant_stock"] == 0
+        assert subscription._pending[("variant", 4)].data["deleted"] is True
+    finally:
+        broker.unsubscribe(subscription)
@@ -0,0 +1,22 @@
+from unittest import mock
+
+from src.helpers import catalog_feed
+
+
+def _fetch_one(statement, params=()):
+    if "MIN(version)" in statement:
+        return {"version": 1}
+    if "MAX(version)" in statement:
+        return {"version": 10}
+    return {"changed_at": None}
+
+
+def test_client_ahead_of_this_worker_gets_no_changes_and_keeps_its_version():
+    with mock.patch.object(catalog_feed.db, "fetchOne", side_effect=_fetch_one), \
+            mock.patch.object(catalog_feed.db, "fetchAll", return_value=[]):
+        changes = catalog_feed.catalog_changes(12)
+
+    assert changes is not None
+    assert changes["version"] == 12
+    assert changes["full"] is False
+    assert all(changes[table] == [] for table in catalog_feed.VERSIONED_TABLES)
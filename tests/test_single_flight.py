@@ -0,0 +1,74 @@
+import asyncio
+import threading
+
+import httpx
+from fastapi import FastAPI, Request
+
+from src.helpers.database import Database
+from src.helpers.single_flight import single_flight
+
+
+def test_concurrent_identical_gets_run_once():
+    app = FastAPI()
+    calls = 0
+    release = threading.Event()
+
+    @app.get("/total")
+    @single_flight.coalesce
+    def total(request: Request):
+        nonlocal calls
+        calls += 1
+        release.wait(5)
+        return {"total": 42}
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            first = asyncio.create_task(client.get("/total"))
+            second = asyncio.create_task(client.get("/total"))
+
+            # Both requests are in before the computation finishes.
+            while len(single_flight._flights) == 0:
+                await asyncio.sleep(0.01)
+            await asyncio.sleep(0.05)
+            release.set()
+
+            return await first, await second
+
+    first, second = asyncio.run(run())
+
+    assert calls == 1
+    assert first.json() == second.json() == {"total": 42}
+
+
+def test_different_queries_are_not_coalesced():
+    app = FastAPI()
+    calls = 0
+
+    @app.get("/total")
+    @single_flight.coalesce
+    def total(request: Request, limit: int = 1):
+        nonlocal calls
+        calls += 1
+        return {"limit": limit}
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await asyncio.gather(client.get("/total?limit=1"), client.get("/total?limit=2"))
+
+    first, second = asyncio.run(run())
+
+    assert calls == 2
+    assert (first.json(), second.json()) == ({"limit": 1}, {"limit": 2})
+
+
+def test_every_thread_has_its_own_connection():
+    db = Database()
+    connections = []
+
+    thread = threading.Thread(target=lambda: connections.append(db.db))
+    thread.start()
+    thread.join()
+
+    assert connections[0] is not db.db